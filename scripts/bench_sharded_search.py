@@ -0,0 +1,74 @@
+"""Benchmark sharded similarity search against the single-process path.
+
+Scores a synthetic catalogue with ``RetrievalEngine.search_matrix`` and then
+with ``search_sharded`` for 1, 2, 4, ... processes up to the core count,
+printing the mean query latency and the speedup for each setting. Every
+sharded result is checked against the single-process ranking.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing
+import time
+from typing import List
+
+import numpy as np
+
+from flower_trait_modeling.domain.models import FeatureVector
+from flower_trait_modeling.similarity.engine import SimilarityEngine
+from flower_trait_modeling.similarity.retrieval import RetrievalEngine
+from flower_trait_modeling.similarity.sharded import ShardedMatrix
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+
+
+def _timed(fn, queries: List[FeatureVector]) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def bench(rows: int, width: int, queries: int, top_k: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    mapping = [f"slot_{idx}" for idx in range(width)]
+    matrix = VectorMatrix.from_array(schema_id="bench", ids=np.array([f"v{idx}" for idx in range(rows)]), values=rng.random((rows, width)), mapping=mapping)
+    probes = [matrix.vector(int(row)) for row in rng.integers(0, rows, size=queries)]
+    retriever = RetrievalEngine(SimilarityEngine({"vector": 1.0}))
+    baseline = _timed(lambda q: retriever.search_matrix(q, matrix, top_k), probes)
+    print(f"rows={rows} width={width} top_k={top_k}")
+    print(f"single-process  {baseline * 1000:8.2f} ms/query")
+    cores = multiprocessing.cpu_count()
+    processes = 1
+    while processes <= cores:
+        with ShardedMatrix(matrix, shards=processes, processes=processes) as sharded:
+            for query in probes[:3]:
+                expected = [(r.candidate_id, r.score) for r in retriever.search_matrix(query, matrix, top_k)]
+                actual = [(r.candidate_id, r.score) for r in retriever.search_sharded(query, sharded, top_k)]
+                if actual != expected:
+                    raise SystemExit(f"sharded result differs with {processes} processes")
+            latency = _timed(lambda q: retriever.search_sharded(q, sharded, top_k), probes)
+        print(f"processes={processes:<4d} {latency * 1000:8.2f} ms/query  speedup={baseline / latency:5.2f}x")
+        processes = processes * 2 if processes * 2 <= cores or processes == cores else cores
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark sharded similarity search")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--width", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    # Per-query INFO records would dominate the timings.
+    logging.getLogger("flower_trait_modeling").setLevel(logging.WARNING)
+    bench(args.rows, args.width, args.queries, args.top_k, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Precompute the "similar varieties" kNN graph from a saved vector matrix."""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from flower_trait_modeling.similarity.engine import SimilarityEngine
+from flower_trait_modeling.similarity.knn_graph import KNNGraph
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+from flower_trait_modeling.utils.logging import configure_logging
+from flower_trait_modeling.weighting.manager import WeightManager
+from flower_trait_modeling.weighting.schemes import WeightConstraint
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Build the top-k neighbour graph for every variety")
+    parser.add_argument("matrix", type=Path, help="VectorMatrix .npz saved by VectorMatrix.save")
+    parser.add_argument("--output", type=Path, default=Path("output/knn_graph.npz"))
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--memory-budget-mb", type=float, default=256.0)
+    parser.add_argument("--weights", type=Path, help="Weight scheme YAML; rank by weighted cosine like the service")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    configure_logging()
+    args = build_parser().parse_args(argv)
+    matrix = VectorMatrix.load(args.matrix)
+    weights = None
+    if args.weights is not None:
+        manager = WeightManager(WeightConstraint(min_weight=0.0, max_weight=1.0))
+        weights = SimilarityEngine({"vector": 1.0}, weight_scheme=manager.load(str(args.weights))).slot_weights(matrix.mapping)
+    graph = KNNGraph.build(matrix, top_k=args.top_k, memory_budget_mb=args.memory_budget_mb, weights=weights)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    graph.save(args.output)
+    print(f"{len(graph)} varieties x {graph.top_k} neighbours -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Long-running asyncio query server that micro-batches concurrent searches."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .service import ModelingService
+from ..domain.models import FeatureVector, SimilarityResult
+from ..similarity.config import ServerConfig
+from ..similarity.retrieval import RetrievalEngine
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import SimilarityError
+from ..utils.logging import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+_Pending = Tuple[FeatureVector, int, "asyncio.Future[List[SimilarityResult]]"]
+
+
+@dataclass
+class QueryBatcher:
+    """Coalesce queries arriving within ``max_wait_ms`` into one ``search_matrix_many`` call.
+
+    A batch closes when ``batch_size`` queries are waiting or the wait since
+    its first query runs out; it is scored on the default executor so the
+    event loop keeps accepting queries meanwhile. ``submit`` fails fast with
+    ``SimilarityError`` once ``queue_depth`` queries are already queued.
+    """
+
+    retrieval: RetrievalEngine
+    matrix: VectorMatrix
+    config: ServerConfig = field(default_factory=ServerConfig)
+    batches: int = 0
+    _queue: Optional["asyncio.Queue[_Pending]"] = field(default=None, init=False, repr=False)
+    _worker: Optional["asyncio.Task[None]"] = field(default=None, init=False, repr=False)
+    # Queries taken off the queue but not yet answered, so ``stop`` can fail them.
+    _batch: List[_Pending] = field(default_factory=list, init=False, repr=False)
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.config.queue_depth)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the worker and fail every in-flight or queued query with ``SimilarityError``."""
+
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        pending, self._batch = self._batch, []
+        queue, self._queue = self._queue, None
+        while queue is not None and not queue.empty():
+            pending.append(queue.get_nowait())
+        for _, _, future in pending:
+            if not future.done():
+                future.set_exception(SimilarityError("query batcher stopped"))
+
+    async def submit(self, query: FeatureVector, top_k: int = 5) -> List[SimilarityResult]:
+        if self._queue is None:
+            raise SimilarityError("query batcher is not started")
+        future: "asyncio.Future[List[SimilarityResult]]" = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((query, top_k, future))
+        except asyncio.QueueFull:
+            raise SimilarityError(f"query queue is full ({self.config.queue_depth})") from None
+        return await future
+
+    async def _collect(self) -> List[_Pending]:
+        assert self._queue is not None
+        batch = self._batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.max_wait_ms / 1000.0
+        while len(batch) < self.config.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # A prefix of the deepest top-k is each shallower top-k, so one pass serves every request.
+            depth = max(top_k for _, top_k, _ in batch)
+            try:
+                ranked = await loop.run_in_executor(None, self.retrieval.search_matrix_many, [query for query, _, _ in batch], self.matrix, depth)
+            except Exception as exc:  # surfaced to every caller in the batch
+                self._batch = []
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            self._batch = []
+            self.batches += 1
+            for (_, top_k, future), results in zip(batch, ranked):
+                if not future.done():
+                    future.set_result(results[:top_k])
+            logger.debug("Query batch served", extra={"size": len(batch)})
+
+
+@dataclass
+class QueryServer:
+    """JSON-lines TCP front end: one request object per line, one response per line.
+
+    Requests carry either ``"variety_id"`` (a catalogue row) or ``"vector"``
+    (raw slot values) plus an optional ``"top_k"``.
+    """
+
+    batcher: QueryBatcher
+    config: ServerConfig = field(default_factory=ServerConfig)
+    _rows: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._rows = {str(variety_id): row for row, variety_id in enumerate(self.batcher.matrix.ids)}
+
+    @classmethod
+    def from_service(cls, service: ModelingService, csv_path: str) -> "QueryServer":
+        """Set up ``service`` and load the catalogue once; it stays in memory for every query."""
+
+        service._setup()
+        matrix = service.load_catalogue(csv_path)
+        config = service.similarity_config.server
+        return cls(QueryBatcher(service.retrieval_engine, matrix, config), config)
+
+    def _query(self, request: Dict[str, Any]) -> FeatureVector:
+        matrix = self.batcher.matrix
+        if "variety_id" in request:
+            variety_id = str(request["variety_id"])
+            if variety_id not in self._rows:
+                raise SimilarityError(f"unknown variety_id {variety_id}")
+            return matrix.vector(self._rows[variety_id])
+        values = np.asarray(request.get("vector", []), dtype=np.float64)
+        if values.shape != (matrix.width,):
+            raise SimilarityError(f"vector must have {matrix.width} values")
+        return FeatureVector(schema_id=matrix.schema_id, values=values.tolist(), mapping=list(matrix.mapping))
+
+    async def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one request; every failure becomes an ``{"error": ...}`` response, never an exception."""
+
+        try:
+            query = self._query(request)
+            top_k = int(request.get("top_k", 5))
+            if top_k < 1:
+                raise SimilarityError("top_k must be at least 1")
+            results = await self.batcher.submit(query, top_k)
+        except (SimilarityError, ValueError, TypeError) as exc:
+            return {"error": str(exc)}
+        except Exception as exc:  # keep the connection alive whatever the request did
+            logger.warning("Query failed", extra={"error": repr(exc)})
+            return {"error": f"internal error: {type(exc).__name__}"}
+        return {"results": [{"candidate_id": r.candidate_id, "score": r.score} for r in results]}
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+                    response = {"error": f"invalid JSON: {exc}"}
+                else:
+                    response = await self.handle(request) if isinstance(request, dict) else {"error": "request must be a JSON object"}
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            logger.debug("Client disconnected")
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def serve(self) -> None:
+        await self.batcher.start()
+        server = await asyncio.start_server(self._client, self.config.host, self.config.port)
+        logger.info("Query server listening", extra={"host": self.config.host, "port": self.config.port, "rows": len(self.batcher.matrix)})
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="鲜花品种相似度查询服务")
+    parser.add_argument("csv", help="Catalogue CSV loaded once at start-up")
+    parser.add_argument("--config-dir", default="configs", help="Configuration directory")
+    parser.add_argument("--storage", default="output", help="Storage directory for artifacts")
+    parser.add_argument("--port", type=int, help="Override server.port from similarity.yaml")
+    return parser
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    configure_logging()
+    service = ModelingService(
+        trait_schema_path=f"{args.config_dir}/trait_schema.yaml",
+        vector_schema_path=f"{args.config_dir}/vector_schema.yaml",
+        weights_path=f"{args.config_dir}/weights_default.yaml",
+        profile_rules_path=f"{args.config_dir}/profile_rules.yaml",
+        storage_dir=args.storage,
+        similarity_path=f"{args.config_dir}/similarity.yaml",
+    )
+    server = QueryServer.from_service(service, args.csv)
+    if args.port is not None:
+        server.config.port = args.port
+    asyncio.run(server.serve())
+
+
+__all__ = ["QueryBatcher", "QueryServer"]
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -3,44 +3,70 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
+
+from ..domain.models import FeatureVector
 from ..ingestion.importers import read_csv
 from ..ingestion.validators import batch_validate
 from ..normalization.pipeline import NormalizationPipeline
 from ..feature_engineering.vector_schema import VectorSchema
 from ..feature_engineering.vector_builder import VectorBuilder
-from ..weighting.constraints import WeightConstraints
 from ..weighting.manager import WeightManager
+from ..weighting.schemes import WeightConstraint
+from ..similarity.config import SimilarityConfig
 from ..similarity.engine import SimilarityEngine
-from ..similarity.retrieval import RetrievalEngine
+from ..similarity.index_base import VectorIndex
+from ..similarity.index_factory import build_updatable_index, can_open_index, open_updatable_index
+from ..similarity.pipeline import TwoStagePipeline
+from ..similarity.retrieval import RankedRows, RetrievalEngine
+from ..similarity.strategies import FusionConfig, SimilarityStrategy, encode_categories
 from ..similarity.explain import ExplanationBuilder
 from ..profiling.generator import ProfileGenerator
 from ..profiling.rules import ProfileRules
 from ..profiling.templates import NarrativeTemplates
 from ..storage.repo_file import FileRepository
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.io import ensure_dir
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Normalized record fields whose values form each variety's category set for ``jaccard``.
+CATEGORY_FIELDS = ("species", "flower_shape", "seasonality")
+
 
 @dataclass
 class ModelingService:
+    """Ingest, vectorize, profile and search a catalogue.
+
+    The retrieval index is only kept when something reads it: ``persist_index``
+    (``--save-index``) or a two-stage search with ``pipeline.coarse: index``.
+    """
+
     trait_schema_path: str
     vector_schema_path: str
     weights_path: str
     profile_rules_path: str
     storage_dir: str
+    similarity_path: Optional[str] = None
+    persist_index: bool = False
 
     def _setup(self) -> None:
         self.pipeline = NormalizationPipeline.default()
         self.vector_schema = VectorSchema.from_file(self.vector_schema_path)
         self.vector_builder = VectorBuilder(self.vector_schema)
-        constraint = WeightConstraints(min_weight=0.0, max_weight=1.0, normalization="l1")
-        self.weight_manager = WeightManager(constraint)
+        self.weight_manager = WeightManager(WeightConstraint(min_weight=0.0, max_weight=1.0))
         self.weight_scheme = self.weight_manager.load(self.weights_path)
-        self.similarity_engine = SimilarityEngine({"vector": 1.0})
-        self.retrieval_engine = RetrievalEngine(self.similarity_engine)
+        self.similarity_config = SimilarityConfig.from_file(self.similarity_path) if self.similarity_path else SimilarityConfig()
+        self.index: Optional[VectorIndex] = None
+        scheme = self.weight_scheme if self.similarity_config.metrics.get("vector") == "weighted_cosine" else None
+        self.similarity_engine = SimilarityEngine({"vector": 1.0}, weight_scheme=scheme)
+        self.retrieval_engine = RetrievalEngine(self.similarity_engine, index=self.index)
+        fusion = FusionConfig(weights=dict(self.similarity_config.fusion_weights), strategy=self.similarity_config.strategy)
+        self.two_stage = TwoStagePipeline(self.retrieval_engine, SimilarityStrategy(fusion), self.similarity_config.pipeline)
         self.profile_generator = ProfileGenerator(ProfileRules.from_file(self.profile_rules_path), NarrativeTemplates())
         self.repository = FileRepository(self.storage_dir)
         self.explainer = ExplanationBuilder()
@@ -52,26 +78,111 @@ class ModelingService:
         logger.info("Ingested varieties", extra={"count": len(validated)})
         return [v.to_record() for v in varieties]
 
+    def uses_index(self) -> bool:
+        pipeline = self.similarity_config.pipeline
+        return self.persist_index or (pipeline.enabled and pipeline.coarse == "index")
+
     def normalize_and_vectorize(self, records: List[Dict[str, str | float]]) -> List[Dict[str, object]]:
+        """Vectorize ``records`` and, when :meth:`uses_index`, upsert them so a corrected variety replaces its old vector."""
+
         normalized_records: List[Dict[str, object]] = []
+        latest: Dict[str, FeatureVector] = {}
         for record in records:
             normalized = self.pipeline.run(dict(record))
             vector = self.vector_builder.build(normalized)
             self.repository.save_vector(vector)
+            latest[str(normalized["variety_id"])] = vector
             normalized_records.append({"record": normalized, "vector": vector})
+        if latest and self.uses_index():
+            self._update_index(latest)
         return normalized_records
 
+    def _update_index(self, latest: Dict[str, FeatureVector]) -> None:
+        """Open the persisted (or empty incremental) index on first use, else build it from ``latest``; then upsert."""
+
+        config = self.similarity_config.index
+        if self.index is None and can_open_index(config):
+            self.index = open_updatable_index(config, self.vector_schema.schema_id)
+        if self.index is None:
+            # Trained backends (ivf/sq/pq) with nothing on disk are built from the first ingested catalogue.
+            ids = list(latest)
+            self.index = build_updatable_index(config, VectorMatrix.from_vectors([latest[i] for i in ids], ids=ids))
+        else:
+            for variety_id, vector in latest.items():
+                self.index.upsert(variety_id, vector)
+        self.retrieval_engine.index = self.index
+
+    def load_catalogue(self, csv_path: str) -> VectorMatrix:
+        """Ingest and vectorize ``csv_path`` once, packed as a matrix keyed by ``variety_id``."""
+
+        normalized = self.normalize_and_vectorize(self.ingest(csv_path))
+        ids = [str(item["record"]["variety_id"]) for item in normalized]
+        return VectorMatrix.from_vectors([item["vector"] for item in normalized], ids=ids)
+
     def search(self, query_vector: Dict[str, object], candidate_vectors: List[Dict[str, object]]) -> List[Dict[str, object]]:
+        """Rank candidates and explain each result against its own candidate, in one batch.
+
+        ``pipeline.enabled`` ranks with the two-stage coarse/fine fusion (and
+        takes precedence); otherwise ``diversity.enabled`` MMR-reranks the
+        cosine ranking.
+        """
+
         query = query_vector["vector"]
-        candidates = [item["vector"] for item in candidate_vectors]
-        results = self.retrieval_engine.search(query, candidates, top_k=5)
+        ids = [str(item.get("record", {}).get("variety_id", idx)) for idx, item in enumerate(candidate_vectors)]
+        matrix = VectorMatrix.from_vectors([item["vector"] for item in candidate_vectors], ids=ids)
+        diversity = self.similarity_config.diversity
+        top_k = self.similarity_config.top_k
+        if self.similarity_config.pipeline.enabled:
+            ranked = self._rank_two_stage(query_vector, candidate_vectors, matrix, top_k)
+        elif diversity.enabled:
+            ranked = self.retrieval_engine.rank_diverse(query, matrix, top_k=top_k, mmr_lambda=diversity.mmr_lambda, pool_size=diversity.pool_size)
+        else:
+            ranked = self.retrieval_engine.rank_matrix(query, matrix, top_k=top_k)
+        # Explain the exact rows that were ranked, scaled like the displayed scores.
+        breakdown = self.similarity_engine.explain_batch(
+            query, matrix, ranked.rows, top_features=self.similarity_config.top_features, normalizer=ranked.normalizer
+        )
         packaged: List[Dict[str, object]] = []
-        for res in results:
-            reasons = self.similarity_engine.explain(query, candidates[0])
-            explanation = self.explainer.build(res, reasons)
+        for row, res in enumerate(ranked.results):
+            explanation = self.explainer.build(res, breakdown.reasons(row))
             packaged.append({"result": res, "explanation": explanation})
         return packaged
 
+    def _rank_two_stage(
+        self, query_vector: Dict[str, object], candidate_vectors: List[Dict[str, object]], matrix: VectorMatrix, top_k: int
+    ) -> RankedRows:
+        """Two-stage ranking with colors and category sets taken from the normalized records."""
+
+        query_color, colors = self._record_colors(query_vector, candidate_vectors)
+        names, hot = encode_categories([self._record_categories(item) for item in [query_vector, *candidate_vectors]])
+        outcome = self.two_stage.run(query_vector["vector"], matrix, top_k, query_color, colors, hot[0], hot[1:])
+        logger.info("Two-stage search", extra={"report": outcome.report(), "categories": len(names)})
+        # Fused scores are not a cosine, so the vector contributions are explained unscaled.
+        return RankedRows(rows=outcome.rows, results=outcome.results)
+
+    @staticmethod
+    def _record_colors(query_vector: Dict[str, object], candidate_vectors: List[Dict[str, object]]) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        labs = [item.get("record", {}).get("color_primary") for item in [query_vector, *candidate_vectors]]
+        if any(lab is None for lab in labs):
+            return None, None
+        stacked = np.asarray(labs, dtype=np.float64).reshape(len(labs), 3)
+        return stacked[0], stacked[1:]
+
+    @staticmethod
+    def _record_categories(item: Dict[str, object]) -> set:
+        record = item.get("record", {})
+        return {str(record[name]) for name in CATEGORY_FIELDS if record.get(name) is not None}
+
+    def save_index(self) -> Optional[str]:
+        """Persist the retrieval index to ``index.path`` when one is configured."""
+
+        path = self.similarity_config.index.path
+        if not path or self.index is None:
+            return None
+        ensure_dir(Path(path).parent)
+        self.index.save(path)
+        return path
+
     def profile(self, normalized: List[Dict[str, object]]) -> List[Dict[str, object]]:
         outputs: List[Dict[str, object]] = []
         for item in normalized:
@@ -15,6 +15,9 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument("--config-dir", default="configs", help="Configuration directory")
     parser.add_argument("--storage", default="output", help="Storage directory for artifacts")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose logs")
+    parser.add_argument("--save-index", action="store_true", help="Persist the retrieval index to index.path from similarity.yaml")
+    parser.add_argument("--query", help="Print the varieties most similar to this variety_id")
+    parser.add_argument("--two-stage", action="store_true", help="Rank --query with the two-stage pipeline even if pipeline.enabled is false")
     return parser
 
 
@@ -28,11 +31,23 @@ def main(argv: List[str] | None = None) -> None:
         weights_path=f"{args.config_dir}/weights_default.yaml",
         profile_rules_path=f"{args.config_dir}/profile_rules.yaml",
         storage_dir=args.storage,
+        similarity_path=f"{args.config_dir}/similarity.yaml",
+        persist_index=args.save_index,
     )
     service._setup()
+    if args.two_stage:
+        service.similarity_config.pipeline.enabled = True
     records = service.ingest(args.csv)
     normalized = service.normalize_and_vectorize(records)
     service.profile(normalized)
+    if args.save_index:
+        service.save_index()
+    if args.query:
+        matches = [item for item in normalized if str(item["record"]["variety_id"]) == args.query]
+        if not matches:
+            parser.error(f"variety {args.query} is not in {args.csv}")
+        for item in service.search(matches[0], normalized):
+            print(f"{item['result'].candidate_id}\t{item['result'].score:.4f}\t{item['explanation']}")
 
 
 if __name__ == "__main__":  # pragma: no cover
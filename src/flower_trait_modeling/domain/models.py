@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import math
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional
 
@@ -68,11 +69,37 @@ class FlowerVariety:
 
 @dataclass
 class FeatureVector:
-    """Container for feature vector and schema id."""
+    """Container for feature vector and schema id.
+
+    The Euclidean norm is cached after first use. Code that changes
+    ``values`` (reassigned or in place) must call :meth:`invalidate`, which
+    drops the cache and bumps ``version`` for caches kept elsewhere.
+    """
 
     schema_id: str
     values: List[float]
     mapping: List[str]
+    version: int = field(default=0, init=False, compare=False)
+    _norm: Optional[float] = field(default=None, init=False, repr=False, compare=False)
+
+    def invalidate(self) -> None:
+        """Mark ``values`` as changed."""
+
+        self._norm = None
+        self.version += 1
+
+    def norm(self) -> float:
+        """Euclidean norm of ``values``, ``1.0`` for a zero vector as in ``metrics.cosine``."""
+
+        if self._norm is None:
+            self._norm = math.sqrt(sum(x * x for x in self.values)) or 1.0
+        return self._norm
+
+    def unit_values(self) -> List[float]:
+        """Values divided by :meth:`norm`."""
+
+        norm = self.norm()
+        return [x / norm for x in self.values]
 
     def ensure_dimension(self, expected: int) -> None:
         """Validate dimension size."""
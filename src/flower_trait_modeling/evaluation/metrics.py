@@ -19,6 +19,15 @@ def precision_at_k(relevants: List[str], retrieved: List[str], k: int = 5) -> fl
     return score
 
 
+def recall_at_k(exact: List[str], retrieved: List[str], k: int = 5) -> float:
+    """Share of the exact top-``k`` that the approximate top-``k`` recovered."""
+
+    truth = set(exact[:k])
+    score = len(truth & set(retrieved[:k])) / (len(truth) or 1)
+    logger.debug("Recall@k computed", extra={"score": score})
+    return score
+
+
 def coverage(expected: List[str], retrieved: List[str]) -> float:
     intersection = len(set(expected) & set(retrieved))
     score = intersection / (len(expected) or 1)
@@ -37,4 +46,4 @@ class ConsistencyReport:
         return cls(cosine=sim_metrics.cosine(a, b), jaccard=0.0, delta_e=0.0)
 
 
-__all__ = ["precision_at_k", "coverage", "ConsistencyReport"]
+__all__ = ["precision_at_k", "recall_at_k", "coverage", "ConsistencyReport"]
@@ -0,0 +1,94 @@
+"""Recall-versus-memory evaluation of approximate indexes against exact search."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import List, Sequence
+
+from .metrics import recall_at_k
+from ..domain.models import FeatureVector
+from ..similarity.index_base import VectorIndex
+from ..similarity.index_flat import FlatIndex
+from ..similarity.index_pq import PQIndex
+from ..similarity.index_sq import ScalarQuantizedIndex
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class RecallPoint:
+    setting: str
+    recall: float
+    bytes_per_vector: float
+
+
+@dataclass
+class RecallReport:
+    k: int
+    points: List[RecallPoint] = field(default_factory=list)
+
+    def as_markdown(self) -> str:
+        lines = [f"| Setting | Recall@{self.k} | Bytes/vector |", "| --- | --- | --- |"]
+        for point in self.points:
+            lines.append(f"| {point.setting} | {point.recall:.3f} | {point.bytes_per_vector:.1f} |")
+        return "\n".join(lines)
+
+
+def evaluate_index(setting: str, index: VectorIndex, matrix: VectorMatrix, queries: Sequence[FeatureVector], k: int = 10) -> RecallPoint:
+    """Mean recall@k of ``index`` against exact cosine search over ``matrix``.
+
+    Memory is the index's resident ``nbytes`` when it reports one, else the
+    float64 matrix.
+    """
+
+    exact = FlatIndex.from_matrix(matrix)
+    recalls = [
+        recall_at_k([r.candidate_id for r in exact.search(query, k)], [r.candidate_id for r in index.search(query, k)], k)
+        for query in queries
+    ]
+    nbytes = getattr(index, "nbytes", matrix.values.nbytes)
+    point = RecallPoint(setting=setting, recall=sum(recalls) / (len(recalls) or 1), bytes_per_vector=nbytes / max(1, len(matrix)))
+    logger.info("Recall evaluated", extra={"setting": setting, "recall": point.recall, "bytes_per_vector": point.bytes_per_vector})
+    return point
+
+
+def scalar_quantization_report(
+    matrix: VectorMatrix,
+    queries: Sequence[FeatureVector],
+    k: int = 10,
+    dtypes: Sequence[str] = ("int8", "float16"),
+    reranks: Sequence[int] = (1, 2, 4),
+) -> RecallReport:
+    """Recall@k of every ``dtype x rerank`` setting, with float64 as the reference row."""
+
+    report = RecallReport(k=k, points=[RecallPoint("float64", 1.0, float(matrix.values.nbytes) / max(1, len(matrix)))])
+    for dtype in dtypes:
+        index = ScalarQuantizedIndex.build(matrix, dtype=dtype)
+        for rerank in reranks:
+            index.rerank = rerank
+            report.points.append(evaluate_index(f"{dtype} rerank x{rerank}", index, matrix, queries, k))
+    return report
+
+
+def product_quantization_report(
+    matrix: VectorMatrix,
+    queries: Sequence[FeatureVector],
+    k: int = 10,
+    subspaces: Sequence[int] = (2, 4, 8),
+    centroids: int = 256,
+    seed: int = 0,
+) -> RecallReport:
+    """Recall@k against bytes per vector for each subspace count (one ``uint8`` code per subspace)."""
+
+    report = RecallReport(k=k, points=[RecallPoint("float64", 1.0, float(matrix.values.nbytes) / max(1, len(matrix)))])
+    for count in subspaces:
+        if count > matrix.width:
+            continue
+        index = PQIndex.build(matrix, subspaces=count, centroids=centroids, seed=seed)
+        report.points.append(evaluate_index(f"pq m={count} k*={centroids}", index, matrix, queries, k))
+    return report
+
+
+__all__ = ["RecallPoint", "RecallReport", "evaluate_index", "scalar_quantization_report", "product_quantization_report"]
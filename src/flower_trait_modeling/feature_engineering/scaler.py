@@ -5,6 +5,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List
 
+from ..domain.models import FeatureVector
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -23,6 +24,13 @@ class VectorScaler:
             return self._max_abs(values)
         return values
 
+    def scale_vector(self, vector: FeatureVector) -> FeatureVector:
+        """Scale ``vector`` in place and invalidate its cached norm."""
+
+        vector.values = self.scale(vector.values)
+        vector.invalidate()
+        return vector
+
     def _unit_scale(self, values: List[float]) -> List[float]:
         import math
 
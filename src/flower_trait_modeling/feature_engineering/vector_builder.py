@@ -45,7 +45,8 @@ class VectorBuilder:
         if dtype == "ordinal":
             return encoders.ordinal(float(value), len(config.get("order", [])))
         if dtype == "cyclical":
-            return encoders.passthrough(float(value))
+            positions = config.get("mapping") or {}
+            return encoders.passthrough(float(positions.get(str(value), value)))  # type: ignore[union-attr]
         raise ValidationError(dtype, "unknown dimension type")
 
 
@@ -24,6 +24,8 @@ class Dimension:
             return len(self.config.get("vocab", []))
         if self.type == "color_lab":
             return 3
+        if self.type == "ordinal":
+            return len(self.config.get("order", []))
         return 1
 
 
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from typing import Any
 
 from ..utils.errors import NormalizationError
@@ -11,14 +12,12 @@ from ..utils.logging import get_logger
 logger = get_logger(__name__)
 
 
+@dataclass
 class Normalizer(ABC):
-    """Abstract normalizer contract."""
+    """Abstract normalizer contract; dataclass subclasses take ``field`` first."""
 
     field: str
 
-    def __init__(self, field: str) -> None:
-        self.field = field
-
     @abstractmethod
     def normalize(self, value: Any) -> Any:
         """Normalize incoming value and return normalized representation."""
@@ -17,11 +17,13 @@ class ColorNormalizer(Normalizer):
         raw = str(value).strip()
         if not raw:
             raise ValidationError(self.field, "color string is empty")
-        rgb = self._parse_hex(raw)
-        return self._rgb_to_lab(rgb)
+        rgb = self.parse_hex(raw)
+        return self.rgb_to_lab(rgb)
 
     @staticmethod
-    def _parse_hex(raw: str) -> Tuple[int, int, int]:
+    def parse_hex(raw: str) -> Tuple[int, int, int]:
+        """``"#rgb"`` or ``"#rrggbb"`` (``#`` optional) as an RGB triple."""
+
         text = raw.lstrip("#")
         if len(text) not in (3, 6):
             raise ValidationError("color", "hex length must be 3 or 6")
@@ -36,7 +38,9 @@ class ColorNormalizer(Normalizer):
         return r, g, b
 
     @staticmethod
-    def _rgb_to_lab(rgb: Tuple[int, int, int]) -> Tuple[float, float, float]:
+    def rgb_to_lab(rgb: Tuple[int, int, int]) -> Tuple[float, float, float]:
+        """The LAB-like triple :meth:`normalize` returns; shared with the color index."""
+
         # Simplified conversion; precision is not critical for documentation.
         r, g, b = [channel / 255.0 for channel in rgb]
         x = r * 0.4124 + g * 0.3576 + b * 0.1805
@@ -0,0 +1,150 @@
+"""Blocked all-pairs similarity job that streams tile results to disk."""
+
+from __future__ import annotations
+
+import csv
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional, Tuple
+
+import numpy as np
+
+from .config import SimilarityConfig
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import SimilarityError
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+_FLOAT_BYTES = 8
+# Per tile cell: the scores, their masked copy and the mask / ``nonzero`` scratch.
+_TILE_COPIES = 3
+# Top-k mode merges each tile with the running best lists into a ``(block, block + top_k)``
+# buffer: merged scores, merged columns, the negated sort key, ``lexsort``'s index
+# scratch and its result (counted twice for numpy's internal copy).
+_MERGE_COPIES = 6
+# Plus the old and new ``(block, top_k)`` best score and column lists.
+_BEST_COPIES = 4
+
+
+@dataclass
+class AllPairsSummary:
+    rows: int
+    block: int
+    tiles: int
+    pairs_written: int
+    path: Path
+
+
+@dataclass
+class AllPairsJob:
+    """Variety-by-variety cosine computed as ``block x block`` tiles of unit-row products.
+
+    Exactly one of ``top_k`` (best neighbours per row) or ``threshold`` (every
+    unordered pair at or above it, written once) selects the output. The tile edge is sized so one
+    score tile fits ``memory_budget_mb``; the n x n matrix is never held.
+    """
+
+    memory_budget_mb: float = 256.0
+    top_k: Optional[int] = None
+    threshold: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        if (self.top_k is None) == (self.threshold is None):
+            raise SimilarityError("set exactly one of top_k or threshold")
+        if self.memory_budget_mb <= 0:
+            raise SimilarityError("memory_budget_mb must be positive")
+
+    @classmethod
+    def from_config(cls, config: SimilarityConfig, memory_budget_mb: float = 256.0) -> "AllPairsJob":
+        """Threshold job using ``fusion.threshold`` from ``similarity.yaml``."""
+
+        return cls(memory_budget_mb=memory_budget_mb, threshold=config.threshold)
+
+    def block_size(self, rows: int) -> int:
+        """Largest tile edge whose score tile and, in top-k mode, merge scratch fit ``memory_budget_mb``."""
+
+        budget = self.memory_budget_mb * 1024 * 1024
+        # Bytes per tile are ``quadratic * block**2 + linear * block``.
+        quadratic = _FLOAT_BYTES * _TILE_COPIES
+        linear = 0.0
+        if self.top_k is not None:
+            quadratic += _FLOAT_BYTES * _MERGE_COPIES
+            linear = _FLOAT_BYTES * (_MERGE_COPIES + _BEST_COPIES) * self.top_k
+        block = (math.sqrt(linear * linear + 4.0 * quadratic * budget) - linear) / (2.0 * quadratic)
+        return max(1, min(rows, int(block)))
+
+    def _tiles(self, units: np.ndarray, block: int, upper_only: bool) -> Iterator[Tuple[int, int, np.ndarray]]:
+        n = units.shape[0]
+        for start in range(0, n, block):
+            for col in range(start if upper_only else 0, n, block):
+                yield start, col, units[start : start + block] @ units[col : col + block].T
+
+    def run(self, matrix: VectorMatrix, path: str | Path) -> AllPairsSummary:
+        target = Path(path)
+        units = matrix.unit_values
+        block = self.block_size(len(matrix))
+        with target.open("w", encoding="utf-8", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(["query_id", "candidate_id", "score"])
+            if self.threshold is not None:
+                tiles, written = self._run_threshold(units, matrix.ids, block, writer)
+            else:
+                tiles, written = self._run_top_k(units, matrix.ids, block, writer)
+        summary = AllPairsSummary(rows=len(matrix), block=block, tiles=tiles, pairs_written=written, path=target)
+        logger.info("All-pairs job finished", extra={"rows": summary.rows, "tiles": tiles, "pairs": written})
+        return summary
+
+    def _run_threshold(self, units: np.ndarray, ids: np.ndarray, block: int, writer: Any) -> Tuple[int, int]:
+        tiles = written = 0
+        for start, col, scores in self._tiles(units, block, upper_only=True):
+            tiles += 1
+            if start == col:
+                scores = np.where(np.triu(np.ones(scores.shape, dtype=bool), k=1), scores, -np.inf)
+            rows, cols = np.nonzero(scores >= self.threshold)
+            for r, c in zip(rows.tolist(), cols.tolist()):
+                writer.writerow([ids[start + r], ids[col + c], f"{scores[r, c]:.6f}"])
+            written += rows.size
+        return tiles, written
+
+    def neighbor_blocks(self, units: np.ndarray, block: int) -> Iterator[Tuple[int, np.ndarray, np.ndarray, int]]:
+        """Per ``block`` of rows: ``(start, scores, cols, tiles)`` of each row's ``top_k`` best other rows.
+
+        Rows are ordered by descending score, ties by column; when fewer than
+        ``top_k`` other rows exist the tail is ``-inf`` with column ``n``.
+        """
+
+        k = int(self.top_k or 0)
+        n = units.shape[0]
+        for start in range(0, n, block):
+            height = min(block, n - start)
+            best_scores = np.full((height, k), -np.inf)
+            best_cols = np.full((height, k), n, dtype=np.intp)
+            tiles = 0
+            for col in range(0, n, block):
+                scores = units[start : start + height] @ units[col : col + block].T
+                tiles += 1
+                cols = np.broadcast_to(np.arange(col, col + scores.shape[1]), scores.shape)
+                scores = np.where(cols == np.arange(start, start + height)[:, None], -np.inf, scores)
+                merged_scores = np.concatenate([best_scores, scores], axis=1)
+                merged_cols = np.concatenate([best_cols, cols], axis=1)
+                order = np.lexsort((merged_cols, -merged_scores), axis=1)[:, :k]
+                best_scores = np.take_along_axis(merged_scores, order, axis=1)
+                best_cols = np.take_along_axis(merged_cols, order, axis=1)
+            yield start, best_scores, best_cols, tiles
+
+    def _run_top_k(self, units: np.ndarray, ids: np.ndarray, block: int, writer: Any) -> Tuple[int, int]:
+        tiles = written = 0
+        for start, best_scores, best_cols, block_tiles in self.neighbor_blocks(units, block):
+            tiles += block_tiles
+            for r in range(best_scores.shape[0]):
+                for score, c in zip(best_scores[r].tolist(), best_cols[r].tolist()):
+                    if score == -np.inf:
+                        break
+                    writer.writerow([ids[start + r], ids[c], f"{score:.6f}"])
+                    written += 1
+        return tiles, written
+
+
+__all__ = ["AllPairsJob", "AllPairsSummary"]
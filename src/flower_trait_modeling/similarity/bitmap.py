@@ -0,0 +1,129 @@
+"""Bitmap index over categorical traits and the filter expressions it resolves."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..utils.errors import SimilarityError
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+CATEGORICAL_TRAITS = ("species", "flower_shape", "fragrance", "seasonality")
+
+
+@dataclass
+class BitmapIndex:
+    """One packed bitset per ``(trait, value)``; bit ``i`` refers to catalogue row ``i``."""
+
+    size: int
+    bitmaps: Dict[str, Dict[str, np.ndarray]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, records: Sequence[Mapping[str, object]], fields: Sequence[str] = CATEGORICAL_TRAITS) -> "BitmapIndex":
+        """Index ``records`` in catalogue order; values are compared as strings."""
+
+        index = cls(size=len(records))
+        for name in fields:
+            column = np.array([str(record.get(name, "")) for record in records])
+            values, inverse = np.unique(column, return_inverse=True)
+            index.bitmaps[name] = {str(value): np.packbits(inverse == code) for code, value in enumerate(values)}
+        logger.info("Bitmap index built", extra={"rows": index.size, "fields": list(fields)})
+        return index
+
+    def empty(self) -> np.ndarray:
+        return np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def full(self) -> np.ndarray:
+        return np.packbits(np.ones(self.size, dtype=bool))
+
+    def bitmap(self, name: str, value: object) -> np.ndarray:
+        if name not in self.bitmaps:
+            raise SimilarityError(f"field {name} is not bitmap-indexed")
+        return self.bitmaps[name].get(str(value), self.empty())
+
+    def rows(self, bits: np.ndarray) -> np.ndarray:
+        """Row positions whose bit is set, ascending."""
+
+        return np.flatnonzero(np.unpackbits(bits, count=self.size))
+
+    def select(self, expression: "FilterLike") -> np.ndarray:
+        return self.rows(as_expression(expression).evaluate(self))
+
+
+@dataclass(frozen=True)
+class Eq:
+    field: str
+    value: object
+
+    def evaluate(self, index: BitmapIndex) -> np.ndarray:
+        return index.bitmap(self.field, self.value)
+
+
+@dataclass(frozen=True)
+class In:
+    field: str
+    values: Tuple[object, ...]
+
+    def evaluate(self, index: BitmapIndex) -> np.ndarray:
+        bits = index.empty()
+        for value in self.values:
+            bits = bits | index.bitmap(self.field, value)
+        return bits
+
+
+@dataclass(frozen=True)
+class And:
+    terms: Tuple["FilterExpression", ...]
+
+    def evaluate(self, index: BitmapIndex) -> np.ndarray:
+        bits = index.full()
+        for term in self.terms:
+            bits = bits & term.evaluate(index)
+        return bits
+
+
+@dataclass(frozen=True)
+class Or:
+    terms: Tuple["FilterExpression", ...]
+
+    def evaluate(self, index: BitmapIndex) -> np.ndarray:
+        bits = index.empty()
+        for term in self.terms:
+            bits = bits | term.evaluate(index)
+        return bits
+
+
+@dataclass(frozen=True)
+class Not:
+    term: "FilterExpression"
+
+    def evaluate(self, index: BitmapIndex) -> np.ndarray:
+        return index.full() & ~self.term.evaluate(index)
+
+
+FilterExpression = Union[Eq, In, And, Or, Not]
+FilterLike = Union[FilterExpression, Mapping[str, object]]
+
+
+def as_expression(spec: FilterLike) -> FilterExpression:
+    """Accept an expression or a mapping such as ``{"species": "rose", "seasonality": ["summer", "all"]}``.
+
+    Mapping entries are AND-ed; list values are OR-ed within their field.
+    """
+
+    if not isinstance(spec, Mapping):
+        return spec
+    terms = []
+    for name, value in spec.items():
+        if isinstance(value, (list, tuple, set)):
+            terms.append(In(name, tuple(value)))
+        else:
+            terms.append(Eq(name, value))
+    return And(tuple(terms))
+
+
+__all__ = ["CATEGORICAL_TRAITS", "BitmapIndex", "Eq", "In", "And", "Or", "Not", "FilterExpression", "FilterLike", "as_expression"]
@@ -0,0 +1,141 @@
+"""KD-tree over LAB color triples for nearest-color and ΔE-radius queries."""
+
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+from typing import List, Mapping, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..normalization.color import ColorNormalizer
+from ..utils.errors import SimilarityError
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+ColorLike = Union[str, Sequence[float]]
+
+
+def as_lab(color: ColorLike) -> np.ndarray:
+    """A hex string (``"#d02050"``) through :class:`ColorNormalizer`, or a LAB triple as-is."""
+
+    if isinstance(color, str):
+        color = ColorNormalizer.rgb_to_lab(ColorNormalizer.parse_hex(color.strip()))
+    lab = np.asarray(color, dtype=np.float64)
+    if lab.shape != (3,):
+        raise SimilarityError("a color must be a hex string or a LAB triple")
+    return lab
+
+
+@dataclass
+class ColorIndex:
+    """Static KD-tree laid out in one array; every subtree is a contiguous slice.
+
+    The node of slice ``[lo, hi)`` is its median ``mid``, split on ``axes[mid]``;
+    slices of at most ``leaf_size`` points are scanned directly. Distances are
+    Euclidean in LAB, i.e. the ``delta_e`` of :mod:`metrics`.
+    """
+
+    ids: np.ndarray  # catalogue order
+    points: np.ndarray  # tree order; ``rows`` maps back to the catalogue
+    rows: np.ndarray
+    axes: np.ndarray
+    leaf_size: int = 16
+
+    @classmethod
+    def build(cls, labs: Sequence[Sequence[float]], ids: Sequence[str] | None = None, leaf_size: int = 16) -> "ColorIndex":
+        points = np.array(labs, dtype=np.float64).reshape(-1, 3)
+        rows = np.arange(points.shape[0])
+        axes = np.zeros(points.shape[0], dtype=np.int8)
+        stack = [(0, points.shape[0])]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= leaf_size:
+                continue
+            axis = int(np.argmax(np.ptp(points[lo:hi], axis=0)))
+            mid = (lo + hi) // 2
+            order = np.argpartition(points[lo:hi, axis], mid - lo)
+            points[lo:hi] = points[lo:hi][order]
+            rows[lo:hi] = rows[lo:hi][order]
+            axes[mid] = axis
+            stack.extend([(lo, mid), (mid + 1, hi)])
+        row_ids = np.asarray(list(ids) if ids is not None else [str(idx) for idx in range(points.shape[0])], dtype=str)
+        index = cls(ids=row_ids, points=points, rows=rows, axes=axes, leaf_size=leaf_size)
+        logger.info("Color index built", extra={"rows": points.shape[0], "leaf_size": leaf_size})
+        return index
+
+    @classmethod
+    def from_records(cls, records: Sequence[Mapping[str, object]], field: str = "color_primary", leaf_size: int = 16) -> "ColorIndex":
+        """Index ``records`` in catalogue order; values may be hex strings or normalized LAB triples."""
+
+        labs = [as_lab(record[field]) for record in records]  # type: ignore[arg-type]
+        ids = [str(record.get("variety_id", idx)) for idx, record in enumerate(records)]
+        return cls.build(labs, ids, leaf_size)
+
+    def __len__(self) -> int:
+        return self.points.shape[0]
+
+    def nearest_rows(self, color: ColorLike, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Catalogue rows of the ``k`` closest colors and their ΔE, closest first (ties by row)."""
+
+        lab = as_lab(color)
+        # Max-heap on (distance, row) through negation; the root is the current worst.
+        best: List[Tuple[float, int]] = []
+
+        def offer(lo: int, hi: int) -> None:
+            distances = np.sqrt(((self.points[lo:hi] - lab) ** 2).sum(axis=1))
+            for distance, row in zip(distances.tolist(), self.rows[lo:hi].tolist()):
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, -row))
+                elif (distance, row) < (-best[0][0], -best[0][1]):
+                    heapq.heapreplace(best, (-distance, -row))
+
+        def visit(lo: int, hi: int) -> None:
+            if hi - lo <= self.leaf_size:
+                offer(lo, hi)
+                return
+            mid = (lo + hi) // 2
+            gap = lab[self.axes[mid]] - self.points[mid, self.axes[mid]]
+            near, far = ((lo, mid), (mid + 1, hi)) if gap < 0 else ((mid + 1, hi), (lo, mid))
+            visit(*near)
+            offer(mid, mid + 1)
+            if len(best) < k or abs(gap) <= -best[0][0]:
+                visit(*far)
+
+        if k > 0 and len(self):
+            visit(0, len(self))
+        ranked = sorted((-distance, -row) for distance, row in best)
+        return np.array([row for _, row in ranked], dtype=np.intp), np.array([distance for distance, _ in ranked])
+
+    def within_rows(self, color: ColorLike, radius: float) -> np.ndarray:
+        """Ascending catalogue rows whose ΔE to ``color`` is at most ``radius``."""
+
+        lab = as_lab(color)
+        hits: List[np.ndarray] = []
+        stack = [(0, len(self))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= self.leaf_size:
+                distances = np.sqrt(((self.points[lo:hi] - lab) ** 2).sum(axis=1))
+                hits.append(self.rows[lo:hi][distances <= radius])
+                continue
+            mid = (lo + hi) // 2
+            gap = lab[self.axes[mid]] - self.points[mid, self.axes[mid]]
+            if float(np.sqrt(((self.points[mid] - lab) ** 2).sum())) <= radius:
+                hits.append(self.rows[mid : mid + 1])
+            if gap >= -radius:
+                stack.append((mid + 1, hi))
+            if gap <= radius:
+                stack.append((lo, mid))
+        return np.sort(np.concatenate(hits)) if hits else np.empty(0, dtype=np.intp)
+
+    def nearest(self, color: ColorLike, k: int = 5) -> List[Tuple[str, float]]:
+        rows, distances = self.nearest_rows(color, k)
+        return [(str(self.ids[row]), float(distance)) for row, distance in zip(rows.tolist(), distances.tolist())]
+
+    def within(self, color: ColorLike, radius: float) -> List[str]:
+        return [str(self.ids[row]) for row in self.within_rows(color, radius).tolist()]
+
+
+__all__ = ["ColorLike", "ColorIndex", "as_lab"]
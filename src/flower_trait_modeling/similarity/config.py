@@ -0,0 +1,143 @@
+"""Typed view of ``configs/similarity.yaml``."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from ..utils.errors import ConfigurationError
+from ..utils.io import read_yaml
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_BACKENDS = ("flat", "ivf", "hnsw", "lsh", "sq", "pq")
+PIPELINE_COARSE = ("matrix", "index")
+PIPELINE_METRICS = ("vector", "color", "categorical")
+
+
+@dataclass
+class IndexConfig:
+    """Retrieval backend selection plus the option block for that backend."""
+
+    backend: str = "flat"
+    path: Optional[str] = None
+    options: Dict[str, object] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if self.backend not in INDEX_BACKENDS:
+            raise ConfigurationError(f"Unknown index backend {self.backend}", {"allowed": list(INDEX_BACKENDS)})
+
+
+@dataclass
+class ServerConfig:
+    """Listening address and micro-batching limits for the query server."""
+
+    host: str = "127.0.0.1"
+    port: int = 8765
+    batch_size: int = 32
+    max_wait_ms: float = 5.0
+    queue_depth: int = 1024
+
+    def __post_init__(self) -> None:
+        if self.batch_size < 1 or self.queue_depth < 1 or self.max_wait_ms < 0:
+            raise ConfigurationError("Invalid server limits", {"batch_size": self.batch_size, "queue_depth": self.queue_depth, "max_wait_ms": self.max_wait_ms})
+
+
+@dataclass
+class DiversityConfig:
+    """Maximal-marginal-relevance rerank: ``mmr_lambda`` trades relevance (1.0) against diversity (0.0).
+
+    Off unless ``enabled``; searches otherwise keep plain relevance order.
+    """
+
+    enabled: bool = False
+    mmr_lambda: float = 0.7
+    pool_size: int = 50
+
+    def __post_init__(self) -> None:
+        if not 0.0 <= self.mmr_lambda <= 1.0 or self.pool_size < 1:
+            raise ConfigurationError("Invalid diversity settings", {"mmr_lambda": self.mmr_lambda, "pool_size": self.pool_size})
+
+
+@dataclass
+class PipelineConfig:
+    """Two-stage retrieval: ``coarse_metric`` shortlist of ``shortlist`` rows, re-scored by ``fine_metrics`` fusion.
+
+    Off unless ``enabled``; an attached index (``coarse: index``) can only
+    shortlist by the ``vector`` metric.
+    """
+
+    enabled: bool = False
+    shortlist: int = 100
+    coarse: str = "matrix"
+    coarse_metric: str = "vector"
+    fine_metrics: Tuple[str, ...] = PIPELINE_METRICS
+
+    def __post_init__(self) -> None:
+        self.fine_metrics = tuple(self.fine_metrics)
+        coarse_ok = self.coarse in PIPELINE_COARSE and self.coarse_metric in PIPELINE_METRICS
+        if self.coarse == "index" and self.coarse_metric != "vector":
+            coarse_ok = False
+        if self.shortlist < 1 or not coarse_ok or not self.fine_metrics or not set(self.fine_metrics) <= set(PIPELINE_METRICS):
+            raise ConfigurationError(
+                "Invalid pipeline settings",
+                {
+                    "shortlist": self.shortlist,
+                    "coarse": self.coarse,
+                    "coarse_metric": self.coarse_metric,
+                    "fine_metrics": list(self.fine_metrics),
+                    "allowed": list(PIPELINE_METRICS),
+                },
+            )
+
+
+@dataclass
+class SimilarityConfig:
+    metrics: Dict[str, str] = field(default_factory=dict)
+    strategy: str = "weighted_sum"
+    fusion_weights: Dict[str, float] = field(default_factory=dict)
+    threshold: float = 0.65
+    top_k: int = 5
+    top_features: int = 3
+    index: IndexConfig = field(default_factory=IndexConfig)
+    server: ServerConfig = field(default_factory=ServerConfig)
+    diversity: DiversityConfig = field(default_factory=DiversityConfig)
+    pipeline: PipelineConfig = field(default_factory=PipelineConfig)
+
+    @classmethod
+    def from_file(cls, path: str) -> "SimilarityConfig":
+        data = read_yaml(path)
+        fusion = data.get("fusion", {})
+        explainability = data.get("explainability", {})
+        index_data = data.get("index", {})
+        backend = index_data.get("backend", "flat")
+        diversity = data.get("diversity") or {}
+        pipeline = data.get("pipeline") or {}
+        config = cls(
+            metrics=dict(data.get("metrics", {})),
+            strategy=fusion.get("strategy", "weighted_sum"),
+            fusion_weights={name: float(weight) for name, weight in (fusion.get("weights") or {}).items()},
+            threshold=float(fusion.get("threshold", 0.65)),
+            top_k=int(fusion.get("top_k", 5)),
+            top_features=int(explainability.get("top_features", 3)),
+            index=IndexConfig(backend=backend, path=index_data.get("path"), options=dict(index_data.get(backend) or {})),
+            server=ServerConfig(**dict(data.get("server") or {})),
+            diversity=DiversityConfig(
+                enabled=bool(diversity.get("enabled", False)),
+                mmr_lambda=float(diversity.get("lambda", 0.7)),
+                pool_size=int(diversity.get("pool_size", 50)),
+            ),
+            pipeline=PipelineConfig(
+                enabled=bool(pipeline.get("enabled", False)),
+                shortlist=int(pipeline.get("shortlist", 100)),
+                coarse=pipeline.get("coarse", "matrix"),
+                coarse_metric=pipeline.get("coarse_metric", "vector"),
+                fine_metrics=tuple(pipeline.get("fine_metrics", PIPELINE_METRICS)),
+            ),
+        )
+        logger.debug("Similarity config loaded", extra={"backend": backend})
+        return config
+
+
+__all__ = ["INDEX_BACKENDS", "PIPELINE_COARSE", "PIPELINE_METRICS", "DiversityConfig", "IndexConfig", "PipelineConfig", "ServerConfig", "SimilarityConfig"]
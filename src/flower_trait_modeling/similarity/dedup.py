@@ -0,0 +1,165 @@
+"""Threshold near-duplicate clustering with union-find over pruned candidate pairs."""
+
+from __future__ import annotations
+
+import csv
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from .config import SimilarityConfig
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import SimilarityError
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Absorbs rounding in the projections so boundary pairs are never pruned.
+_BOUND_SLACK = 1e-9
+# A float64 score plus the boolean masks built alongside it, per tile cell.
+_CELL_BYTES = 16
+
+
+class UnionFind:
+    """Disjoint sets over ``0..size-1`` with path halving and union by size."""
+
+    def __init__(self, size: int) -> None:
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> bool:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return True
+
+
+@dataclass
+class ClusterTable:
+    """``variety_id -> cluster_id``; a cluster is named after its first member in catalogue order."""
+
+    assignments: Dict[str, str] = field(default_factory=dict)
+    pairs_evaluated: int = 0
+    pairs_matched: int = 0
+
+    def members(self, cluster_id: str) -> List[str]:
+        return [variety_id for variety_id, cluster in self.assignments.items() if cluster == cluster_id]
+
+    def duplicates(self) -> Dict[str, List[str]]:
+        """Clusters holding more than one variety."""
+
+        groups: Dict[str, List[str]] = {}
+        for variety_id, cluster in self.assignments.items():
+            groups.setdefault(cluster, []).append(variety_id)
+        return {cluster: members for cluster, members in groups.items() if len(members) > 1}
+
+    def to_csv(self, path: str | Path) -> Path:
+        target = Path(path)
+        sizes: Dict[str, int] = {}
+        for cluster in self.assignments.values():
+            sizes[cluster] = sizes.get(cluster, 0) + 1
+        with target.open("w", encoding="utf-8", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(["variety_id", "cluster_id", "cluster_size"])
+            for variety_id, cluster in self.assignments.items():
+                writer.writerow([variety_id, cluster, sizes[cluster]])
+        logger.info("Wrote cluster table", extra={"path": str(target), "rows": len(self.assignments)})
+        return target
+
+
+@dataclass
+class DuplicateClusterer:
+    """Group varieties whose cosine is at least ``threshold`` into connected components.
+
+    For unit vectors ``u . v >= t`` implies ``|u . p - v . p| <= sqrt(2 - 2t)``
+    for any unit pivot ``p``. Rows are sorted by their projection on the mean
+    direction and each row is compared only with the window of later rows
+    inside that bound, so no qualifying pair is skipped.
+
+    The bound only prunes when the radius is small next to the spread of the
+    projections: about 0.14 at ``t = 0.99`` but 0.84 at ``t = 0.65``, where
+    the window covers most of the catalogue and the cost approaches a full
+    all-pairs scan. Tiles are ``block`` rows by at most :meth:`tile_width`
+    columns, so memory stays within ``memory_budget_mb`` at any threshold.
+    """
+
+    threshold: float
+    block: int = 512
+    memory_budget_mb: float = 256.0
+
+    def __post_init__(self) -> None:
+        if not -1.0 <= self.threshold <= 1.0:
+            raise SimilarityError("threshold must lie in [-1, 1]")
+        if self.block < 1:
+            raise SimilarityError("block must be at least 1")
+        if self.memory_budget_mb <= 0:
+            raise SimilarityError("memory_budget_mb must be positive")
+
+    @classmethod
+    def from_config(cls, config: SimilarityConfig, memory_budget_mb: float = 256.0) -> "DuplicateClusterer":
+        return cls(threshold=config.threshold, memory_budget_mb=memory_budget_mb)
+
+    def tile_width(self) -> int:
+        """Column count of one ``block``-row tile that fits ``memory_budget_mb``."""
+
+        budget = self.memory_budget_mb * 1024 * 1024
+        return max(1, int(budget / (_CELL_BYTES * self.block)))
+
+    def cluster(self, matrix: VectorMatrix) -> ClusterTable:
+        units = matrix.unit_values
+        n = len(matrix)
+        pivot = units.sum(axis=0)
+        pivot_norm = float(np.sqrt(pivot @ pivot))
+        if pivot_norm == 0.0:
+            pivot = np.eye(1, units.shape[1]).ravel()
+        else:
+            pivot = pivot / pivot_norm
+        order = np.argsort(units @ pivot, kind="stable")
+        sorted_units = units[order]
+        projections = sorted_units @ pivot
+        radius = math.sqrt(max(0.0, 2.0 - 2.0 * self.threshold)) + _BOUND_SLACK
+        width = self.tile_width()
+        sets = UnionFind(n)
+        table = ClusterTable()
+        for start in range(0, n, self.block):
+            stop = min(start + self.block, n)
+            rows = np.arange(start, stop)[:, None]
+            window = int(np.searchsorted(projections, projections[stop - 1] + radius, side="right"))
+            for col in range(start, window, width):
+                end = min(col + width, window)
+                scores = sorted_units[start:stop] @ sorted_units[col:end].T
+                cols = np.arange(col, end)[None, :]
+                in_bound = projections[col:end][None, :] - projections[start:stop][:, None] <= radius
+                candidate = (cols > rows) & in_bound
+                table.pairs_evaluated += int(candidate.sum())
+                hit_rows, hit_cols = np.nonzero(candidate & (scores >= self.threshold))
+                table.pairs_matched += hit_rows.size
+                for r, c in zip(hit_rows.tolist(), hit_cols.tolist()):
+                    sets.union(int(order[start + r]), int(order[col + c]))
+        names: Dict[int, str] = {}
+        for row in range(n):
+            root = sets.find(row)
+            names.setdefault(root, str(matrix.ids[row]))
+            table.assignments[str(matrix.ids[row])] = names[root]
+        logger.info(
+            "Duplicate clustering finished",
+            extra={"rows": n, "evaluated": table.pairs_evaluated, "matched": table.pairs_matched, "clusters": len(names)},
+        )
+        return table
+
+
+__all__ = ["UnionFind", "ClusterTable", "DuplicateClusterer"]
@@ -0,0 +1,45 @@
+"""Maximal-marginal-relevance (MMR) selection for diverse result lists."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from ..utils.errors import SimilarityError
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def mmr_select(relevance: np.ndarray, similarity: np.ndarray, k: int, mmr_lambda: float = 0.7) -> np.ndarray:
+    """Pool positions picked greedily by ``lambda * relevance - (1 - lambda) * max_similarity_to_picked``.
+
+    ``similarity`` is the ``(pool, pool)`` candidate-to-candidate block. The
+    running maximum similarity to the picked set is updated with one row per
+    step, so a pool of ``n`` costs ``O(k * n)`` after the block is built.
+    ``mmr_lambda=1`` reproduces plain relevance order; ties go to the earlier
+    pool position.
+    """
+
+    if not 0.0 <= mmr_lambda <= 1.0:
+        raise SimilarityError(f"mmr_lambda must be within [0, 1], got {mmr_lambda}")
+    scores = np.asarray(relevance, dtype=np.float64)
+    n = scores.shape[0]
+    if similarity.shape != (n, n):
+        raise SimilarityError(f"similarity block has shape {similarity.shape}, expected {(n, n)}")
+    k = min(k, n)
+    picked = np.empty(k, dtype=np.intp)
+    redundancy = np.full(n, -np.inf)
+    available = np.ones(n, dtype=bool)
+    for step in range(k):
+        # Before the first pick there is nothing to be redundant with.
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        marginal = np.where(available, mmr_lambda * scores - (1.0 - mmr_lambda) * penalty, -np.inf)
+        best = int(np.argmax(marginal))
+        picked[step] = best
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    logger.debug("MMR selection", extra={"pool": n, "k": k, "lambda": mmr_lambda})
+    return picked
+
+
+__all__ = ["mmr_select"]
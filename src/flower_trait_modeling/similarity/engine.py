@@ -2,28 +2,134 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, List
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from . import metrics
+from .explain import ContributionBreakdown, top_columns, trait_groups
 from ..domain.models import FeatureVector, SimilarityResult
+from ..storage.vector_matrix import VectorMatrix
 from ..utils.logging import get_logger
+from ..weighting.schemes import WeightScheme
 
 logger = get_logger(__name__)
 
 
 @dataclass
 class SimilarityEngine:
+    """Vector similarity, optionally as ``weighted_cosine`` under a trait ``weight_scheme``.
+
+    The scheme is expanded once per vector layout into a per-slot weight
+    array through ``FeatureVector.mapping``.
+    """
+
     metric_weights: Dict[str, float]
+    weight_scheme: Optional[WeightScheme] = None
+    _slot_weights: Dict[Tuple[str, ...], np.ndarray] = field(default_factory=dict, repr=False)
+
+    def slot_weights(self, mapping: Sequence[str]) -> Optional[np.ndarray]:
+        if self.weight_scheme is None:
+            return None
+        key = tuple(mapping)
+        if key not in self._slot_weights:
+            self._slot_weights[key] = np.array(self.weight_scheme.expand(mapping), dtype=np.float64)
+            logger.debug("Expanded weight scheme", extra={"scheme": self.weight_scheme.name, "slots": len(key)})
+        return self._slot_weights[key]
 
     def compare(self, query: FeatureVector, candidate: FeatureVector) -> SimilarityResult:
         if query.schema_id != candidate.schema_id:
             raise ValueError("schema mismatch")
-        score = metrics.cosine(query.values, candidate.values)
+        weights = self.slot_weights(query.mapping)
+        if weights is None:
+            score = metrics.cosine(query.values, candidate.values, norm_a=query.norm(), norm_b=candidate.norm())
+        else:
+            score = metrics.weighted_cosine(query.values, candidate.values, weights.tolist())
         weighted = score * self.metric_weights.get("vector", 1.0)
         logger.info("Similarity computed", extra={"score": weighted})
         return SimilarityResult(query_id=query.schema_id, candidate_id=candidate.schema_id, score=weighted)
 
+    def compare_matrix(self, query: FeatureVector, matrix: VectorMatrix, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Score ``query`` against every row of ``matrix`` (or only ``rows``); entry ``i`` equals ``compare`` on that row."""
+
+        if query.schema_id != matrix.schema_id:
+            raise ValueError("schema mismatch")
+        values = matrix.values if rows is None else matrix.values[rows]
+        weights = self.slot_weights(query.mapping)
+        if weights is None:
+            norms = matrix.norms if rows is None else matrix.norms[rows]
+            scores = metrics.cosine_batch(query.values, values, norms=norms, norm_q=query.norm())
+        else:
+            norms = matrix.weighted_norms(weights) if rows is None else matrix.weighted_norms(weights)[rows]
+            scores = metrics.weighted_cosine_batch(query.values, values, weights, norms=norms)
+        scores = scores * self.metric_weights.get("vector", 1.0)
+        logger.info("Similarity matrix computed", extra={"rows": values.shape[0]})
+        return scores
+
+    def compare_many(self, queries: Sequence[FeatureVector], matrix: VectorMatrix) -> np.ndarray:
+        """``compare_matrix`` for several queries at once as one ``(queries, rows)`` matrix-matrix product."""
+
+        if any(query.schema_id != matrix.schema_id for query in queries):
+            raise ValueError("schema mismatch")
+        stacked = np.array([query.values for query in queries], dtype=np.float64).reshape(len(queries), matrix.width)
+        weights = self.slot_weights(queries[0].mapping) if queries else None
+        if weights is None:
+            scores = metrics.cosine_many(stacked, matrix.values, norms=matrix.norms)
+        else:
+            scores = metrics.weighted_cosine_many(stacked, matrix.values, weights, norms=matrix.weighted_norms(weights))
+        scores = scores * self.metric_weights.get("vector", 1.0)
+        logger.info("Similarity matrix computed", extra={"queries": len(queries), "rows": len(matrix)})
+        return scores
+
+    def similarity_block(self, matrix: VectorMatrix, rows: Sequence[int]) -> np.ndarray:
+        """``(rows, rows)`` candidate-to-candidate similarity under the same (weighted) cosine as ``compare``.
+
+        Unlike query scores the block is not multiplied by the vector metric weight.
+        """
+
+        picked = np.asarray(rows, dtype=np.intp)
+        values = matrix.values[picked]
+        weights = self.slot_weights(matrix.mapping)
+        if weights is None:
+            return metrics.cosine_many(values, values, norms=matrix.norms[picked])
+        return metrics.weighted_cosine_many(values, values, weights, norms=matrix.weighted_norms(weights)[picked])
+
+    def explain_batch(
+        self, query: FeatureVector, matrix: VectorMatrix, rows: Sequence[int], top_features: int = 3, normalizer: float = 1.0
+    ) -> ContributionBreakdown:
+        """Split the ``compare_matrix`` score of every row in ``rows`` into per-trait contributions.
+
+        Slot ``i`` contributes ``w_i * q_i * c_i / (|q| |c|)`` (``w = 1`` without a
+        scheme); slots are summed into traits through ``query.mapping`` and the
+        ``top_features`` largest per row are picked with ``argpartition``. Pass
+        the ``normalizer`` of a :class:`RankedRows` so each row sums to the
+        displayed (normalized) score instead of the raw one.
+        """
+
+        if query.schema_id != matrix.schema_id:
+            raise ValueError("schema mismatch")
+        picked = np.asarray(rows, dtype=np.intp)
+        q = np.asarray(query.values, dtype=np.float64)
+        weights = self.slot_weights(query.mapping)
+        if weights is None:
+            scaled_q = q / query.norm()
+            norms = matrix.norms[picked]
+        else:
+            scaled_q = weights * q
+            scaled_q = scaled_q / (float(np.sqrt(q @ scaled_q)) or 1.0)
+            norms = matrix.weighted_norms(weights)[picked]
+        per_slot = matrix.values[picked] * scaled_q[None, :] / norms[:, None]
+        traits, indicator = trait_groups(query.mapping)
+        per_trait = (per_slot @ indicator) * (self.metric_weights.get("vector", 1.0) / normalizer)
+        logger.debug("Batch explanation computed", extra={"rows": picked.size, "traits": len(traits)})
+        return ContributionBreakdown(
+            candidate_ids=[str(variety_id) for variety_id in matrix.ids[picked]],
+            traits=traits,
+            contributions=per_trait,
+            top=top_columns(per_trait, top_features),
+        )
+
     def explain(self, query: FeatureVector, candidate: FeatureVector, top_k: int = 3) -> List[str]:
         diffs = [abs(a - b) for a, b in zip(query.values, candidate.values)]
         pairs = list(zip(query.mapping, diffs))
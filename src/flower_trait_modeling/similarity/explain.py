@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from typing import List, Sequence, Tuple
+
+import numpy as np
 
 from ..domain.models import SimilarityResult
 from ..utils.logging import get_logger
@@ -21,4 +23,38 @@ class ExplanationBuilder:
         return message
 
 
-__all__ = ["ExplanationBuilder"]
+def trait_groups(mapping: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    """Traits in first-slot order and a ``(slots, traits)`` 0/1 matrix summing slots into traits."""
+
+    codes: dict = {}
+    inverse = [codes.setdefault(name, len(codes)) for name in mapping]
+    indicator = np.zeros((len(mapping), len(codes)))
+    indicator[np.arange(len(mapping)), inverse] = 1.0
+    return list(codes), indicator
+
+
+def top_columns(values: np.ndarray, k: int) -> np.ndarray:
+    """Per row, the column indices of the ``k`` largest values, best first, via ``argpartition``."""
+
+    k = min(k, values.shape[1])
+    if k <= 0:
+        return np.empty((values.shape[0], 0), dtype=np.intp)
+    picked = np.argpartition(-values, k - 1, axis=1)[:, :k] if k < values.shape[1] else np.broadcast_to(np.arange(k), values.shape)
+    order = np.argsort(-np.take_along_axis(values, picked, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(picked, order, axis=1)
+
+
+@dataclass
+class ContributionBreakdown:
+    """Per-trait share of each result's score; row ``i`` of ``contributions`` sums to that score."""
+
+    candidate_ids: List[str]
+    traits: List[str]
+    contributions: np.ndarray
+    top: np.ndarray
+
+    def reasons(self, row: int) -> List[str]:
+        return [f"{self.traits[col]} contribution={self.contributions[row, col]:.4f}" for col in self.top[row]]
+
+
+__all__ = ["ExplanationBuilder", "ContributionBreakdown", "trait_groups", "top_columns"]
@@ -0,0 +1,74 @@
+"""Common contract for approximate and exact vector indexes."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from ..domain.models import FeatureVector, SimilarityResult
+from ..utils.errors import SimilarityError
+from ..utils.norms import row_norms
+
+
+class VectorIndex(ABC):
+    """Searchable collection of feature vectors sharing one schema.
+
+    ``search`` returns raw cosine scores best first; weighting and max
+    normalization are applied by :class:`RetrievalEngine`. ``version`` goes up
+    on every mutation so derived caches can tell when they are stale.
+    """
+
+    schema_id: str
+    version: int = 0
+
+    @abstractmethod
+    def search(self, query: FeatureVector, top_k: int = 5) -> List[SimilarityResult]:
+        """Return up to ``top_k`` nearest entries for ``query``."""
+
+    def add(self, variety_id: str, vector: FeatureVector) -> None:
+        """Insert one vector; indexes that need a full rebuild keep this default."""
+
+        raise SimilarityError(f"{type(self).__name__} does not support incremental insertion")
+
+    def upsert(self, variety_id: str, vector: FeatureVector) -> None:
+        """Insert or replace one vector; see :class:`SegmentedIndex` for a mutable wrapper."""
+
+        raise SimilarityError(f"{type(self).__name__} does not support in-place updates")
+
+    def delete(self, variety_id: str) -> None:
+        """Remove one vector so later searches skip it."""
+
+        raise SimilarityError(f"{type(self).__name__} does not support deletion")
+
+    @abstractmethod
+    def save(self, path: str | Path) -> Path:
+        """Persist the index so :meth:`load` can restore it."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of indexed vectors."""
+
+    @abstractmethod
+    def __contains__(self, variety_id: object) -> bool:
+        """Whether ``variety_id`` is indexed."""
+
+
+def unit_query(query: FeatureVector, width: int) -> np.ndarray:
+    """Query values as a unit-length array, using the same zero-norm fallback as ``metrics.cosine``."""
+
+    q = np.asarray(query.values, dtype=np.float64)
+    if q.shape[0] != width:
+        raise ValueError("vectors must be same length")
+    return q / (float(np.sqrt(q @ q)) or 1.0)
+
+
+def unit_rows(values: np.ndarray) -> np.ndarray:
+    """Row-normalized copy of ``values``; zero rows stay zero."""
+
+    return values / row_norms(values)[:, None]
+
+
+__all__ = ["VectorIndex", "unit_query", "unit_rows"]
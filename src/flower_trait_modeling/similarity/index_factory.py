@@ -0,0 +1,140 @@
+"""Construct retrieval indexes from the ``index:`` block of the similarity config."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from functools import partial
+from typing import Dict
+
+from .config import IndexConfig
+from .index_base import VectorIndex
+from .index_flat import FlatIndex
+from .index_hnsw import HNSWIndex
+from .index_ivf import IVFIndex
+from .index_lsh import LSHIndex
+from .index_pq import PQIndex
+from .index_segmented import SegmentedIndex
+from .index_sq import ScalarQuantizedIndex
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import ConfigurationError
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+_OPTION_KEYS = {
+    "flat": set(),
+    "ivf": {"nlist", "nprobe", "seed", "iterations"},
+    "hnsw": {"m", "ef_construction", "ef_search", "seed"},
+    "lsh": {"num_tables", "num_bits", "seed"},
+    "sq": {"dtype", "rerank"},
+    "pq": {"subspaces", "centroids", "iterations", "seed", "train_size"},
+}
+
+
+# Backends that need a catalogue to train on before the first vector can be added.
+TRAINED_BACKENDS = ("ivf", "sq", "pq")
+
+# Backends that replace a vector in place; the others take updates through a SegmentedIndex.
+UPSERT_BACKENDS = ("flat", "ivf", "hnsw", "lsh")
+
+
+def _options(config: IndexConfig) -> Dict[str, object]:
+    unknown = set(config.options) - _OPTION_KEYS[config.backend]
+    if unknown:
+        raise ConfigurationError(f"Unknown {config.backend} index options", {"options": sorted(unknown)})
+    return dict(config.options)
+
+
+def build_index(config: IndexConfig, matrix: VectorMatrix) -> VectorIndex:
+    """Build the configured backend over a full catalogue matrix."""
+
+    options = _options(config)
+    if config.backend == "ivf":
+        index: VectorIndex = IVFIndex.build(matrix, **options)
+    elif config.backend == "hnsw":
+        index = HNSWIndex(schema_id=matrix.schema_id, mapping=list(matrix.mapping), **options)
+        for row, variety_id in enumerate(matrix.ids):
+            index.add(str(variety_id), matrix.vector(row))
+    elif config.backend == "lsh":
+        index = LSHIndex.build(matrix, **options)
+    elif config.backend == "sq":
+        index = ScalarQuantizedIndex.build(matrix, **options)
+    elif config.backend == "pq":
+        index = PQIndex.build(matrix, **options)
+    else:
+        index = FlatIndex.from_matrix(matrix)
+    logger.info("Index built", extra={"backend": config.backend, "rows": len(index)})
+    return index
+
+
+def build_segmented_index(config: IndexConfig, matrix: VectorMatrix, **options: object) -> SegmentedIndex:
+    """Wrap the configured backend so it accepts ``upsert``/``delete``; each sealed segment is built with :func:`build_index`."""
+
+    _options(config)
+    return SegmentedIndex.from_matrix(matrix, builder=partial(build_index, config), **options)
+
+
+def build_updatable_index(config: IndexConfig, matrix: VectorMatrix) -> VectorIndex:
+    """:func:`build_index` for backends with ``upsert``, :func:`build_segmented_index` for the rest."""
+
+    if config.backend in UPSERT_BACKENDS:
+        return build_index(config, matrix)
+    return build_segmented_index(config, matrix)
+
+
+def load_index(config: IndexConfig) -> VectorIndex:
+    if not config.path:
+        raise ConfigurationError("index.path is required to load an index")
+    loaders = {
+        "flat": FlatIndex.load,
+        "ivf": IVFIndex.load,
+        "hnsw": HNSWIndex.load,
+        "lsh": LSHIndex.load,
+        "sq": ScalarQuantizedIndex.load,
+        "pq": PQIndex.load,
+    }
+    return loaders[config.backend](config.path)
+
+
+def can_open_index(config: IndexConfig) -> bool:
+    """Whether :func:`open_index` can serve ``config`` now: a persisted file exists or the backend grows from empty."""
+
+    return bool(config.path and Path(config.path).exists()) or config.backend not in TRAINED_BACKENDS
+
+
+def open_index(config: IndexConfig, schema_id: str) -> VectorIndex:
+    """Load the persisted index when ``index.path`` exists, otherwise start an empty incremental one."""
+
+    if config.path and Path(config.path).exists():
+        return load_index(config)
+    options = _options(config)
+    if config.backend == "hnsw":
+        return HNSWIndex(schema_id=schema_id, **options)
+    if config.backend == "lsh":
+        return LSHIndex(schema_id=schema_id, **options)
+    if config.backend == "flat":
+        return FlatIndex(schema_id=schema_id)
+    raise ConfigurationError(f"{config.backend} index must be trained with build_index before it can be opened", {"path": config.path})
+
+
+def open_updatable_index(config: IndexConfig, schema_id: str) -> VectorIndex:
+    """:func:`open_index` for indexes made by :func:`build_updatable_index`; wrapped backends reload their saved rows into segments."""
+
+    if config.backend in UPSERT_BACKENDS:
+        return open_index(config, schema_id)
+    if config.path and Path(config.path).exists():
+        return SegmentedIndex.load(config.path, builder=partial(build_index, config))
+    raise ConfigurationError(f"{config.backend} index must be trained with build_index before it can be opened", {"path": config.path})
+
+
+__all__ = [
+    "TRAINED_BACKENDS",
+    "UPSERT_BACKENDS",
+    "build_index",
+    "build_segmented_index",
+    "build_updatable_index",
+    "can_open_index",
+    "load_index",
+    "open_index",
+    "open_updatable_index",
+]
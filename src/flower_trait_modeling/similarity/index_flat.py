@@ -0,0 +1,101 @@
+"""Exact brute-force index with amortized incremental insertion."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from . import metrics
+from .index_base import VectorIndex
+from .topk import top_k_indices
+from ..domain.models import FeatureVector, SimilarityResult
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import SimilarityError, StorageError
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class FlatIndex(VectorIndex):
+    """Raw vectors in a capacity-doubling buffer, scored exactly with ``metrics.cosine_batch``."""
+
+    schema_id: str
+    mapping: List[str] = field(default_factory=list)
+    ids: List[str] = field(default_factory=list)
+    _values: np.ndarray = field(default_factory=lambda: np.empty((0, 0)), repr=False)
+    _positions: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_matrix(cls, matrix: VectorMatrix) -> "FlatIndex":
+        index = cls(schema_id=matrix.schema_id, mapping=list(matrix.mapping), ids=[str(i) for i in matrix.ids], _values=matrix.values.copy())
+        index._positions = {variety_id: row for row, variety_id in enumerate(index.ids)}
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, variety_id: object) -> bool:
+        return variety_id in self._positions
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[: len(self.ids)]
+
+    def add(self, variety_id: str, vector: FeatureVector) -> None:
+        if vector.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        if variety_id in self._positions:
+            raise SimilarityError(f"duplicate id {variety_id}")
+        row = np.asarray(vector.values, dtype=np.float64)
+        if not self.ids:
+            self._values = np.empty((8, row.shape[0]))
+            self.mapping = self.mapping or list(vector.mapping)
+        elif row.shape[0] != self._values.shape[1]:
+            raise ValueError("vectors must be same length")
+        if len(self.ids) == self._values.shape[0]:
+            self._values = np.concatenate([self._values, np.empty_like(self._values)])
+        self._values[len(self.ids)] = row
+        self._positions[variety_id] = len(self.ids)
+        self.ids.append(variety_id)
+        self.version += 1
+
+    def upsert(self, variety_id: str, vector: FeatureVector) -> None:
+        """Overwrite the stored row in place, or append when ``variety_id`` is new."""
+
+        row = self._positions.get(variety_id)
+        if row is None:
+            self.add(variety_id, vector)
+            return
+        if vector.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        values = np.asarray(vector.values, dtype=np.float64)
+        if values.shape[0] != self._values.shape[1]:
+            raise ValueError("vectors must be same length")
+        self._values[row] = values
+        self.version += 1
+
+    def search(self, query: FeatureVector, top_k: int = 5) -> List[SimilarityResult]:
+        if query.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        if not self.ids:
+            return []
+        scores = metrics.cosine_batch(query.values, self.values)
+        return [SimilarityResult(query_id=query.schema_id, candidate_id=self.ids[row], score=float(scores[row])) for row in top_k_indices(scores, top_k)]
+
+    def save(self, path: str | Path) -> Path:
+        matrix = VectorMatrix.from_array(schema_id=self.schema_id, ids=self.ids, values=self.values, mapping=self.mapping)
+        return matrix.save(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "FlatIndex":
+        try:
+            return cls.from_matrix(VectorMatrix.load(path))
+        except KeyError as exc:
+            raise StorageError(str(path), f"not a flat index: missing {exc}") from exc
+
+
+__all__ = ["FlatIndex"]
@@ -0,0 +1,234 @@
+"""Hierarchical navigable small-world (HNSW) graph index."""
+
+from __future__ import annotations
+
+import heapq
+import math
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .index_base import VectorIndex, unit_query
+from ..domain.models import FeatureVector, SimilarityResult
+from ..utils.errors import SimilarityError, StorageError
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class HNSWIndex(VectorIndex):
+    """Layered proximity graph over unit vectors, searched greedily from the top layer down.
+
+    ``m`` bounds the out-degree per layer (``2 * m`` on layer 0),
+    ``ef_construction`` the beam width while linking new nodes and
+    ``ef_search`` the beam width at query time; raising ``ef_search`` trades
+    latency for recall. ``graph[node][layer]`` lists the neighbours of
+    ``node`` on ``layer``.
+    """
+
+    schema_id: str
+    m: int = 16
+    ef_construction: int = 100
+    ef_search: int = 50
+    seed: int = 0
+    mapping: List[str] = field(default_factory=list)
+    ids: List[str] = field(default_factory=list)
+    levels: List[int] = field(default_factory=list)
+    graph: List[List[List[int]]] = field(default_factory=list, repr=False)
+    entry_point: int = -1
+    _vectors: np.ndarray = field(default_factory=lambda: np.empty((0, 0)), repr=False)
+    _positions: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        self._rng = random.Random(self.seed + len(self.ids))
+        self._level_scale = 1.0 / math.log(max(self.m, 2))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, variety_id: object) -> bool:
+        return variety_id in self._positions
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[: len(self.ids)]
+
+    def add(self, variety_id: str, vector: FeatureVector) -> None:
+        if vector.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        if variety_id in self._positions:
+            raise SimilarityError(f"duplicate id {variety_id}")
+        if not self.ids:
+            self._vectors = np.empty((8, len(vector.values)))
+            self.mapping = self.mapping or list(vector.mapping)
+        q = unit_query(vector, self._vectors.shape[1])
+        node = len(self.ids)
+        if node == self._vectors.shape[0]:
+            self._vectors = np.concatenate([self._vectors, np.empty_like(self._vectors)])
+        self._vectors[node] = q
+        level = int(-math.log(1.0 - self._rng.random()) * self._level_scale)
+        self.ids.append(variety_id)
+        self.levels.append(level)
+        self.graph.append([[] for _ in range(level + 1)])
+        self._positions[variety_id] = node
+        self.version += 1
+        if self.entry_point < 0:
+            self.entry_point = node
+            return
+        top = self.levels[self.entry_point]
+        self._connect(node, q)
+        if level > top:
+            self.entry_point = node
+
+    def upsert(self, variety_id: str, vector: FeatureVector) -> None:
+        """Replace a stored vector and rebuild its own links on every layer it lives on.
+
+        Nodes that already link to it keep those links, as in hnswlib's
+        update; they stay valid edges and searches score the new vector.
+        """
+
+        node = self._positions.get(variety_id)
+        if node is None:
+            self.add(variety_id, vector)
+            return
+        if vector.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        q = unit_query(vector, self._vectors.shape[1])
+        self._vectors[node] = q
+        self.version += 1
+        if len(self.ids) > 1:
+            self._connect(node, q)
+
+    def _connect(self, node: int, q: np.ndarray) -> None:
+        """Descend from the entry point and link ``node`` to its nearest nodes on each of its layers."""
+
+        level = self.levels[node]
+        entry = self.entry_point
+        top = self.levels[entry]
+        for layer in range(top, level, -1):
+            entry = self._search_layer(q, [entry], 1, layer)[0][1]
+        entries = [entry]
+        for layer in range(min(level, top), -1, -1):
+            found = [(sim, candidate) for sim, candidate in self._search_layer(q, entries, self.ef_construction + 1, layer) if candidate != node]
+            neighbours = [candidate for _, candidate in found[: self.m]]
+            self.graph[node][layer] = neighbours
+            for neighbour in neighbours:
+                if node not in self.graph[neighbour][layer]:
+                    self._link(neighbour, node, layer)
+            entries = [candidate for _, candidate in found] or [entry]
+
+    def _max_degree(self, layer: int) -> int:
+        return 2 * self.m if layer == 0 else self.m
+
+    def _link(self, source: int, target: int, layer: int) -> None:
+        links = self.graph[source][layer]
+        links.append(target)
+        if len(links) > self._max_degree(layer):
+            sims = self._vectors[links] @ self._vectors[source]
+            keep = np.argsort(-sims, kind="stable")[: self._max_degree(layer)]
+            self.graph[source][layer] = [links[i] for i in keep]
+
+    def _search_layer(self, q: np.ndarray, entries: List[int], ef: int, layer: int) -> List[Tuple[float, int]]:
+        """Beam search on one layer; returns ``(similarity, node)`` pairs best first."""
+
+        visited = set(entries)
+        sims = self._vectors[entries] @ q
+        candidates = [(-float(s), n) for s, n in zip(sims, entries)]
+        heapq.heapify(candidates)
+        results = [(float(s), n) for s, n in zip(sims, entries)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+        while candidates:
+            negative, node = heapq.heappop(candidates)
+            if len(results) >= ef and -negative < results[0][0]:
+                break
+            fresh = [n for n in self.graph[node][layer] if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            for sim, neighbour in zip((self._vectors[fresh] @ q).tolist(), fresh):
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, neighbour))
+                    heapq.heappush(results, (sim, neighbour))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted(results, key=lambda item: (-item[0], item[1]))
+
+    def search(self, query: FeatureVector, top_k: int = 5) -> List[SimilarityResult]:
+        if query.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        if self.entry_point < 0:
+            return []
+        q = unit_query(query, self._vectors.shape[1])
+        entry = self.entry_point
+        for layer in range(self.levels[entry], 0, -1):
+            entry = self._search_layer(q, [entry], 1, layer)[0][1]
+        found = self._search_layer(q, [entry], max(self.ef_search, top_k), 0)[:top_k]
+        return [SimilarityResult(query_id=query.schema_id, candidate_id=self.ids[node], score=sim) for sim, node in found]
+
+    def save(self, path: str | Path) -> Path:
+        target = Path(path)
+        adjacency: List[int] = []
+        offsets = [0]
+        for links in self.graph:
+            for layer_links in links:
+                adjacency.extend(layer_links)
+                offsets.append(len(adjacency))
+        try:
+            with target.open("wb") as handle:
+                np.savez(
+                    handle,
+                    schema_id=np.array(self.schema_id),
+                    params=np.array([self.m, self.ef_construction, self.ef_search, self.seed, self.entry_point]),
+                    ids=np.array(self.ids, dtype=str),
+                    mapping=np.array(self.mapping, dtype=str),
+                    vectors=self.vectors,
+                    levels=np.array(self.levels, dtype=np.int64),
+                    adjacency=np.array(adjacency, dtype=np.int64),
+                    offsets=np.array(offsets, dtype=np.int64),
+                )
+        except OSError as exc:
+            raise StorageError(str(target), str(exc)) from exc
+        logger.info("Saved HNSW index", extra={"path": str(target), "nodes": len(self)})
+        return target
+
+    @classmethod
+    def load(cls, path: str | Path) -> "HNSWIndex":
+        target = Path(path)
+        if not target.exists():
+            raise StorageError(str(target), "HNSW index file not found")
+        with np.load(target, allow_pickle=False) as data:
+            m, ef_construction, ef_search, seed, entry_point = (int(v) for v in data["params"])
+            ids = [str(i) for i in data["ids"]]
+            levels = data["levels"].tolist()
+            adjacency = data["adjacency"].tolist()
+            offsets = data["offsets"].tolist()
+            graph: List[List[List[int]]] = []
+            cursor = 0
+            for level in levels:
+                graph.append([adjacency[offsets[cursor + layer] : offsets[cursor + layer + 1]] for layer in range(level + 1)])
+                cursor += level + 1
+            index = cls(
+                schema_id=str(data["schema_id"]),
+                m=m,
+                ef_construction=ef_construction,
+                ef_search=ef_search,
+                seed=seed,
+                mapping=[str(name) for name in data["mapping"]],
+                ids=ids,
+                levels=levels,
+                graph=graph,
+                entry_point=entry_point,
+                _vectors=np.array(data["vectors"]),
+            )
+        index._positions = {variety_id: node for node, variety_id in enumerate(ids)}
+        logger.debug("Loaded HNSW index", extra={"path": str(target), "nodes": len(index)})
+        return index
+
+
+__all__ = ["HNSWIndex"]
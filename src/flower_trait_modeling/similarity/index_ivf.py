@@ -0,0 +1,184 @@
+"""Inverted-file (IVF) approximate index over k-means cells."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .index_base import VectorIndex, unit_query
+from .topk import top_k_indices
+from ..domain.models import FeatureVector, SimilarityResult
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import SimilarityError, StorageError
+from ..utils.kmeans import kmeans
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class IVFIndex(VectorIndex):
+    """Vectors grouped into spherical k-means cells; a query scans only the ``nprobe`` nearest cells.
+
+    ``nprobe`` is the speed/recall knob: ``nprobe == nlist`` is an exact scan,
+    smaller values trade recall for latency. Unit rows live in one
+    capacity-doubling buffer in insertion order; each cell keeps the rows it
+    owns, and ``_positions`` maps ids to rows, so ``add``/``upsert`` append
+    without copying the catalogue.
+    """
+
+    schema_id: str
+    centroids: np.ndarray
+    ids: List[str] = field(default_factory=list)
+    mapping: List[str] = field(default_factory=list)
+    nprobe: int = 4
+    _values: np.ndarray = field(default_factory=lambda: np.empty((0, 0)), repr=False)
+    _labels: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.intp), repr=False)
+    _members: List[List[int]] = field(default_factory=list, repr=False)
+    _member_rows: List[Optional[np.ndarray]] = field(default_factory=list, repr=False)
+    _positions: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        self.ids = [str(variety_id) for variety_id in self.ids]
+        self._values = np.array(self._values, dtype=np.float64)
+        self._labels = np.array(self._labels, dtype=np.intp)
+        self._positions = {variety_id: row for row, variety_id in enumerate(self.ids)}
+        self._members = [[] for _ in range(self.nlist)]
+        for row, cell in enumerate(self._labels[: len(self.ids)].tolist()):
+            self._members[cell].append(row)
+        self._member_rows = [None] * self.nlist
+
+    @classmethod
+    def build(cls, matrix: VectorMatrix, nlist: int = 16, nprobe: int = 4, seed: int = 0, iterations: int = 20) -> "IVFIndex":
+        units = matrix.unit_values
+        centroids, labels = kmeans(units, nlist, iterations=iterations, seed=seed, spherical=True)
+        index = cls(
+            schema_id=matrix.schema_id,
+            centroids=centroids,
+            ids=list(matrix.ids),
+            mapping=list(matrix.mapping),
+            nprobe=nprobe,
+            _values=units,
+            _labels=labels,
+        )
+        logger.info("IVF index built", extra={"rows": len(index), "nlist": index.nlist})
+        return index
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[: len(self.ids)]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, variety_id: object) -> bool:
+        return variety_id in self._positions
+
+    def _cell_rows(self, cell: int) -> np.ndarray:
+        rows = self._member_rows[cell]
+        if rows is None:
+            rows = self._member_rows[cell] = np.array(self._members[cell], dtype=np.intp)
+        return rows
+
+    def add(self, variety_id: str, vector: FeatureVector) -> None:
+        """Append to the nearest trained cell; centroids are not retrained."""
+
+        if vector.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        if variety_id in self._positions:
+            raise SimilarityError(f"duplicate id {variety_id}")
+        q = unit_query(vector, self.centroids.shape[1])
+        row = len(self.ids)
+        if row == self._values.shape[0]:
+            capacity = max(8, 2 * row)
+            self._values = np.concatenate([self._values.reshape(row, q.shape[0]), np.empty((capacity - row, q.shape[0]))])
+            self._labels = np.concatenate([self._labels[:row], np.empty(capacity - row, dtype=np.intp)])
+        cell = int(np.argmax(self.centroids @ q))
+        self._values[row] = q
+        self._labels[row] = cell
+        self._members[cell].append(row)
+        self._member_rows[cell] = None
+        self._positions[variety_id] = row
+        self.ids.append(variety_id)
+        self.version += 1
+
+    def upsert(self, variety_id: str, vector: FeatureVector) -> None:
+        """Replace the stored vector in place, moving it to its new nearest cell if that changed."""
+
+        row = self._positions.get(variety_id)
+        if row is None:
+            self.add(variety_id, vector)
+            return
+        if vector.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        q = unit_query(vector, self.centroids.shape[1])
+        old, cell = int(self._labels[row]), int(np.argmax(self.centroids @ q))
+        if cell != old:
+            self._members[old].remove(row)
+            self._members[cell].append(row)
+            self._member_rows[old] = self._member_rows[cell] = None
+            self._labels[row] = cell
+        self._values[row] = q
+        self.version += 1
+
+    def search(self, query: FeatureVector, top_k: int = 5, nprobe: Optional[int] = None) -> List[SimilarityResult]:
+        if query.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        q = unit_query(query, self.centroids.shape[1])
+        cells = top_k_indices(self.centroids @ q, nprobe or self.nprobe)
+        rows = np.concatenate([self._cell_rows(c) for c in cells.tolist()]) if cells.size else np.empty(0, dtype=np.intp)
+        scores = self._values[rows] @ q
+        best = top_k_indices(scores, top_k)
+        logger.debug("IVF search", extra={"cells": cells.size, "scanned": rows.size})
+        return [SimilarityResult(query_id=query.schema_id, candidate_id=self.ids[rows[i]], score=float(scores[i])) for i in best]
+
+    def save(self, path: str | Path) -> Path:
+        target = Path(path)
+        # On disk, cell members are contiguous with ``offsets[c]:offsets[c + 1]`` delimiting cell ``c``.
+        order = np.concatenate([self._cell_rows(c) for c in range(self.nlist)]) if self.nlist else np.empty(0, dtype=np.intp)
+        offsets = np.concatenate([[0], np.cumsum([len(members) for members in self._members])])
+        try:
+            with target.open("wb") as handle:
+                np.savez(
+                    handle,
+                    schema_id=np.array(self.schema_id),
+                    centroids=self.centroids,
+                    ids=np.array(self.ids, dtype=str)[order],
+                    vectors=self._values[order],
+                    offsets=offsets,
+                    mapping=np.array(self.mapping, dtype=str),
+                    nprobe=np.array(self.nprobe),
+                )
+        except OSError as exc:
+            raise StorageError(str(target), str(exc)) from exc
+        logger.info("Saved IVF index", extra={"path": str(target)})
+        return target
+
+    @classmethod
+    def load(cls, path: str | Path) -> "IVFIndex":
+        target = Path(path)
+        if not target.exists():
+            raise StorageError(str(target), "IVF index file not found")
+        with np.load(target, allow_pickle=False) as data:
+            offsets = data["offsets"]
+            index = cls(
+                schema_id=str(data["schema_id"]),
+                centroids=data["centroids"],
+                ids=data["ids"].tolist(),
+                mapping=[str(name) for name in data["mapping"]],
+                nprobe=int(data["nprobe"]),
+                _values=data["vectors"],
+                _labels=np.repeat(np.arange(len(offsets) - 1), np.diff(offsets)),
+            )
+        logger.debug("Loaded IVF index", extra={"path": str(target), "rows": len(index)})
+        return index
+
+
+__all__ = ["IVFIndex"]
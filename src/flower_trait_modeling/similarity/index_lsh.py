@@ -0,0 +1,201 @@
+"""Signed random-projection LSH index for cosine near-duplicate lookup."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from . import metrics
+from .index_base import VectorIndex
+from .topk import top_k_indices
+from ..domain.models import FeatureVector, SimilarityResult
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import SimilarityError, StorageError
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class LSHIndex(VectorIndex):
+    """``num_tables`` hash tables keyed by ``num_bits``-bit sign signatures.
+
+    Each bit is the sign of the vector's projection on a Gaussian hyperplane
+    drawn from ``seed``, so signatures and buckets are reproducible across runs.
+    Vectors sharing a bucket in any table become candidates and are reranked
+    with the exact cosine.
+    """
+
+    schema_id: str
+    num_tables: int = 8
+    num_bits: int = 16
+    seed: int = 0
+    mapping: List[str] = field(default_factory=list)
+    ids: List[str] = field(default_factory=list)
+    _values: np.ndarray = field(default_factory=lambda: np.empty((0, 0)), repr=False)
+    _signatures: np.ndarray = field(default_factory=lambda: np.empty((0, 0), dtype=np.uint64), repr=False)
+    _buckets: List[Dict[int, List[int]]] = field(default_factory=list, repr=False)
+    _positions: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        if not 0 < self.num_bits <= 64:
+            raise SimilarityError("num_bits must be between 1 and 64")
+        self._planes = np.empty((0, 0))
+        self._weights = np.left_shift(np.uint64(1), np.arange(self.num_bits, dtype=np.uint64))
+        if not self._buckets:
+            self._buckets = [{} for _ in range(self.num_tables)]
+
+    @classmethod
+    def build(cls, matrix: VectorMatrix, num_tables: int = 8, num_bits: int = 16, seed: int = 0) -> "LSHIndex":
+        index = cls(schema_id=matrix.schema_id, num_tables=num_tables, num_bits=num_bits, seed=seed, mapping=list(matrix.mapping))
+        index._bulk_load([str(i) for i in matrix.ids], matrix.values)
+        logger.info("LSH index built", extra={"rows": len(index), "tables": num_tables, "bits": num_bits})
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, variety_id: object) -> bool:
+        return variety_id in self._positions
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[: len(self.ids)]
+
+    def _ensure_planes(self, width: int) -> None:
+        if self._planes.shape[0] == 0:
+            rng = np.random.default_rng(self.seed)
+            self._planes = rng.standard_normal((self.num_tables * self.num_bits, width))
+        elif self._planes.shape[1] != width:
+            raise ValueError("vectors must be same length")
+
+    def signatures(self, values: np.ndarray) -> np.ndarray:
+        """Packed signatures, shape ``(rows, num_tables)``, one ``uint64`` per table."""
+
+        self._ensure_planes(values.shape[1])
+        bits = (values @ self._planes.T >= 0.0).reshape(values.shape[0], self.num_tables, self.num_bits)
+        return (bits.astype(np.uint64) * self._weights).sum(axis=2, dtype=np.uint64)
+
+    def _bulk_load(self, ids: List[str], values: np.ndarray) -> None:
+        self._values = np.array(values, dtype=np.float64)
+        self._signatures = self.signatures(self._values) if len(ids) else np.empty((0, self.num_tables), dtype=np.uint64)
+        self.ids = list(ids)
+        self._positions = {variety_id: row for row, variety_id in enumerate(self.ids)}
+        self._buckets = []
+        for table in range(self.num_tables):
+            column = self._signatures[:, table]
+            order = np.argsort(column, kind="stable")
+            keys, starts = np.unique(column[order], return_index=True)
+            groups = np.split(order, starts[1:])
+            self._buckets.append({int(key): group.tolist() for key, group in zip(keys, groups)})
+
+    def add(self, variety_id: str, vector: FeatureVector) -> None:
+        if vector.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        if variety_id in self._positions:
+            raise SimilarityError(f"duplicate id {variety_id}")
+        row = np.asarray(vector.values, dtype=np.float64)[None, :]
+        signature = self.signatures(row)
+        if not self.ids:
+            self._values = np.empty((8, row.shape[1]))
+            self._signatures = np.empty((8, self.num_tables), dtype=np.uint64)
+            self.mapping = self.mapping or list(vector.mapping)
+        position = len(self.ids)
+        if position == self._values.shape[0]:
+            self._values = np.concatenate([self._values, np.empty_like(self._values)])
+            self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+        self._values[position] = row[0]
+        self._signatures[position] = signature[0]
+        for table, key in enumerate(signature[0].tolist()):
+            self._buckets[table].setdefault(int(key), []).append(position)
+        self._positions[variety_id] = position
+        self.ids.append(variety_id)
+        self.version += 1
+
+    def upsert(self, variety_id: str, vector: FeatureVector) -> None:
+        """Overwrite the stored row and move it to the buckets of its new signature."""
+
+        position = self._positions.get(variety_id)
+        if position is None:
+            self.add(variety_id, vector)
+            return
+        if vector.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        row = np.asarray(vector.values, dtype=np.float64)[None, :]
+        signature = self.signatures(row)[0]
+        for table, (old, new) in enumerate(zip(self._signatures[position].tolist(), signature.tolist())):
+            if old != new:
+                self._buckets[table][int(old)].remove(position)
+                self._buckets[table].setdefault(int(new), []).append(position)
+        self._values[position] = row[0]
+        self._signatures[position] = signature
+        self.version += 1
+
+    def candidates(self, query: FeatureVector) -> np.ndarray:
+        """Rows sharing at least one bucket with ``query``; one dict lookup per table."""
+
+        if query.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        if not self.ids:
+            return np.empty(0, dtype=np.intp)
+        signature = self.signatures(np.asarray(query.values, dtype=np.float64)[None, :])[0]
+        hits: set = set()
+        for table, key in enumerate(signature.tolist()):
+            hits.update(self._buckets[table].get(int(key), ()))
+        return np.array(sorted(hits), dtype=np.intp)
+
+    def search(self, query: FeatureVector, top_k: int = 5) -> List[SimilarityResult]:
+        rows = self.candidates(query)
+        if rows.size == 0:
+            return []
+        scores = metrics.cosine_batch(query.values, self.values[rows])
+        best = top_k_indices(scores, top_k)
+        return [SimilarityResult(query_id=query.schema_id, candidate_id=self.ids[rows[i]], score=float(scores[i])) for i in best]
+
+    def near_duplicates(self, query: FeatureVector, threshold: float) -> List[SimilarityResult]:
+        """Every bucketed candidate whose exact cosine is at least ``threshold``, best first."""
+
+        rows = self.candidates(query)
+        if rows.size == 0:
+            return []
+        scores = metrics.cosine_batch(query.values, self.values[rows])
+        keep = np.flatnonzero(scores >= threshold)
+        keep = keep[np.lexsort((keep, -scores[keep]))]
+        logger.debug("LSH near-duplicate check", extra={"candidates": rows.size, "matches": keep.size})
+        return [SimilarityResult(query_id=query.schema_id, candidate_id=self.ids[rows[i]], score=float(scores[i])) for i in keep]
+
+    def save(self, path: str | Path) -> Path:
+        target = Path(path)
+        try:
+            with target.open("wb") as handle:
+                np.savez(
+                    handle,
+                    schema_id=np.array(self.schema_id),
+                    params=np.array([self.num_tables, self.num_bits, self.seed]),
+                    ids=np.array(self.ids, dtype=str),
+                    mapping=np.array(self.mapping, dtype=str),
+                    values=self.values,
+                )
+        except OSError as exc:
+            raise StorageError(str(target), str(exc)) from exc
+        logger.info("Saved LSH index", extra={"path": str(target), "rows": len(self)})
+        return target
+
+    @classmethod
+    def load(cls, path: str | Path) -> "LSHIndex":
+        target = Path(path)
+        if not target.exists():
+            raise StorageError(str(target), "LSH index file not found")
+        with np.load(target, allow_pickle=False) as data:
+            num_tables, num_bits, seed = (int(v) for v in data["params"])
+            index = cls(schema_id=str(data["schema_id"]), num_tables=num_tables, num_bits=num_bits, seed=seed, mapping=[str(n) for n in data["mapping"]])
+            ids = [str(i) for i in data["ids"]]
+            if ids:
+                index._bulk_load(ids, data["values"])
+        return index
+
+
+__all__ = ["LSHIndex"]
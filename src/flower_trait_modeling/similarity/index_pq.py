@@ -0,0 +1,75 @@
+"""Product-quantization index answered with asymmetric distance lookup tables."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from .index_base import VectorIndex, unit_query
+from .topk import top_k_indices
+from ..domain.models import FeatureVector, SimilarityResult
+from ..storage.quantization import ProductQuantizedMatrix
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Rows gathered per block so the ``(rows, subspaces)`` lookup buffer stays small.
+_CHUNK_ROWS = 262144
+
+
+@dataclass
+class PQIndex(VectorIndex):
+    """Search over a :class:`ProductQuantizedMatrix`; scores are approximate cosine.
+
+    Each query builds one ``(subspaces, centroids)`` table of slice-codebook
+    inner products, after which a row costs ``subspaces`` table lookups.
+    """
+
+    store: ProductQuantizedMatrix
+    _positions: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        self.schema_id = self.store.schema_id
+        self._positions = {str(variety_id): row for row, variety_id in enumerate(self.store.ids)}
+
+    @classmethod
+    def build(cls, matrix: VectorMatrix, subspaces: int = 8, centroids: int = 256, **training: int) -> "PQIndex":
+        return cls(ProductQuantizedMatrix.build(matrix, subspaces, centroids, **training))
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __contains__(self, variety_id: object) -> bool:
+        return variety_id in self._positions
+
+    @property
+    def nbytes(self) -> int:
+        return self.store.nbytes
+
+    def search(self, query: FeatureVector, top_k: int = 5) -> List[SimilarityResult]:
+        if query.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        if not len(self):
+            return []
+        quantizer = self.store.quantizer
+        table = quantizer.lookup_table(unit_query(query, int(quantizer.bounds[-1])))
+        codes = self.store.codes
+        scores = np.concatenate([quantizer.asymmetric_dot(codes[start : start + _CHUNK_ROWS], table) for start in range(0, len(self), _CHUNK_ROWS)])
+        return [
+            SimilarityResult(query_id=query.schema_id, candidate_id=str(self.store.ids[row]), score=float(scores[row]))
+            for row in top_k_indices(scores, top_k)
+        ]
+
+    def save(self, path: str | Path) -> Path:
+        return self.store.save(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "PQIndex":
+        return cls(ProductQuantizedMatrix.load(path))
+
+
+__all__ = ["PQIndex"]
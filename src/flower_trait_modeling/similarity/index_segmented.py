@@ -0,0 +1,284 @@
+"""Mutable index over immutable segments with tombstones and background compaction."""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .index_base import VectorIndex
+from .index_flat import FlatIndex
+from ..domain.models import FeatureVector, SimilarityResult
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import SimilarityError
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+SegmentBuilder = Callable[[VectorMatrix], VectorIndex]
+
+
+@dataclass
+class Segment:
+    """One sealed index plus the rows it was built from and the ids retired since."""
+
+    matrix: VectorMatrix
+    index: VectorIndex
+    dead: Set[str] = field(default_factory=set)
+
+    @property
+    def live(self) -> int:
+        return len(self.matrix) - len(self.dead)
+
+
+@dataclass
+class SegmentedIndex(VectorIndex):
+    """``upsert``/``delete`` on top of any backend, LSM style.
+
+    Writes land in an exact in-memory memtable that is sealed into a new
+    segment (built with ``builder`` outside the lock, so searches and writes
+    carry on meanwhile) every ``memtable_size`` entries. Deleting
+    or replacing a sealed entry only adds a tombstone; searches over-fetch
+    each segment by its tombstone count and drop retired ids. Once retired
+    rows exceed ``compaction_ratio`` of the sealed rows, the segments are
+    merged into one on a background thread and swapped in under a lock, so
+    searches never wait on a rebuild.
+    """
+
+    schema_id: str
+    builder: SegmentBuilder = FlatIndex.from_matrix
+    memtable_size: int = 1024
+    compaction_ratio: float = 0.2
+    background: bool = True
+    mapping: List[str] = field(default_factory=list)
+    compactions: int = 0
+    _segments: Tuple[Segment, ...] = field(default=(), repr=False)
+    _memtable: Dict[str, FeatureVector] = field(default_factory=dict, repr=False)
+    _memtable_index: Optional[FlatIndex] = field(default=None, repr=False)
+    # Segment number of every sealed live id; memtable ids live in ``_memtable``.
+    _locations: Dict[str, int] = field(default_factory=dict, repr=False)
+    _retired_during_compaction: Optional[Set[str]] = field(default=None, repr=False)
+    _sealing: bool = field(default=False, repr=False)
+    _worker: Optional[threading.Thread] = field(default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_matrix(cls, matrix: VectorMatrix, **options: object) -> "SegmentedIndex":
+        index = cls(schema_id=matrix.schema_id, mapping=list(matrix.mapping), **options)  # type: ignore[arg-type]
+        index._seal(matrix)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._locations) + len(self._memtable)
+
+    def __contains__(self, variety_id: object) -> bool:
+        return variety_id in self._memtable or variety_id in self._locations
+
+    @property
+    def segments(self) -> Tuple[Segment, ...]:
+        return self._segments
+
+    @property
+    def tombstone_ratio(self) -> float:
+        sealed = sum(len(segment.matrix) for segment in self._segments)
+        return sum(len(segment.dead) for segment in self._segments) / sealed if sealed else 0.0
+
+    def add(self, variety_id: str, vector: FeatureVector) -> None:
+        self.upsert(variety_id, vector)
+
+    def upsert(self, variety_id: str, vector: FeatureVector) -> None:
+        """Insert or replace ``variety_id``; a replaced sealed copy is tombstoned."""
+
+        if vector.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        with self._lock:
+            self._retire(variety_id)
+            self._memtable[variety_id] = vector
+            self._memtable_index = None
+            self.mapping = self.mapping or list(vector.mapping)
+            self.version += 1
+            frozen: Optional[Dict[str, FeatureVector]] = None
+            if not self._sealing and len(self._memtable) >= self.memtable_size:
+                self._sealing = True
+                frozen = dict(self._memtable)
+        if frozen is not None:
+            self._seal_memtable(frozen)
+        self.maybe_compact()
+
+    def delete(self, variety_id: str) -> None:
+        with self._lock:
+            if not self._retire(variety_id):
+                raise SimilarityError(f"unknown id {variety_id}")
+            self.version += 1
+        self.maybe_compact()
+
+    def _retire(self, variety_id: str) -> bool:
+        if self._memtable.pop(variety_id, None) is not None:
+            self._memtable_index = None
+            return True
+        segment = self._locations.pop(variety_id, None)
+        if segment is None:
+            return False
+        self._segments[segment].dead.add(variety_id)
+        if self._retired_during_compaction is not None:
+            self._retired_during_compaction.add(variety_id)
+        return True
+
+    def _seal(self, matrix: VectorMatrix) -> None:
+        """Append a segment built from ``matrix``; only for an index no other thread sees yet."""
+
+        number = len(self._segments)
+        self._segments = self._segments + (Segment(matrix=matrix, index=self.builder(matrix)),)
+        for variety_id in matrix.ids:
+            self._locations[str(variety_id)] = number
+        logger.info("Segment sealed", extra={"segment": number, "rows": len(matrix)})
+
+    def _seal_memtable(self, frozen: Dict[str, FeatureVector]) -> None:
+        """Build a segment from a memtable snapshot without the lock, then swap it in under the lock.
+
+        Entries replaced or deleted during the build stay in the memtable (or
+        stay gone); their copies in the new segment start out tombstoned.
+        """
+
+        try:
+            ids = list(frozen)
+            matrix = VectorMatrix.from_vectors([frozen[i] for i in ids], ids=ids)
+            segment = Segment(matrix=matrix, index=self.builder(matrix))
+            with self._lock:
+                number = len(self._segments)
+                self._segments = self._segments + (segment,)
+                for variety_id, vector in frozen.items():
+                    if self._memtable.get(variety_id) is vector:
+                        del self._memtable[variety_id]
+                        self._locations[variety_id] = number
+                    else:
+                        segment.dead.add(variety_id)
+                self._memtable_index = None
+                self.version += 1
+        finally:
+            with self._lock:
+                self._sealing = False
+        logger.info("Segment sealed", extra={"segment": number, "rows": len(matrix), "stale": len(segment.dead)})
+
+    def search(self, query: FeatureVector, top_k: int = 5) -> List[SimilarityResult]:
+        if query.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        segments, memtable = self._segments, self._memtable_snapshot()
+        ranked: List[Tuple[float, int, int, SimilarityResult]] = []
+        for number, segment in enumerate(segments):
+            dead = set(segment.dead)
+            fetched = segment.index.search(query, min(len(segment.matrix), top_k + len(dead)))
+            live = [result for result in fetched if result.candidate_id not in dead][:top_k]
+            ranked.extend((-result.score, number, rank, result) for rank, result in enumerate(live))
+        if memtable is not None:
+            ranked.extend((-result.score, len(segments), rank, result) for rank, result in enumerate(memtable.search(query, top_k)))
+        ranked.sort(key=lambda item: item[:3])
+        return [result for *_, result in ranked[:top_k]]
+
+    def _memtable_snapshot(self) -> Optional[FlatIndex]:
+        with self._lock:
+            if not self._memtable:
+                return None
+            if self._memtable_index is None:
+                ids = list(self._memtable)
+                self._memtable_index = FlatIndex.from_matrix(VectorMatrix.from_vectors([self._memtable[i] for i in ids], ids=ids))
+            return self._memtable_index
+
+    def maybe_compact(self) -> bool:
+        """Start a compaction when the tombstone ratio passes ``compaction_ratio``; returns whether one started."""
+
+        with self._lock:
+            if self.tombstone_ratio <= self.compaction_ratio or self._retired_during_compaction is not None:
+                return False
+            snapshot = self._segments
+            self._retired_during_compaction = set()
+        if self.background:
+            self._worker = threading.Thread(target=self._compact, args=(snapshot,), name="segment-compaction", daemon=True)
+            self._worker.start()
+        else:
+            self._compact(snapshot)
+        return True
+
+    def wait(self) -> None:
+        """Block until a running background compaction has been swapped in."""
+
+        worker = self._worker
+        if worker is not None:
+            worker.join()
+
+    def _compact(self, snapshot: Tuple[Segment, ...]) -> None:
+        try:
+            merged, rows = self._merge(snapshot)
+            with self._lock:
+                retired = self._retired_during_compaction or set()
+                if merged is not None:
+                    merged.dead = retired & set(merged.matrix.ids.tolist())
+                later = self._segments[len(snapshot) :]
+                self._segments = ((merged,) if merged is not None else ()) + later
+                self._locations = {
+                    str(variety_id): number
+                    for number, segment in enumerate(self._segments)
+                    for variety_id in segment.matrix.ids
+                    if str(variety_id) not in segment.dead
+                }
+                self.compactions += 1
+                self.version += 1
+        except Exception as exc:
+            # The old segments stay in place with their tombstones; the next write retries.
+            logger.warning("Segment compaction failed", extra={"segments": len(snapshot), "error": repr(exc)})
+            raise
+        finally:
+            with self._lock:
+                self._retired_during_compaction = None
+        logger.info("Segments compacted", extra={"segments": len(snapshot), "rows": rows})
+
+    def _merge(self, snapshot: Tuple[Segment, ...]) -> Tuple[Optional[Segment], int]:
+        parts = []
+        for segment in snapshot:
+            dead = set(segment.dead)
+            rows = np.array([row for row, variety_id in enumerate(segment.matrix.ids) if str(variety_id) not in dead], dtype=np.intp)
+            parts.append((segment.matrix.ids[rows], segment.matrix.values[rows]))
+        ids = np.concatenate([part[0] for part in parts]) if parts else np.empty(0, dtype=str)
+        values = np.concatenate([part[1] for part in parts]) if parts else np.empty((0, 0))
+        if not len(ids):
+            return None, 0
+        matrix = VectorMatrix.from_array(schema_id=self.schema_id, ids=ids, values=values, mapping=list(self.mapping))
+        return Segment(matrix=matrix, index=self.builder(matrix)), len(ids)
+
+    def live_matrix(self) -> Optional[VectorMatrix]:
+        """Every live entry (sealed and memtable) packed into one matrix."""
+
+        with self._lock:
+            ids: List[str] = []
+            rows: List[np.ndarray] = []
+            for segment in self._segments:
+                for row, variety_id in enumerate(segment.matrix.ids):
+                    if str(variety_id) not in segment.dead:
+                        ids.append(str(variety_id))
+                        rows.append(segment.matrix.values[row])
+            for variety_id, vector in self._memtable.items():
+                ids.append(variety_id)
+                rows.append(np.asarray(vector.values, dtype=np.float64))
+        if not ids:
+            return None
+        return VectorMatrix.from_array(schema_id=self.schema_id, ids=np.array(ids), values=np.array(rows), mapping=list(self.mapping))
+
+    def save(self, path: str | Path) -> Path:
+        """Persist the live entries; :meth:`load` rebuilds them as one segment."""
+
+        matrix = self.live_matrix()
+        if matrix is None:
+            raise SimilarityError("cannot save an empty segmented index")
+        return matrix.save(path)
+
+    @classmethod
+    def load(cls, path: str | Path, **options: object) -> "SegmentedIndex":
+        return cls.from_matrix(VectorMatrix.load(path), **options)
+
+
+__all__ = ["Segment", "SegmentBuilder", "SegmentedIndex"]
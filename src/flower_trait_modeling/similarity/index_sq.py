@@ -0,0 +1,152 @@
+"""Scalar-quantized index: coarse scoring on int8/float16 codes, exact rerank of the shortlist."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from . import metrics
+from .index_base import VectorIndex
+from .topk import top_k_indices
+from ..domain.models import FeatureVector, SimilarityResult
+from ..storage.quantization import ScalarQuantizer
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import StorageError
+from ..utils.io import memmap_npz_member
+from ..utils.logging import get_logger
+from ..utils.norms import row_norms
+
+logger = get_logger(__name__)
+
+# Rows decoded per block during coarse scoring, bounding the float32 scratch buffer.
+_CHUNK_ROWS = 65536
+
+
+@dataclass
+class ScalarQuantizedIndex(VectorIndex):
+    """Codes from a :class:`ScalarQuantizer` plus the float64 rows used only for reranking.
+
+    ``search`` ranks every row by approximate cosine on the codes, keeps
+    ``top_k * rerank`` candidates and rescores just those exactly. The float64
+    rows are saved uncompressed inside the same ``.npz`` as ``full`` and
+    memory-mapped from there by :meth:`load`, so only the codes and their
+    norms stay resident.
+    """
+
+    schema_id: str
+    quantizer: ScalarQuantizer
+    ids: np.ndarray
+    codes: np.ndarray
+    full: np.ndarray
+    mapping: List[str] = field(default_factory=list)
+    rerank: int = 4
+    _code_norms: np.ndarray = field(default_factory=lambda: np.empty(0), repr=False)
+    _positions: dict = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        self.ids = np.asarray(self.ids, dtype=str)
+        self._code_norms = self._decoded_norms()
+        self._positions = {str(variety_id): row for row, variety_id in enumerate(self.ids)}
+
+    def _decoded_norms(self) -> np.ndarray:
+        # Decode in blocks so the float scratch never holds the whole table.
+        return np.concatenate(
+            [np.empty(0)]
+            + [row_norms(self.quantizer.decode(self.codes[start : start + _CHUNK_ROWS])) for start in range(0, len(self.codes), _CHUNK_ROWS)]
+        )
+
+    @classmethod
+    def build(cls, matrix: VectorMatrix, dtype: str = "int8", rerank: int = 4) -> "ScalarQuantizedIndex":
+        quantizer = ScalarQuantizer.fit(matrix.values, dtype)
+        index = cls(
+            schema_id=matrix.schema_id,
+            quantizer=quantizer,
+            ids=matrix.ids,
+            codes=quantizer.encode(matrix.values),
+            full=matrix.values,
+            mapping=list(matrix.mapping),
+            rerank=rerank,
+        )
+        logger.info("Scalar-quantized index built", extra={"rows": len(index), "dtype": dtype, "bytes": index.nbytes})
+        return index
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    def __contains__(self, variety_id: object) -> bool:
+        return variety_id in self._positions
+
+    @property
+    def nbytes(self) -> int:
+        """Resident bytes used by coarse search (codes and their norms)."""
+
+        return int(self.codes.nbytes + self._code_norms.nbytes)
+
+    def coarse_scores(self, query: FeatureVector) -> np.ndarray:
+        q = np.asarray(query.values, dtype=np.float64)
+        if q.shape[0] != self.codes.shape[1]:
+            raise ValueError("vectors must be same length")
+        dots = np.concatenate(
+            [self.quantizer.dot(self.codes[start : start + _CHUNK_ROWS], q) for start in range(0, len(self), _CHUNK_ROWS)]
+        )
+        return dots / (self._code_norms * query.norm())
+
+    def search(self, query: FeatureVector, top_k: int = 5) -> List[SimilarityResult]:
+        if query.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        if not len(self):
+            return []
+        shortlist = np.sort(top_k_indices(self.coarse_scores(query), top_k * max(1, self.rerank)))
+        exact = metrics.cosine_batch(query.values, np.asarray(self.full[shortlist]), norm_q=query.norm())
+        return [
+            SimilarityResult(query_id=query.schema_id, candidate_id=str(self.ids[shortlist[i]]), score=float(exact[i]))
+            for i in top_k_indices(exact, top_k)
+        ]
+
+    def save(self, path: str | Path) -> Path:
+        target = Path(path)
+        try:
+            with target.open("wb") as handle:
+                np.savez(
+                    handle,
+                    schema_id=np.array(self.schema_id),
+                    dtype=np.array(self.quantizer.dtype),
+                    scale=self.quantizer.scale,
+                    offset=self.quantizer.offset,
+                    ids=self.ids,
+                    codes=self.codes,
+                    mapping=np.array(self.mapping, dtype=str),
+                    rerank=np.array(self.rerank),
+                    full=np.asarray(self.full),
+                )
+        except OSError as exc:
+            raise StorageError(str(target), str(exc)) from exc
+        logger.info("Saved scalar-quantized index", extra={"path": str(target), "rows": len(self)})
+        return target
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ScalarQuantizedIndex":
+        target = Path(path)
+        if not target.exists():
+            raise StorageError(str(target), "scalar-quantized index file not found")
+        try:
+            with np.load(target, allow_pickle=False) as data:
+                index = cls(
+                    schema_id=str(data["schema_id"]),
+                    quantizer=ScalarQuantizer(dtype=str(data["dtype"]), scale=data["scale"], offset=data["offset"]),
+                    ids=data["ids"],
+                    codes=data["codes"],
+                    full=memmap_npz_member(target, "full"),
+                    mapping=[str(name) for name in data["mapping"]],
+                    rerank=int(data["rerank"]),
+                )
+        except KeyError as exc:
+            raise StorageError(str(target), f"not a scalar-quantized index: missing {exc}") from exc
+        logger.debug("Loaded scalar-quantized index", extra={"path": str(target), "rows": len(index)})
+        return index
+
+
+__all__ = ["ScalarQuantizedIndex"]
@@ -0,0 +1,226 @@
+"""Materialized k-nearest-neighbour graph of the catalogue with incremental upserts."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .all_pairs import AllPairsJob
+from ..domain.models import FeatureVector, SimilarityResult
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import SimilarityError, StorageError
+from ..utils.logging import get_logger
+from ..utils.norms import row_norms, weighted_row_norms
+
+logger = get_logger(__name__)
+
+
+def _unit_rows(values: np.ndarray, weights: Optional[np.ndarray]) -> np.ndarray:
+    """Rows scaled by ``sqrt(weights)`` and to unit length, so a dot product is their (weighted) cosine."""
+
+    if weights is None:
+        return values / row_norms(values)[:, None]
+    return values * np.sqrt(weights) / weighted_row_norms(values, weights)[:, None]
+
+
+def _best(scores: np.ndarray, own: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top ``k`` columns per row of ``scores`` (own column excluded), ties by column, ``-1``/``-inf`` padded."""
+
+    masked = scores.copy()
+    masked[np.arange(scores.shape[0]), own] = -np.inf
+    cols = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.lexsort((cols, -masked), axis=1)[:, :k]
+    best = np.take_along_axis(masked, order, axis=1)
+    return _pad(np.where(np.isneginf(best), -1, order), best, k)
+
+
+def _pad(neighbors: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    missing = k - neighbors.shape[1]
+    if missing > 0:
+        neighbors = np.pad(neighbors, ((0, 0), (0, missing)), constant_values=-1)
+        scores = np.pad(scores, ((0, 0), (0, missing)), constant_values=-np.inf)
+    return neighbors, scores
+
+
+@dataclass
+class KNNGraph:
+    """``top_k`` cosine neighbours of every variety as ``(rows, k)`` adjacency arrays.
+
+    ``neighbors[r]`` holds row numbers best first (ties by row, ``-1`` when
+    the catalogue has fewer than ``k`` other rows) and ``scores[r]`` their
+    cosine, weighted by the engine's slot ``weights`` when given. The unit
+    rows are kept so :meth:`upsert` can repair only the neighbourhoods a
+    changed variety touches; the three arrays are views onto
+    capacity-doubling buffers, so inserts do not copy the whole graph.
+    """
+
+    ids: List[str]
+    neighbors: np.ndarray
+    scores: np.ndarray
+    units: np.ndarray
+    schema_id: str = ""
+    weights: Optional[np.ndarray] = None
+    _positions: Dict[str, int] = field(default_factory=dict, repr=False)
+    _buffers: Tuple[np.ndarray, np.ndarray, np.ndarray] = field(default=(), init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.ids = [str(variety_id) for variety_id in self.ids]
+        self._positions = {variety_id: row for row, variety_id in enumerate(self.ids)}
+        if self.weights is not None:
+            self.weights = np.asarray(self.weights, dtype=np.float64)
+            if self.weights.shape != (self.units.shape[1],):
+                raise SimilarityError("kNN graph needs one weight per slot")
+        self._buffers = (self.units, self.neighbors, self.scores)
+
+    @classmethod
+    def build(
+        cls, matrix: VectorMatrix, top_k: int = 10, memory_budget_mb: float = 256.0, weights: Optional[np.ndarray] = None
+    ) -> "KNNGraph":
+        """Batch job: blocked all-pairs top-k within ``memory_budget_mb`` (see :class:`AllPairsJob`).
+
+        Pass ``engine.slot_weights(matrix.mapping)`` as ``weights`` so the
+        graph ranks like a ``weighted_cosine`` engine.
+        """
+
+        if top_k < 1:
+            raise SimilarityError("top_k must be at least 1")
+        job = AllPairsJob(memory_budget_mb=memory_budget_mb, top_k=top_k)
+        units = _unit_rows(matrix.values, None if weights is None else np.asarray(weights, dtype=np.float64))
+        n = len(matrix)
+        neighbors = np.full((n, top_k), -1, dtype=np.intp)
+        scores = np.full((n, top_k), -np.inf)
+        for start, best_scores, best_cols, _ in job.neighbor_blocks(units, job.block_size(n)):
+            stop = start + best_scores.shape[0]
+            neighbors[start:stop] = np.where(np.isneginf(best_scores), -1, best_cols)
+            scores[start:stop] = best_scores
+        logger.info("kNN graph built", extra={"rows": n, "top_k": top_k})
+        return cls(ids=list(matrix.ids), neighbors=neighbors, scores=scores, units=units, schema_id=matrix.schema_id, weights=weights)
+
+    @property
+    def top_k(self) -> int:
+        return self.neighbors.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, variety_id: object) -> bool:
+        return variety_id in self._positions
+
+    def neighbors_of(self, variety_id: str) -> List[SimilarityResult]:
+        """Stored neighbours of ``variety_id``, best first; a dictionary lookup plus one row slice."""
+
+        row = self._positions.get(variety_id)
+        if row is None:
+            raise SimilarityError(f"unknown id {variety_id}")
+        return [
+            SimilarityResult(query_id=variety_id, candidate_id=self.ids[col], score=float(score))
+            for col, score in zip(self.neighbors[row].tolist(), self.scores[row].tolist())
+            if col >= 0
+        ]
+
+    def _append(self, unit: np.ndarray) -> int:
+        """Add an empty row for ``unit``, doubling the buffers when full; returns the new row."""
+
+        row = len(self.ids)
+        units, neighbors, scores = self._buffers
+        if row == units.shape[0]:
+            spare = max(row, 8)
+            units = np.concatenate([units, np.empty((spare, units.shape[1]))])
+            neighbors = np.concatenate([neighbors, np.empty((spare, self.top_k), dtype=np.intp)])
+            scores = np.concatenate([scores, np.empty((spare, self.top_k))])
+            self._buffers = (units, neighbors, scores)
+        units[row], neighbors[row], scores[row] = unit, -1, -np.inf
+        self.units, self.neighbors, self.scores = units[: row + 1], neighbors[: row + 1], scores[: row + 1]
+        return row
+
+    def upsert(self, variety_id: str, vector: FeatureVector) -> int:
+        """Insert or replace one variety and repair the graph; returns how many rows were touched.
+
+        Rows that listed the old vector are recomputed in full, rows whose
+        list the new vector now enters get it merged in, and the variety's own
+        row is rebuilt; every other row is left as is.
+        """
+
+        if self.schema_id and vector.schema_id != self.schema_id:
+            raise ValueError("schema mismatch")
+        values = np.asarray(vector.values, dtype=np.float64)
+        if values.shape[0] != self.units.shape[1]:
+            raise ValueError("vectors must be same length")
+        unit = _unit_rows(values[None, :], self.weights)[0]
+        row = self._positions.get(variety_id)
+        if row is None:
+            row = self._append(unit)
+            self.ids.append(variety_id)
+            self._positions[variety_id] = row
+            stale = np.empty(0, dtype=np.intp)
+        else:
+            self.units[row] = unit
+            stale = np.flatnonzero((self.neighbors == row).any(axis=1))
+        k = self.top_k
+        similarity = self.units @ unit
+        # Rows that listed the old vector may lose it, so they are rescored against everything.
+        if stale.size:
+            self.neighbors[stale], self.scores[stale] = _best(self.units[stale] @ self.units.T, stale, k)
+        # Everyone else only needs the new vector merged in if it beats their current k-th entry.
+        others = np.ones(len(self.ids), dtype=bool)
+        others[stale] = False
+        others[row] = False
+        last_col, last_score = self.neighbors[:, -1], self.scores[:, -1]
+        beats = (similarity > last_score) | ((similarity == last_score) & ((last_col < 0) | (row < last_col)))
+        entering = np.flatnonzero(others & beats)
+        if entering.size:
+            merged_cols = np.concatenate([self.neighbors[entering], np.full((entering.size, 1), row)], axis=1)
+            merged_scores = np.concatenate([self.scores[entering], similarity[entering, None]], axis=1)
+            # Padding sorts last: ``-inf`` score, and its ``-1`` column is remapped past every real row.
+            order = np.lexsort((np.where(merged_cols < 0, len(self.ids), merged_cols), -merged_scores), axis=1)[:, :k]
+            self.neighbors[entering] = np.take_along_axis(merged_cols, order, axis=1)
+            self.scores[entering] = np.take_along_axis(merged_scores, order, axis=1)
+        own_cols, own_scores = _best(similarity[None, :], np.array([row]), k)
+        self.neighbors[row], self.scores[row] = own_cols[0], own_scores[0]
+        touched = int(stale.size + entering.size + 1)
+        logger.info("kNN graph upserted", extra={"variety_id": variety_id, "touched": touched})
+        return touched
+
+    def save(self, path: str | Path) -> Path:
+        target = Path(path)
+        try:
+            with target.open("wb") as handle:
+                np.savez(
+                    handle,
+                    schema_id=np.array(self.schema_id),
+                    ids=np.array(self.ids, dtype=str),
+                    neighbors=self.neighbors,
+                    scores=self.scores,
+                    units=self.units,
+                    weights=np.empty(0) if self.weights is None else self.weights,
+                )
+        except OSError as exc:
+            raise StorageError(str(target), str(exc)) from exc
+        logger.info("Saved kNN graph", extra={"path": str(target), "rows": len(self)})
+        return target
+
+    @classmethod
+    def load(cls, path: str | Path) -> "KNNGraph":
+        target = Path(path)
+        if not target.exists():
+            raise StorageError(str(target), "kNN graph file not found")
+        try:
+            with np.load(target, allow_pickle=False) as data:
+                graph = cls(
+                    ids=data["ids"].tolist(),
+                    neighbors=data["neighbors"],
+                    scores=data["scores"],
+                    units=data["units"],
+                    schema_id=str(data["schema_id"]),
+                    weights=data["weights"] if "weights" in data.files and data["weights"].size else None,
+                )
+        except KeyError as exc:
+            raise StorageError(str(target), f"not a kNN graph: missing {exc}") from exc
+        logger.debug("Loaded kNN graph", extra={"path": str(target), "rows": len(graph)})
+        return graph
+
+
+__all__ = ["KNNGraph"]
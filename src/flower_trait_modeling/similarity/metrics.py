@@ -2,26 +2,111 @@
 
 from __future__ import annotations
 
-from typing import Iterable, List
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
 
 from ..utils.logging import get_logger
+from ..utils.norms import row_norms, weighted_row_norms
 
 logger = get_logger(__name__)
 
 
-def cosine(a: List[float], b: List[float]) -> float:
+def cosine(a: List[float], b: List[float], norm_a: Optional[float] = None, norm_b: Optional[float] = None) -> float:
+    """Cosine similarity; pass precomputed norms to reduce the call to one dot product."""
+
     import math
 
     if len(a) != len(b):
         raise ValueError("vectors must be same length")
     dot = sum(x * y for x, y in zip(a, b))
-    norm_a = math.sqrt(sum(x * x for x in a)) or 1.0
-    norm_b = math.sqrt(sum(y * y for y in b)) or 1.0
+    if norm_a is None:
+        norm_a = math.sqrt(sum(x * x for x in a)) or 1.0
+    if norm_b is None:
+        norm_b = math.sqrt(sum(y * y for y in b)) or 1.0
     score = dot / (norm_a * norm_b)
     logger.debug("Cosine computed", extra={"score": score})
     return score
 
 
+def cosine_batch(query: Sequence[float], matrix: np.ndarray, norms: Optional[np.ndarray] = None, norm_q: Optional[float] = None) -> np.ndarray:
+    """Cosine of ``query`` against every row of ``matrix`` in one matrix-vector product.
+
+    Zero norms fall back to ``1.0`` exactly as in :func:`cosine`, so each entry
+    matches the per-pair score. Cached ``norms`` (see :func:`row_norms`) skip
+    the per-call norm pass.
+    """
+
+    q = np.asarray(query, dtype=np.float64)
+    if matrix.ndim != 2 or matrix.shape[1] != q.shape[0]:
+        raise ValueError("vectors must be same length")
+    dots = matrix @ q
+    if norm_q is None:
+        norm_q = float(np.sqrt(q @ q)) or 1.0
+    if norms is None:
+        norms = row_norms(matrix)
+    scores = dots / (norm_q * norms)
+    logger.debug("Batch cosine computed", extra={"rows": matrix.shape[0]})
+    return scores
+
+
+def cosine_many(queries: np.ndarray, matrix: np.ndarray, norms: Optional[np.ndarray] = None) -> np.ndarray:
+    """``(queries, rows)`` cosine scores in one matrix-matrix product; row ``i`` matches :func:`cosine_batch`."""
+
+    q = np.asarray(queries, dtype=np.float64)
+    if matrix.ndim != 2 or q.ndim != 2 or matrix.shape[1] != q.shape[1]:
+        raise ValueError("vectors must be same length")
+    if norms is None:
+        norms = row_norms(matrix)
+    scores = (q @ matrix.T) / (row_norms(q)[:, None] * norms[None, :])
+    logger.debug("Many-query cosine computed", extra={"queries": q.shape[0], "rows": matrix.shape[0]})
+    return scores
+
+
+def weighted_cosine(a: List[float], b: List[float], weights: List[float]) -> float:
+    """Cosine under the inner product ``sum(w * x * y)``; zero weighted norms fall back to ``1.0``."""
+
+    import math
+
+    if not len(a) == len(b) == len(weights):
+        raise ValueError("vectors must be same length")
+    dot = sum(w * x * y for w, x, y in zip(weights, a, b))
+    norm_a = math.sqrt(sum(w * x * x for w, x in zip(weights, a))) or 1.0
+    norm_b = math.sqrt(sum(w * y * y for w, y in zip(weights, b))) or 1.0
+    score = dot / (norm_a * norm_b)
+    logger.debug("Weighted cosine computed", extra={"score": score})
+    return score
+
+
+def weighted_cosine_batch(query: Sequence[float], matrix: np.ndarray, weights: np.ndarray, norms: Optional[np.ndarray] = None) -> np.ndarray:
+    """:func:`weighted_cosine` of ``query`` against every row in one matrix-vector product."""
+
+    q = np.asarray(query, dtype=np.float64)
+    if matrix.ndim != 2 or not matrix.shape[1] == q.shape[0] == weights.shape[0]:
+        raise ValueError("vectors must be same length")
+    weighted_q = weights * q
+    dots = matrix @ weighted_q
+    norm_q = float(np.sqrt(q @ weighted_q)) or 1.0
+    if norms is None:
+        norms = weighted_row_norms(matrix, weights)
+    scores = dots / (norm_q * norms)
+    logger.debug("Batch weighted cosine computed", extra={"rows": matrix.shape[0]})
+    return scores
+
+
+def weighted_cosine_many(queries: np.ndarray, matrix: np.ndarray, weights: np.ndarray, norms: Optional[np.ndarray] = None) -> np.ndarray:
+    """:func:`weighted_cosine_batch` for a stack of queries in one matrix-matrix product."""
+
+    q = np.asarray(queries, dtype=np.float64)
+    if matrix.ndim != 2 or q.ndim != 2 or not matrix.shape[1] == q.shape[1] == weights.shape[0]:
+        raise ValueError("vectors must be same length")
+    if norms is None:
+        norms = weighted_row_norms(matrix, weights)
+    scores = ((q * weights) @ matrix.T) / (weighted_row_norms(q, weights)[:, None] * norms[None, :])
+    logger.debug("Many-query weighted cosine computed", extra={"queries": q.shape[0], "rows": matrix.shape[0]})
+    return scores
+
+
 def jaccard(a: Iterable[str], b: Iterable[str]) -> float:
     set_a, set_b = set(a), set(b)
     intersection = len(set_a & set_b)
@@ -31,6 +116,19 @@ def jaccard(a: Iterable[str], b: Iterable[str]) -> float:
     return score
 
 
+def jaccard_batch(query: np.ndarray, members: np.ndarray) -> np.ndarray:
+    """:func:`jaccard` of one multi-hot row against every row of ``members`` (``(rows, vocab)`` 0/1)."""
+
+    q = np.asarray(query, dtype=np.float64)
+    hot = np.asarray(members, dtype=np.float64)
+    intersection = hot @ q
+    union = hot.sum(axis=1) + q.sum() - intersection
+    union[union == 0.0] = 1.0
+    scores = intersection / union
+    logger.debug("Batch Jaccard computed", extra={"rows": hot.shape[0]})
+    return scores
+
+
 def delta_e(lab_a: List[float], lab_b: List[float]) -> float:
     import math
 
@@ -39,4 +137,26 @@ def delta_e(lab_a: List[float], lab_b: List[float]) -> float:
     return diff
 
 
-__all__ = ["cosine", "jaccard", "delta_e"]
+def delta_e_batch(lab: Sequence[float], labs: np.ndarray) -> np.ndarray:
+    """:func:`delta_e` of one LAB triple against every row of ``labs``."""
+
+    diff = np.asarray(labs, dtype=np.float64) - np.asarray(lab, dtype=np.float64)
+    distances = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+    logger.debug("Batch delta E computed", extra={"rows": distances.shape[0]})
+    return distances
+
+
+__all__ = [
+    "cosine",
+    "row_norms",
+    "cosine_batch",
+    "cosine_many",
+    "weighted_cosine",
+    "weighted_row_norms",
+    "weighted_cosine_batch",
+    "weighted_cosine_many",
+    "jaccard",
+    "jaccard_batch",
+    "delta_e",
+    "delta_e_batch",
+]
@@ -0,0 +1,141 @@
+"""Coarse-then-fine retrieval: cheap single-metric shortlist, full metric fusion on the survivors."""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from . import metrics
+from .config import PipelineConfig
+from .retrieval import RetrievalEngine
+from .strategies import SimilarityStrategy
+from .topk import top_k_indices
+from ..domain.models import FeatureVector, SimilarityResult
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import SimilarityError
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class PipelineResult:
+    """Final ranking plus per-stage latency (milliseconds) and candidate counts.
+
+    ``rows[i]`` is the ``matrix`` row of ``results[i]``. ``candidates`` has no
+    ``coarse`` entry when an index shortlisted, since how many rows it
+    scored is up to the backend.
+    """
+
+    results: List[SimilarityResult]
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    candidates: Dict[str, int] = field(default_factory=dict)
+    rows: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.intp))
+
+    def report(self) -> str:
+        return ", ".join(
+            f"{stage}: {self.candidates[stage]} rows in {ms:.3f} ms" if stage in self.candidates else f"{stage}: {ms:.3f} ms"
+            for stage, ms in self.latency_ms.items()
+        )
+
+
+@dataclass
+class TwoStagePipeline:
+    """Shortlist ``config.shortlist`` rows by one metric, then re-score only those with ``strategy.fuse``.
+
+    The coarse stage scores the whole matrix with ``config.coarse_metric``:
+    ``vector`` is ``RetrievalEngine``'s (weighted) cosine, ``color`` the
+    ``delta_e`` distance and ``categorical`` the ``jaccard`` overlap; with
+    ``config.coarse`` set to ``"index"`` the attached :class:`VectorIndex`
+    shortlists instead. The fine stage computes ``config.fine_metrics``
+    columns for the shortlist only, with the engine's slot weights on the
+    ``vector`` column so both stages agree on it.
+    """
+
+    retrieval: RetrievalEngine
+    strategy: SimilarityStrategy
+    config: PipelineConfig = field(default_factory=PipelineConfig)
+
+    def run(
+        self,
+        query: FeatureVector,
+        matrix: VectorMatrix,
+        top_k: int = 5,
+        query_color: Optional[Sequence[float]] = None,
+        colors: Optional[np.ndarray] = None,
+        query_categories: Optional[np.ndarray] = None,
+        categories: Optional[np.ndarray] = None,
+    ) -> PipelineResult:
+        """Rank ``matrix`` rows; ``colors``/``categories`` are full-catalogue arrays aligned with ``matrix``."""
+
+        fine = self.config.fine_metrics
+        needed = set(fine) | {self.config.coarse_metric}
+        if "color" in needed and (query_color is None or colors is None):
+            raise SimilarityError("pipeline needs query_color and colors for the color metric")
+        if "categorical" in needed and (query_categories is None or categories is None):
+            raise SimilarityError("pipeline needs query_categories and categories for the categorical metric")
+
+        started = time.perf_counter()
+        rows = self._shortlist(query, matrix, query_color, colors, query_categories, categories)
+        coarse_done = time.perf_counter()
+
+        shortlist = VectorMatrix.from_array(schema_id=matrix.schema_id, ids=matrix.ids[rows], values=matrix.values[rows], mapping=list(matrix.mapping))
+        columns = self.strategy.score_columns(
+            query,
+            shortlist,
+            query_color=query_color if "color" in fine else None,
+            colors=colors[rows] if "color" in fine else None,
+            query_categories=query_categories if "categorical" in fine else None,
+            categories=categories[rows] if "categorical" in fine else None,
+            weights=self.retrieval.engine.slot_weights(query.mapping),
+        )
+        fused = self.strategy.fuse({name: column for name, column in columns.items() if name in fine})
+        best = top_k_indices(fused, top_k)
+        results = [SimilarityResult(query_id=query.schema_id, candidate_id=str(shortlist.ids[i]), score=float(fused[i])) for i in best]
+        fine_done = time.perf_counter()
+
+        candidates = {"fine": int(rows.size)}
+        if self.config.coarse == "matrix":
+            candidates = {"coarse": len(matrix), **candidates}
+        outcome = PipelineResult(
+            results=results,
+            latency_ms={"coarse": (coarse_done - started) * 1000.0, "fine": (fine_done - coarse_done) * 1000.0},
+            candidates=candidates,
+            rows=rows[best],
+        )
+        logger.info("Two-stage retrieval", extra={"shortlist": int(rows.size), "latency_ms": outcome.latency_ms})
+        return outcome
+
+    def _shortlist(
+        self,
+        query: FeatureVector,
+        matrix: VectorMatrix,
+        query_color: Optional[Sequence[float]],
+        colors: Optional[np.ndarray],
+        query_categories: Optional[np.ndarray],
+        categories: Optional[np.ndarray],
+    ) -> np.ndarray:
+        size = self.config.shortlist
+        if self.config.coarse == "index":
+            positions = {str(variety_id): row for row, variety_id in enumerate(matrix.ids)}
+            hits = self.retrieval.search_index(query, size)
+            missing = [hit.candidate_id for hit in hits if hit.candidate_id not in positions]
+            if missing:
+                raise SimilarityError(f"index returned ids missing from the matrix: {missing[:5]}")
+            return np.array([positions[hit.candidate_id] for hit in hits], dtype=np.intp)
+        metric = self.config.coarse_metric
+        if metric == "color":
+            scores = -metrics.delta_e_batch(query_color, colors)
+        elif metric == "categorical":
+            scores = metrics.jaccard_batch(query_categories, categories)
+        else:
+            scores = self.retrieval.engine.compare_matrix(query, matrix)
+        if scores.shape[0] != len(matrix):
+            raise SimilarityError(f"{metric} scores have {scores.shape[0]} rows, matrix has {len(matrix)}")
+        return top_k_indices(scores, size)
+
+
+__all__ = ["PipelineResult", "TwoStagePipeline"]
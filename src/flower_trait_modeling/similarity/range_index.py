@@ -0,0 +1,87 @@
+"""Sorted-array range index over numeric traits."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.errors import SimilarityError
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+NUMERIC_TRAITS = ("flower_diameter_cm", "stem_length_cm", "vase_life_days")
+
+Bounds = Tuple[Optional[float], Optional[float]]
+
+
+def _numeric(value: object) -> float:
+    """``None``, blank strings and missing fields become ``NaN`` and stay out of the column."""
+
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return np.nan
+    return float(value)  # type: ignore[arg-type]
+
+
+@dataclass
+class SortedColumn:
+    """Values of one trait in ascending order with the catalogue row of each value."""
+
+    values: np.ndarray
+    rows: np.ndarray
+
+    def between(self, low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        """Rows with ``low <= value <= high`` (open ends allowed) via two binary searches."""
+
+        start = 0 if low is None else int(np.searchsorted(self.values, low, side="left"))
+        stop = self.values.shape[0] if high is None else int(np.searchsorted(self.values, high, side="right"))
+        return self.rows[start:stop]
+
+
+@dataclass
+class RangeIndex:
+    """Per-trait sorted columns answering range queries in ``O(log n + hits)``.
+
+    Row ``i`` refers to catalogue row ``i`` so results line up with a
+    :class:`VectorMatrix` or :class:`BitmapIndex` built from the same records.
+    """
+
+    size: int
+    ids: np.ndarray
+    columns: Dict[str, SortedColumn] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, records: Sequence[Mapping[str, object]], fields: Sequence[str] = NUMERIC_TRAITS) -> "RangeIndex":
+        ids = np.array([str(record.get("variety_id", idx)) for idx, record in enumerate(records)], dtype=str)
+        index = cls(size=len(records), ids=ids)
+        for name in fields:
+            column = np.array([_numeric(record.get(name)) for record in records], dtype=np.float64)
+            order = np.argsort(column, kind="stable")
+            present = order[~np.isnan(column[order])]
+            index.columns[name] = SortedColumn(values=column[present], rows=present)
+        logger.info("Range index built", extra={"rows": index.size, "fields": list(fields)})
+        return index
+
+    def rows(self, name: str, low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        if name not in self.columns:
+            raise SimilarityError(f"field {name} is not range-indexed")
+        return self.columns[name].between(low, high)
+
+    def select(self, ranges: Mapping[str, Bounds]) -> np.ndarray:
+        """Ascending rows satisfying every ``field: (low, high)`` bound."""
+
+        selected: Optional[np.ndarray] = None
+        # Intersect the narrowest bound first; each field is searched once.
+        for hits in sorted((self.rows(name, low, high) for name, (low, high) in ranges.items()), key=len):
+            selected = np.sort(hits) if selected is None else np.intersect1d(selected, hits, assume_unique=True)
+            if selected.size == 0:
+                break
+        return np.arange(self.size) if selected is None else selected
+
+    def select_ids(self, ranges: Mapping[str, Bounds]) -> list:
+        return [str(variety_id) for variety_id in self.ids[self.select(ranges)]]
+
+
+__all__ = ["NUMERIC_TRAITS", "Bounds", "SortedColumn", "RangeIndex"]
@@ -2,35 +2,383 @@
 
 from __future__ import annotations
 
+import json
 from dataclasses import dataclass
-from typing import Iterable, List
+from typing import Callable, Hashable, Iterable, Iterator, List, Mapping, Optional, Tuple
 
+import numpy as np
+
+from .bitmap import BitmapIndex, FilterLike
+from .color_index import ColorIndex, ColorLike
+from .diversity import mmr_select
 from .engine import SimilarityEngine
+from .index_base import VectorIndex
+from .range_index import Bounds, RangeIndex
+from .sharded import ShardedMatrix
+from .threshold_topk import GroupBoundIndex
+from .topk import TopKHeap, top_k_indices
 from ..domain.models import FeatureVector, SimilarityResult
+from ..storage.cache import QueryResultCache
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import SimilarityError
+from ..utils.hashing import stable_hash
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
 
 
-def _normalize_scores(results: List[SimilarityResult]) -> List[SimilarityResult]:
+def _normalize_scores(results: List[SimilarityResult], max_score: float | None = None) -> List[SimilarityResult]:
     if not results:
         return results
-    max_score = max(r.score for r in results) or 1.0
+    if max_score is None:
+        max_score = max(r.score for r in results)
+    max_score = max_score or 1.0
     for r in results:
         r.score = r.score / max_score
     return results
 
 
+def _filter_json(value: object) -> object:
+    # Sets iterate in hash order, which varies between runs; sort them so equal filters share a key.
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    return repr(value)
+
+
+@dataclass
+class RankedRows:
+    """Matrix search results with the ``matrix`` row of each result and the score normalizer.
+
+    ``results[i]`` scores ``matrix`` row ``rows[i]``; its displayed score is the
+    engine's raw score divided by ``normalizer``.
+    """
+
+    rows: np.ndarray
+    results: List[SimilarityResult]
+    normalizer: float = 1.0
+
+
 @dataclass
 class RetrievalEngine:
     engine: SimilarityEngine
+    index: Optional[VectorIndex] = None
+    bitmap: Optional[BitmapIndex] = None
+    ranges: Optional[RangeIndex] = None
+    colors: Optional[ColorIndex] = None
+    cache: Optional[QueryResultCache] = None
 
     def search(self, query: FeatureVector, candidates: Iterable[FeatureVector], top_k: int = 5) -> List[SimilarityResult]:
-        results = [self.engine.compare(query, candidate) for candidate in candidates]
-        normalized = _normalize_scores(results)
-        normalized.sort(key=lambda item: item.score, reverse=True)
-        logger.info("Retrieved candidates", extra={"count": len(normalized)})
-        return normalized[:top_k]
+        """Stream ``candidates`` through a bounded heap; memory stays O(top_k) for any iterable."""
+
+        heap: TopKHeap[SimilarityResult] = TopKHeap(top_k)
+        for candidate in candidates:
+            result = self.engine.compare(query, candidate)
+            heap.push(result.score, result)
+        normalized = _normalize_scores([result for _, result in heap.items()], heap.max_score)
+        logger.info("Retrieved candidates", extra={"count": heap.seen})
+        return normalized
+
+    def search_matrix(
+        self,
+        query: FeatureVector,
+        matrix: VectorMatrix,
+        top_k: int = 5,
+        where: Optional[FilterLike] = None,
+        between: Optional[Mapping[str, Bounds]] = None,
+        near_color: Optional[Tuple[ColorLike, float]] = None,
+    ) -> List[SimilarityResult]:
+        """Vectorized ``search`` over a packed matrix; candidate ids come from ``matrix.ids``.
+
+        ``where`` is resolved against the attached :class:`BitmapIndex`,
+        ``between`` (e.g. ``{"stem_length_cm": (60, 80)}``) against the attached
+        :class:`RangeIndex` and ``near_color`` (``(color, max_delta_e)``) against
+        the attached :class:`ColorIndex` before scoring, so only the filtered
+        rows are scored.
+        """
+
+        filters = {"where": where, "between": between, "near_color": near_color}
+        sources = (matrix, self.bitmap, self.ranges, self.colors)
+        return self._cached(query, top_k, filters, sources, matrix.version, lambda: self._search_matrix(query, matrix, top_k, **filters))
+
+    def _search_matrix(
+        self,
+        query: FeatureVector,
+        matrix: VectorMatrix,
+        top_k: int,
+        where: Optional[FilterLike],
+        between: Optional[Mapping[str, Bounds]],
+        near_color: Optional[Tuple[ColorLike, float]],
+    ) -> List[SimilarityResult]:
+        return self.rank_matrix(query, matrix, top_k, where=where, between=between, near_color=near_color).results
+
+    def rank_matrix(
+        self,
+        query: FeatureVector,
+        matrix: VectorMatrix,
+        top_k: int = 5,
+        where: Optional[FilterLike] = None,
+        between: Optional[Mapping[str, Bounds]] = None,
+        near_color: Optional[Tuple[ColorLike, float]] = None,
+    ) -> RankedRows:
+        """Uncached ``search_matrix`` that also returns the row of every result, so repeated ids stay distinct."""
+
+        subset = self._filter_rows(matrix, where, between, near_color)
+        scores = self.engine.compare_matrix(query, matrix, rows=subset)
+        if scores.size == 0:
+            return RankedRows(rows=np.empty(0, dtype=np.intp), results=[])
+        best = top_k_indices(scores, top_k)
+        positions = best if subset is None else subset[best]
+        results = [
+            SimilarityResult(query_id=query.schema_id, candidate_id=str(matrix.ids[row]), score=float(scores[i]))
+            for i, row in zip(best, positions)
+        ]
+        normalizer = float(scores.max()) or 1.0
+        logger.info("Retrieved candidates", extra={"count": scores.size})
+        return RankedRows(rows=np.asarray(positions, dtype=np.intp), results=_normalize_scores(results, normalizer), normalizer=normalizer)
+
+    def search_diverse(
+        self,
+        query: FeatureVector,
+        matrix: VectorMatrix,
+        top_k: int = 5,
+        mmr_lambda: float = 0.7,
+        pool_size: int = 50,
+        where: Optional[FilterLike] = None,
+        between: Optional[Mapping[str, Bounds]] = None,
+        near_color: Optional[Tuple[ColorLike, float]] = None,
+    ) -> List[SimilarityResult]:
+        """``search_matrix`` reranked by maximal marginal relevance over the best ``pool_size`` rows.
+
+        Results keep their normalized relevance scores but are ordered by MMR
+        pick, so near-duplicates of an earlier pick drop down the list. MMR
+        itself compares relevance and redundancy on the same plain (weighted)
+        cosine scale.
+        """
+
+        return self.rank_diverse(query, matrix, top_k, mmr_lambda, pool_size, where=where, between=between, near_color=near_color).results
+
+    def rank_diverse(
+        self,
+        query: FeatureVector,
+        matrix: VectorMatrix,
+        top_k: int = 5,
+        mmr_lambda: float = 0.7,
+        pool_size: int = 50,
+        where: Optional[FilterLike] = None,
+        between: Optional[Mapping[str, Bounds]] = None,
+        near_color: Optional[Tuple[ColorLike, float]] = None,
+    ) -> RankedRows:
+        """``search_diverse`` that also returns the row of every result, like :meth:`rank_matrix`."""
+
+        pool = self.rank_matrix(query, matrix, max(top_k, pool_size), where=where, between=between, near_color=near_color)
+        if len(pool.results) <= 1:
+            return RankedRows(rows=pool.rows[:top_k], results=pool.results[:top_k], normalizer=pool.normalizer)
+        block = self.engine.similarity_block(matrix, pool.rows)
+        # Undo max-normalization and the vector metric weight so relevance is the same cosine as ``block``.
+        scale = pool.normalizer / (self.engine.metric_weights.get("vector", 1.0) or 1.0)
+        picked = mmr_select(np.array([result.score for result in pool.results]) * scale, block, top_k, mmr_lambda)
+        logger.info("Diversified candidates", extra={"pool": len(pool.results), "count": len(picked)})
+        return RankedRows(rows=pool.rows[picked], results=[pool.results[i] for i in picked], normalizer=pool.normalizer)
+
+    def search_bounded(self, query: FeatureVector, bounds: GroupBoundIndex, top_k: int = 5) -> List[SimilarityResult]:
+        """``search_matrix`` over ``bounds.matrix`` that exactly scores only rows surviving group-bound pruning.
+
+        ``bounds`` must be built with this engine's slot weights; results are
+        identical to ``search_matrix``.
+        """
+
+        matrix = bounds.matrix
+        self._check_bound_weights(query, bounds)
+        rows, stats = bounds.candidates(query, top_k)
+        scores = self.engine.compare_matrix(query, matrix, rows=rows)
+        if scores.size == 0:
+            return []
+        results = [
+            SimilarityResult(query_id=query.schema_id, candidate_id=str(matrix.ids[rows[i]]), score=float(scores[i]))
+            for i in top_k_indices(scores, top_k)
+        ]
+        logger.info("Retrieved candidates", extra={"count": stats.survivors, "work_ratio": stats.work_ratio})
+        return _normalize_scores(results, float(scores.max()))
+
+    def _check_bound_weights(self, query: FeatureVector, bounds: GroupBoundIndex) -> None:
+        """Bounds built with other slot weights would prune rows that actually qualify."""
+
+        weights = self.engine.slot_weights(query.mapping)
+        if not np.array_equal(bounds.weights, np.ones(bounds.matrix.width) if weights is None else weights):
+            raise SimilarityError("group bounds were built with different slot weights")
+
+    def search_radius(
+        self,
+        query: FeatureVector,
+        matrix: VectorMatrix,
+        threshold: float,
+        bounds: Optional[GroupBoundIndex] = None,
+        chunk_rows: int = 65536,
+    ) -> Iterator[SimilarityResult]:
+        """Every row scoring ``>= threshold``, best first, with no ``top_k`` cap.
+
+        Scores are the engine's raw (un-normalized) scores, so the threshold is
+        absolute. With ``bounds`` only rows whose group upper bound reaches the
+        threshold are scored exactly; otherwise ``matrix`` is scanned in
+        ``chunk_rows`` blocks. Either way only the matches are kept, and result
+        objects are built lazily as the iterator is consumed.
+        """
+
+        if bounds is not None:
+            if bounds.matrix is not matrix:
+                raise SimilarityError("group bounds were built over a different matrix")
+            self._check_bound_weights(query, bounds)
+            weight = self.engine.metric_weights.get("vector", 1.0)
+            if weight <= 0.0:
+                raise SimilarityError("bounded radius search needs a positive vector weight")
+            candidates, stats = bounds.within(query, threshold / weight)
+            scores = self.engine.compare_matrix(query, matrix, rows=candidates)
+            keep = scores >= threshold
+            rows, scores = candidates[keep], scores[keep]
+            logger.info("Radius candidates pruned", extra={"survivors": stats.survivors, "work_ratio": stats.work_ratio})
+        else:
+            parts_rows: List[np.ndarray] = []
+            parts_scores: List[np.ndarray] = []
+            for start in range(0, len(matrix), chunk_rows):
+                block = np.arange(start, min(len(matrix), start + chunk_rows))
+                block_scores = self.engine.compare_matrix(query, matrix, rows=block)
+                keep = block_scores >= threshold
+                parts_rows.append(block[keep])
+                parts_scores.append(block_scores[keep])
+            rows = np.concatenate(parts_rows) if parts_rows else np.empty(0, dtype=np.intp)
+            scores = np.concatenate(parts_scores) if parts_scores else np.empty(0)
+        order = np.argsort(-scores, kind="stable")
+        logger.info("Radius search matched", extra={"threshold": threshold, "count": int(order.size)})
+        ids = matrix.ids
+        return (SimilarityResult(query_id=query.schema_id, candidate_id=str(ids[rows[i]]), score=float(scores[i])) for i in order)
+
+    def search_matrix_many(self, queries: List[FeatureVector], matrix: VectorMatrix, top_k: int = 5) -> List[List[SimilarityResult]]:
+        """``search_matrix`` for a batch of queries sharing one matrix-matrix scoring pass."""
+
+        if not queries:
+            return []
+        scores = self.engine.compare_many(queries, matrix)
+        batch: List[List[SimilarityResult]] = []
+        for query, row_scores in zip(queries, scores):
+            results = [
+                SimilarityResult(query_id=query.schema_id, candidate_id=str(matrix.ids[row]), score=float(row_scores[row]))
+                for row in top_k_indices(row_scores, top_k)
+            ]
+            batch.append(_normalize_scores(results, float(row_scores.max()) if row_scores.size else None))
+        logger.info("Retrieved candidates", extra={"queries": len(queries), "count": scores.size})
+        return batch
+
+    def cache_key(self, query: FeatureVector, top_k: int, filters: Optional[Mapping[str, object]] = None) -> str:
+        """``stable_hash`` fingerprint of the query vector, weight scheme, filters and ``top_k``."""
+
+        scheme = self.engine.weight_scheme.name if self.engine.weight_scheme is not None else ""
+        # Mappings serialize key-sorted, set values sorted; filter expressions are frozen dataclasses with a stable repr.
+        filters_text = json.dumps(dict(filters or {}), sort_keys=True, default=_filter_json)
+        parts = [
+            query.schema_id,
+            "|".join(query.mapping),
+            np.asarray(query.values, dtype=np.float64).tobytes().hex(),
+            scheme,
+            repr(self.engine.metric_weights.get("vector", 1.0)),
+            filters_text,
+            str(top_k),
+        ]
+        # Length-prefix each part so adjacent parts cannot run together.
+        return stable_hash(f"{len(part)}:{part}" for part in parts)
+
+    def _cached(
+        self,
+        query: FeatureVector,
+        top_k: int,
+        filters: Optional[Mapping[str, object]],
+        sources: Tuple[object, ...],
+        version: Hashable,
+        compute: Callable[[], List[SimilarityResult]],
+    ) -> List[SimilarityResult]:
+        if self.cache is None:
+            return compute()
+        key = self.cache_key(query, top_k, filters)
+        results = self.cache.get(key, sources, version)
+        if results is None:
+            results = compute()
+            self.cache.put(key, sources, version, results)
+        return results
+
+    def _filter_rows(
+        self,
+        matrix: VectorMatrix,
+        where: Optional[FilterLike],
+        between: Optional[Mapping[str, Bounds]] = None,
+        near_color: Optional[Tuple[ColorLike, float]] = None,
+    ) -> Optional[np.ndarray]:
+        subset: Optional[np.ndarray] = None
+        if where is not None:
+            if self.bitmap is None:
+                raise SimilarityError("filtered search needs a bitmap index")
+            if self.bitmap.size != len(matrix):
+                raise SimilarityError(f"bitmap covers {self.bitmap.size} rows, matrix has {len(matrix)}")
+            subset = self.bitmap.select(where)
+        if between:
+            if self.ranges is None:
+                raise SimilarityError("range-filtered search needs a range index")
+            if self.ranges.size != len(matrix):
+                raise SimilarityError(f"range index covers {self.ranges.size} rows, matrix has {len(matrix)}")
+            hits = self.ranges.select(between)
+            subset = hits if subset is None else np.intersect1d(subset, hits, assume_unique=True)
+        if near_color is not None:
+            if self.colors is None:
+                raise SimilarityError("color-filtered search needs a color index")
+            if len(self.colors) != len(matrix):
+                raise SimilarityError(f"color index covers {len(self.colors)} rows, matrix has {len(matrix)}")
+            hits = self.colors.within_rows(*near_color)
+            subset = hits if subset is None else np.intersect1d(subset, hits, assume_unique=True)
+        return subset
+
+    def search_sharded(self, query: FeatureVector, sharded: ShardedMatrix, top_k: int = 5) -> List[SimilarityResult]:
+        """``search_matrix`` scored across the process pool of ``sharded``; results are identical."""
+
+        rows, scores, max_score = sharded.top_k(
+            query, top_k, weights=self.engine.slot_weights(query.mapping), scale=self.engine.metric_weights.get("vector", 1.0)
+        )
+        ids = sharded.matrix.ids
+        results = [
+            SimilarityResult(query_id=query.schema_id, candidate_id=str(ids[row]), score=float(score))
+            for row, score in zip(rows.tolist(), scores.tolist())
+        ]
+        logger.info("Retrieved candidates", extra={"count": len(sharded), "shards": sharded.shards})
+        return _normalize_scores(results, max_score)
+
+    def search_batches(self, query: FeatureVector, batches: Iterable[VectorMatrix], top_k: int = 5) -> List[SimilarityResult]:
+        """Score a stream of matrix chunks (e.g. read lazily from disk), keeping only a running top-k."""
+
+        heap: TopKHeap[str] = TopKHeap(top_k)
+        for batch in batches:
+            scores = self.engine.compare_matrix(query, batch)
+            if scores.size == 0:
+                continue
+            heap.max_score = max(heap.max_score, float(scores.max()))
+            for row in top_k_indices(scores, top_k):
+                heap.push(float(scores[row]), str(batch.ids[row]))
+            heap.seen += scores.size - min(top_k, scores.size)
+        results = [SimilarityResult(query_id=query.schema_id, candidate_id=candidate_id, score=score) for score, candidate_id in heap.items()]
+        logger.info("Retrieved candidates", extra={"count": heap.seen})
+        return _normalize_scores(results, heap.max_score)
+
+    def search_index(self, query: FeatureVector, top_k: int = 5) -> List[SimilarityResult]:
+        """``search`` contract served by the attached :class:`VectorIndex` instead of a candidate list."""
+
+        if self.index is None:
+            raise SimilarityError("retrieval engine has no index attached")
+        index = self.index
+        return self._cached(query, top_k, None, (index,), index.version, lambda: self._search_index(index, query, top_k))
+
+    def _search_index(self, index: VectorIndex, query: FeatureVector, top_k: int) -> List[SimilarityResult]:
+        results = index.search(query, top_k)
+        weight = self.engine.metric_weights.get("vector", 1.0)
+        for result in results:
+            result.score = result.score * weight
+        logger.info("Retrieved candidates from index", extra={"count": len(results)})
+        return _normalize_scores(results)
 
 
-__all__ = ["RetrievalEngine"]
+__all__ = ["RankedRows", "RetrievalEngine"]
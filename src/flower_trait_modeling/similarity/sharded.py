@@ -0,0 +1,144 @@
+"""Process-pool scatter-gather scoring over a matrix held in shared memory."""
+
+from __future__ import annotations
+
+import multiprocessing
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory, util
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import metrics
+from .topk import top_k_indices
+from ..domain.models import FeatureVector
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import SimilarityError
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Per-worker views onto the shared block, set once by ``_attach``.
+_WORKER: Dict[str, Any] = {}
+
+
+def _attach(name: str, rows: int, width: int) -> None:
+    block = shared_memory.SharedMemory(name=name)
+    buffer = np.ndarray((rows, width + 1), dtype=np.float64, buffer=block.buf)
+    _WORKER.update(block=block, values=buffer[:, :width], norms=buffer[:, width], weighted={})
+    # Pool workers skip atexit; multiprocessing runs its finalizers on every clean worker exit.
+    util.Finalize(None, _detach, exitpriority=10)
+
+
+def _detach() -> None:
+    """Drop the worker's views, then close (never unlink) its handle on the block."""
+
+    block = _WORKER.pop("block", None)
+    try:
+        _WORKER.clear()
+    finally:
+        if block is not None:
+            block.close()
+
+
+def _score_shard(task: Tuple[int, int, np.ndarray, float, Optional[np.ndarray], float, int]) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Top ``k`` global rows of one shard, their scores and the shard maximum."""
+
+    start, stop, query, norm_q, weights, scale, k = task
+    values = _WORKER["values"][start:stop]
+    if weights is None:
+        scores = metrics.cosine_batch(query, values, norms=_WORKER["norms"][start:stop], norm_q=norm_q)
+    else:
+        key = (start, weights.tobytes())
+        if key not in _WORKER["weighted"]:
+            _WORKER["weighted"][key] = metrics.weighted_row_norms(values, weights)
+        scores = metrics.weighted_cosine_batch(query, values, weights, norms=_WORKER["weighted"][key])
+    scores = scores * scale
+    if scores.size == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0), float("-inf")
+    best = top_k_indices(scores, k)
+    return best + start, scores[best], float(scores.max())
+
+
+@dataclass
+class ShardedMatrix:
+    """A :class:`VectorMatrix` copied once into shared memory and scored by a process pool.
+
+    Rows are split into ``shards`` contiguous ranges; each worker attaches to
+    the block by name at start-up, so per query only the query vector and
+    each shard's top-k cross the process boundary. Use as a context manager
+    (or call :meth:`close`) to stop the pool and release the block.
+    """
+
+    matrix: VectorMatrix
+    shards: int = 0
+    processes: int = 0
+    _block: Optional[shared_memory.SharedMemory] = field(default=None, init=False, repr=False)
+    _pool: Any = field(default=None, init=False, repr=False)
+    _bounds: List[Tuple[int, int]] = field(default_factory=list, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        cores = multiprocessing.cpu_count()
+        self.processes = self.processes or cores
+        self.shards = max(1, min(self.shards or self.processes, len(self.matrix)))
+        edges = np.linspace(0, len(self.matrix), self.shards + 1).astype(int)
+        self._bounds = list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+        rows, width = len(self.matrix), self.matrix.width
+        self._block = shared_memory.SharedMemory(create=True, size=max(1, rows * (width + 1) * 8))
+        try:
+            buffer = np.ndarray((rows, width + 1), dtype=np.float64, buffer=self._block.buf)
+            buffer[:, :width] = self.matrix.values
+            buffer[:, width] = self.matrix.norms
+            del buffer
+            self._pool = multiprocessing.Pool(self.processes, initializer=_attach, initargs=(self._block.name, rows, width))
+        except BaseException:
+            self.close()
+            raise
+        logger.info("Sharded matrix ready", extra={"rows": rows, "shards": self.shards, "processes": self.processes})
+
+    def __enter__(self) -> "ShardedMatrix":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    def close(self) -> None:
+        """Stop the workers (each closes its own handle on exit), then close and unlink the block."""
+
+        try:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+        finally:
+            if self._block is not None:
+                self._block.close()
+                self._block.unlink()
+                self._block = None
+
+    def top_k(
+        self, query: FeatureVector, top_k: int, weights: Optional[np.ndarray] = None, scale: float = 1.0
+    ) -> Tuple[np.ndarray, np.ndarray, float]:
+        """Scatter ``query`` to every shard and merge the partial top-k lists.
+
+        Returns ``(rows, scores, max_score)``. Ties are ordered by row, so the
+        rows equal :func:`top_k_indices` over the unsharded scores.
+        """
+
+        if self._pool is None:
+            raise SimilarityError("sharded matrix is closed")
+        if query.schema_id != self.matrix.schema_id:
+            raise ValueError("schema mismatch")
+        q = np.asarray(query.values, dtype=np.float64)
+        tasks = [(start, stop, q, query.norm(), weights, scale, top_k) for start, stop in self._bounds]
+        parts = self._pool.map(_score_shard, tasks)
+        rows = np.concatenate([part[0] for part in parts])
+        scores = np.concatenate([part[1] for part in parts])
+        order = np.lexsort((rows, -scores))[: max(0, top_k)]
+        return rows[order], scores[order], max(part[2] for part in parts)
+
+
+__all__ = ["ShardedMatrix"]
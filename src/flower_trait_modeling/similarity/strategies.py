@@ -3,19 +3,39 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
-from .metrics import cosine, jaccard, delta_e
+import numpy as np
+
+from .metrics import cosine, cosine_batch, delta_e, delta_e_batch, jaccard, jaccard_batch, weighted_cosine_batch
 from ..domain.models import FeatureVector
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import SimilarityError
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+FUSION_STRATEGIES = ("weighted_sum", "max", "rank")
+
 
 @dataclass
 class FusionConfig:
     weights: Dict[str, float]
     strategy: str = "weighted_sum"
+    # Reciprocal-rank constant for the ``rank`` strategy; larger flattens the head.
+    rank_constant: float = 60.0
+
+
+def encode_categories(sets: Sequence[Iterable[str]], vocab: Optional[Sequence[str]] = None) -> Tuple[List[str], np.ndarray]:
+    """Multi-hot ``(rows, vocab)`` encoding of category sets; unknown values are dropped when ``vocab`` is given."""
+
+    members = [set(values) for values in sets]
+    names = list(vocab) if vocab is not None else sorted(set().union(*members))
+    codes = {name: idx for idx, name in enumerate(names)}
+    hot = np.zeros((len(members), len(names)), dtype=np.float64)
+    for row, values in enumerate(members):
+        hot[row, [codes[value] for value in values if value in codes]] = 1.0
+    return names, hot
 
 
 @dataclass
@@ -26,15 +46,14 @@ class SimilarityStrategy:
         return cosine(query.values, candidate.values)
 
     def combine(self, vector_score: float, categorical_score: float, color_score: float) -> float:
-        if self.config.strategy == "weighted_sum":
-            score = (
-                vector_score * self.config.weights.get("vector", 1.0)
-                + categorical_score * self.config.weights.get("categorical", 0.0)
-                + color_score * self.config.weights.get("color", 0.0)
-            )
-            logger.debug("Combined weighted score", extra={"score": score})
-            return score
-        return vector_score
+        """One candidate's score through :meth:`fuse`; ``rank`` needs every candidate, so it is rejected here."""
+
+        if self.config.strategy == "rank":
+            raise SimilarityError("rank fusion ranks a whole candidate list; call fuse on score columns instead")
+        columns = {"vector": np.array([vector_score]), "categorical": np.array([categorical_score]), "color": np.array([color_score])}
+        score = float(self.fuse(columns)[0])
+        logger.debug("Combined score", extra={"strategy": self.config.strategy, "score": score})
+        return score
 
     def compare_color(self, a: List[float], b: List[float]) -> float:
         distance = delta_e(a, b)
@@ -43,5 +62,67 @@ class SimilarityStrategy:
     def compare_categories(self, a: List[str], b: List[str]) -> float:
         return jaccard(a, b)
 
+    def score_columns(
+        self,
+        query: FeatureVector,
+        matrix: VectorMatrix,
+        query_color: Optional[Sequence[float]] = None,
+        colors: Optional[np.ndarray] = None,
+        query_categories: Optional[np.ndarray] = None,
+        categories: Optional[np.ndarray] = None,
+        weights: Optional[np.ndarray] = None,
+    ) -> Dict[str, np.ndarray]:
+        """Per-metric score columns for every row of ``matrix``, each matching its pairwise method.
+
+        ``colors`` is a ``(rows, 3)`` LAB array and ``categories`` a multi-hot
+        array from :func:`encode_categories`; a metric is skipped when its
+        inputs are not given. With slot ``weights`` (see
+        :meth:`SimilarityEngine.slot_weights`) the ``vector`` column is the
+        weighted cosine instead.
+        """
+
+        if weights is None:
+            vector = cosine_batch(query.values, matrix.values, norms=matrix.norms, norm_q=query.norm())
+        else:
+            vector = weighted_cosine_batch(query.values, matrix.values, weights, norms=matrix.weighted_norms(weights))
+        columns = {"vector": vector}
+        if query_color is not None and colors is not None:
+            columns["color"] = np.maximum(0.0, 1.0 - delta_e_batch(query_color, colors) / 100.0)
+        if query_categories is not None and categories is not None:
+            columns["categorical"] = jaccard_batch(query_categories, categories)
+        for name, column in columns.items():
+            if column.shape[0] != len(matrix):
+                raise SimilarityError(f"{name} column has {column.shape[0]} rows, matrix has {len(matrix)}")
+        return columns
+
+    def fuse(self, columns: Mapping[str, np.ndarray]) -> np.ndarray:
+        """Fuse metric columns into one score per candidate with ``config.strategy``.
+
+        ``weighted_sum`` matches :meth:`combine` row by row, ``max`` keeps the
+        best weighted metric, and ``rank`` sums ``weight / (rank_constant + rank)``
+        over metrics (reciprocal rank fusion, ranks from 1, ties by row).
+        """
+
+        weights = {name: self.config.weights.get(name, 1.0 if name == "vector" else 0.0) for name in columns}
+        active = [name for name in columns if weights[name] != 0.0]
+        size = next(iter(columns.values())).shape[0] if columns else 0
+        if not active:
+            return np.zeros(size)
+        strategy = self.config.strategy
+        if strategy == "weighted_sum":
+            fused = sum(columns[name] * weights[name] for name in active)
+        elif strategy == "max":
+            fused = np.max(np.stack([columns[name] * weights[name] for name in active]), axis=0)
+        elif strategy == "rank":
+            fused = np.zeros(size)
+            for name in active:
+                ranks = np.empty(size)
+                ranks[np.argsort(-columns[name], kind="stable")] = np.arange(1, size + 1)
+                fused += weights[name] / (self.config.rank_constant + ranks)
+        else:
+            raise SimilarityError(f"unknown fusion strategy {strategy}; expected one of {FUSION_STRATEGIES}")
+        logger.debug("Fused score columns", extra={"strategy": strategy, "metrics": active, "rows": size})
+        return np.asarray(fused, dtype=np.float64)
+
 
-__all__ = ["FusionConfig", "SimilarityStrategy"]
+__all__ = ["FUSION_STRATEGIES", "FusionConfig", "SimilarityStrategy", "encode_categories"]
@@ -0,0 +1,132 @@
+"""Early-terminating top-k over trait groups with per-candidate score upper bounds."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .explain import trait_groups
+from ..domain.models import FeatureVector
+from ..storage.vector_matrix import VectorMatrix
+from ..utils.errors import SimilarityError
+from ..utils.logging import get_logger
+from ..utils.norms import weighted_row_norms
+
+logger = get_logger(__name__)
+
+# Pruning only drops rows whose bound misses the threshold by more than accumulated rounding.
+_SLACK = 1e-9
+
+
+@dataclass
+class PruningStats:
+    rows: int
+    survivors: int
+    multiply_adds: int
+    full_multiply_adds: int
+
+    @property
+    def work_ratio(self) -> float:
+        return self.multiply_adds / self.full_multiply_adds if self.full_multiply_adds else 0.0
+
+
+@dataclass
+class GroupBoundIndex:
+    """Weighted-unit rows of ``matrix`` laid out trait by trait, plus each row's per-trait norm.
+
+    ``weights`` are the engine's slot weights (``None`` for plain cosine).
+
+    With rows and query scaled to unit length under ``weights``, the
+    (weighted) cosine is a sum of per-trait dot products, and by
+    Cauchy-Schwarz a trait not yet scored adds at most
+    ``|query_trait| * |row_trait|``. :meth:`candidates` scores traits in
+    decreasing query weight and, threshold-algorithm style, drops every row
+    whose upper bound falls below the k-th best lower bound. One-hot traits
+    carry their full weight in a single slot, so heavily weighted schemes
+    settle the top-k after a few traits. :meth:`within` prunes against a
+    fixed score floor instead, for radius search. Bounds are tied to the
+    ``matrix.version`` they were built from; rebuild after :meth:`VectorMatrix.set_row`.
+    """
+
+    matrix: VectorMatrix
+    weights: Optional[np.ndarray] = None
+    traits: List[str] = field(default_factory=list, init=False)
+    version: int = field(default=0, init=False)
+    _unit: np.ndarray = field(default_factory=lambda: np.empty((0, 0)), init=False, repr=False)
+    _bounds: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.intp), init=False, repr=False)
+    _order: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.intp), init=False, repr=False)
+    _group_norms: np.ndarray = field(default_factory=lambda: np.empty((0, 0)), init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        width = self.matrix.width
+        weights = np.ones(width) if self.weights is None else np.asarray(self.weights, dtype=np.float64)
+        if weights.shape != (width,) or np.any(weights < 0.0):
+            raise SimilarityError("group bounds need one non-negative weight per slot")
+        self.traits, indicator = trait_groups(self.matrix.mapping)
+        codes = indicator.argmax(axis=1)
+        # Slots sorted by trait so every trait is one contiguous column block.
+        self._order = np.argsort(codes, kind="stable")
+        self._bounds = np.searchsorted(codes[self._order], np.arange(len(self.traits) + 1))
+        scaled = self.matrix.values * np.sqrt(weights)
+        # Column-major, since each step gathers a few slots for the surviving rows.
+        self._unit = np.asfortranarray((scaled / weighted_row_norms(self.matrix.values, weights)[:, None])[:, self._order])
+        self._group_norms = np.sqrt((self._unit * self._unit) @ indicator[self._order])
+        self.weights = weights
+        self.version = self.matrix.version
+        logger.info("Group bounds built", extra={"rows": len(self.matrix), "traits": len(self.traits)})
+
+    def _unit_query(self, query: FeatureVector) -> np.ndarray:
+        q = np.asarray(query.values, dtype=np.float64)
+        if q.shape[0] != self.matrix.width:
+            raise ValueError("vectors must be same length")
+        scaled = (q * np.sqrt(self.weights))[self._order]
+        return scaled / (float(np.sqrt(scaled @ scaled)) or 1.0)
+
+    def candidates(self, query: FeatureVector, top_k: int) -> Tuple[np.ndarray, PruningStats]:
+        """Ascending rows that can still reach the top ``top_k``; always a superset of the exact top-k."""
+
+        return self._prune(query, top_k=top_k)
+
+    def within(self, query: FeatureVector, threshold: float) -> Tuple[np.ndarray, PruningStats]:
+        """Ascending rows whose (weighted) cosine may be ``>= threshold``; a superset of the exact matches."""
+
+        return self._prune(query, floor=threshold)
+
+    def _prune(self, query: FeatureVector, top_k: int = 0, floor: Optional[float] = None) -> Tuple[np.ndarray, PruningStats]:
+        if self.matrix.version != self.version:
+            raise SimilarityError("group bounds are stale: the matrix changed after they were built")
+        rows = len(self.matrix)
+        full = rows * self.matrix.width
+        uq = self._unit_query(query)
+        blocks = [slice(int(lo), int(hi)) for lo, hi in zip(self._bounds[:-1], self._bounds[1:])]
+        query_norms = np.array([float(np.sqrt(uq[block] @ uq[block])) for block in blocks])
+        alive = np.arange(rows)
+        partial = np.zeros(rows)
+        remaining = self._group_norms @ query_norms
+        work = 0
+        for group in np.argsort(-query_norms, kind="stable"):
+            if query_norms[group] == 0.0 or alive.size == 0:
+                break
+            # Only the query's non-zero slots matter; a one-hot trait is a single column.
+            block = blocks[group]
+            slots = block.start + np.flatnonzero(uq[block])
+            columns = self._unit[:, slots] if alive.size == rows else self._unit[np.ix_(alive, slots)]
+            partial += columns @ uq[slots]
+            remaining -= (self._group_norms[:, group] if alive.size == rows else self._group_norms[alive, group]) * query_norms[group]
+            work += alive.size * slots.size
+            threshold = floor
+            if 0 < top_k < alive.size:
+                lower = partial - remaining
+                kth = float(np.partition(lower, alive.size - top_k)[alive.size - top_k])
+                threshold = kth if threshold is None else max(threshold, kth)
+            if threshold is not None:
+                keep = partial + remaining >= threshold - _SLACK
+                alive, partial, remaining = alive[keep], partial[keep], remaining[keep]
+        stats = PruningStats(rows=rows, survivors=int(alive.size), multiply_adds=work, full_multiply_adds=full)
+        logger.debug("Group-bound pruning", extra={"rows": rows, "survivors": stats.survivors, "work_ratio": stats.work_ratio})
+        return alive, stats
+
+
+__all__ = ["GroupBoundIndex", "PruningStats"]
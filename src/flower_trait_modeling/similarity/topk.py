@@ -0,0 +1,71 @@
+"""Bounded top-k selection helpers shared by retrieval paths."""
+
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Generic, List, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row indices of the ``k`` highest scores, best first, without a full sort.
+
+    Ties are broken by row index so the result equals a stable descending sort
+    truncated to ``k``.
+    """
+
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
+    kth = np.partition(scores, n - k)[n - k]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[: k - above.size]
+    rows = np.concatenate([above, ties])
+    return rows[np.lexsort((rows, -scores[rows]))]
+
+
+@dataclass
+class TopKHeap(Generic[T]):
+    """Min-heap keeping the ``k`` best items of a stream in O(k) memory.
+
+    Earlier items win ties, and ``max_score`` tracks the running maximum over
+    everything pushed so max-normalization needs no second pass.
+    """
+
+    k: int
+    max_score: float = float("-inf")
+    seen: int = 0
+    _heap: List[Tuple[float, int, T]] = field(default_factory=list, repr=False)
+
+    def push(self, score: float, item: T) -> None:
+        self.seen += 1
+        if score > self.max_score:
+            self.max_score = score
+        if self.k <= 0:
+            return
+        entry = (score, -self.seen, item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    @property
+    def threshold(self) -> float:
+        """Score an item must beat to enter a full heap; ``-inf`` until ``k`` items are held."""
+
+        if len(self._heap) < self.k:
+            return float("-inf")
+        return self._heap[0][0]
+
+    def items(self) -> List[Tuple[float, T]]:
+        ordered = sorted(self._heap, key=lambda entry: entry[:2], reverse=True)
+        return [(score, item) for score, _, item in ordered]
+
+
+__all__ = ["top_k_indices", "TopKHeap"]
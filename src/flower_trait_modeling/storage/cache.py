@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Dict, Optional
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
 
-from ..domain.models import FeatureVector, Profile
+from ..domain.models import FeatureVector, Profile, SimilarityResult
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -36,4 +38,69 @@ class MemoryCache:
         logger.info("Cache cleared")
 
 
-__all__ = ["MemoryCache"]
+def _copy(result: SimilarityResult) -> SimilarityResult:
+    return replace(result, highlights=list(result.highlights))
+
+
+@dataclass
+class QueryResultCache:
+    """Bounded LRU cache of ranked results with a per-entry time-to-live.
+
+    Entries belong to one set of ``sources`` (compared by identity, e.g. the
+    matrix and filter indexes searched) at one ``version``; presenting other
+    sources or another version drops every entry. Results are copied on the
+    way in and out so callers may mutate what they get back.
+    """
+
+    max_entries: int = 1024
+    ttl_seconds: Optional[float] = 300.0
+    clock: Callable[[], float] = time.monotonic
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    _sources: Tuple[object, ...] = field(default=(), init=False, repr=False)
+    _version: Optional[Hashable] = field(default=None, init=False, repr=False)
+    _entries: "OrderedDict[str, Tuple[float, List[SimilarityResult]]]" = field(default_factory=OrderedDict, init=False, repr=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _sync(self, sources: Tuple[object, ...], version: Hashable) -> None:
+        same_sources = len(sources) == len(self._sources) and all(a is b for a, b in zip(sources, self._sources))
+        if not same_sources or version != self._version:
+            if self._entries:
+                logger.debug("Result cache invalidated", extra={"entries": len(self._entries)})
+            self._entries.clear()
+            self._sources = tuple(sources)
+            self._version = version
+
+    def get(self, key: str, sources: Tuple[object, ...], version: Hashable) -> Optional[List[SimilarityResult]]:
+        self._sync(sources, version)
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl_seconds is not None and self.clock() - entry[0] > self.ttl_seconds:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return [_copy(result) for result in entry[1]]
+
+    def put(self, key: str, sources: Tuple[object, ...], version: Hashable, results: List[SimilarityResult]) -> None:
+        self._sync(sources, version)
+        self._entries[key] = (self.clock(), [_copy(result) for result in results])
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self._entries)}
+
+    def clear(self) -> None:
+        self._entries.clear()
+        logger.info("Result cache cleared")
+
+
+__all__ = ["MemoryCache", "QueryResultCache"]
@@ -0,0 +1,203 @@
+"""Scalar and product quantization codecs for compact vector storage."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from .vector_matrix import VectorMatrix
+from ..utils.errors import StorageError, ValidationError
+from ..utils.kmeans import assign, kmeans
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+SCALAR_DTYPES = ("int8", "float16")
+
+_INT8_LEVELS = 255.0
+_INT8_SHIFT = 128.0
+
+
+@dataclass
+class ScalarQuantizer:
+    """Per-dimension affine codec: ``x ~= offset + scale * (code + 128)`` for ``int8``.
+
+    ``offset``/``scale`` come from the catalogue's per-dimension min/max, so
+    each slot uses all 256 levels. ``float16`` stores a plain half-precision
+    cast and ignores ``scale``/``offset``.
+    """
+
+    dtype: str
+    scale: np.ndarray
+    offset: np.ndarray
+
+    def __post_init__(self) -> None:
+        if self.dtype not in SCALAR_DTYPES:
+            raise ValidationError("quantizer", f"dtype must be one of {SCALAR_DTYPES}")
+        self.scale = np.asarray(self.scale, dtype=np.float64)
+        self.offset = np.asarray(self.offset, dtype=np.float64)
+
+    @classmethod
+    def fit(cls, values: np.ndarray, dtype: str = "int8") -> "ScalarQuantizer":
+        data = np.asarray(values, dtype=np.float64)
+        low = data.min(axis=0)
+        span = data.max(axis=0) - low
+        # Constant slots still need a non-zero step; they decode exactly to ``low``.
+        scale = np.where(span > 0.0, span / _INT8_LEVELS, 1.0)
+        return cls(dtype=dtype, scale=scale, offset=low)
+
+    def encode(self, values: np.ndarray) -> np.ndarray:
+        data = np.asarray(values, dtype=np.float64)
+        if self.dtype == "float16":
+            return data.astype(np.float16)
+        levels = np.rint((data - self.offset) / self.scale)
+        return (np.clip(levels, 0.0, _INT8_LEVELS) - _INT8_SHIFT).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        if self.dtype == "float16":
+            return codes.astype(np.float64)
+        return self.offset + self.scale * (codes.astype(np.float64) + _INT8_SHIFT)
+
+    def dot(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """``decode(codes) @ query`` without materializing the decoded rows in float64."""
+
+        if self.dtype == "float16":
+            return codes.astype(np.float32) @ query.astype(np.float32)
+        weighted = (self.scale * query).astype(np.float32)
+        return codes.astype(np.float32) @ weighted + float((self.offset + _INT8_SHIFT * self.scale) @ query)
+
+
+@dataclass
+class ProductQuantizer:
+    """Split rows into ``len(codebooks)`` contiguous subspaces, each quantized by its own k-means codebook.
+
+    A row becomes one ``uint8`` code per subspace. ``bounds`` holds the slot
+    boundaries, so widths that do not divide evenly still work.
+    """
+
+    bounds: np.ndarray
+    codebooks: List[np.ndarray]
+
+    @classmethod
+    def fit(
+        cls, values: np.ndarray, subspaces: int = 8, centroids: int = 256, iterations: int = 20, seed: int = 0, train_size: int = 65536
+    ) -> "ProductQuantizer":
+        """Train on at most ``train_size`` rows sampled with ``seed``."""
+
+        data = np.asarray(values, dtype=np.float64)
+        if not 1 <= subspaces <= data.shape[1] or not 1 <= centroids <= 256:
+            raise ValidationError("quantizer", "need 1 <= subspaces <= width and 1 <= centroids <= 256")
+        if data.shape[0] > train_size:
+            data = data[np.sort(np.random.default_rng(seed).choice(data.shape[0], size=train_size, replace=False))]
+        bounds = np.linspace(0, data.shape[1], subspaces + 1).astype(int)
+        codebooks = [kmeans(data[:, lo:hi], centroids, iterations=iterations, seed=seed + part)[0] for part, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:]))]
+        logger.info("Product quantizer trained", extra={"rows": data.shape[0], "subspaces": subspaces, "centroids": centroids})
+        return cls(bounds=bounds, codebooks=codebooks)
+
+    @property
+    def subspaces(self) -> int:
+        return len(self.codebooks)
+
+    def _slices(self) -> List[slice]:
+        return [slice(int(lo), int(hi)) for lo, hi in zip(self.bounds[:-1], self.bounds[1:])]
+
+    def encode(self, values: np.ndarray) -> np.ndarray:
+        data = np.asarray(values, dtype=np.float64)
+        return np.stack([assign(data[:, part], book) for part, book in zip(self._slices(), self.codebooks)], axis=1).astype(np.uint8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.concatenate([book[codes[:, j]] for j, book in enumerate(self.codebooks)], axis=1)
+
+    def lookup_table(self, query: np.ndarray) -> np.ndarray:
+        """``(subspaces, centroids)`` inner products of each query slice with its codebook, padded with zeros."""
+
+        table = np.zeros((self.subspaces, max(book.shape[0] for book in self.codebooks)))
+        for j, (part, book) in enumerate(zip(self._slices(), self.codebooks)):
+            table[j, : book.shape[0]] = book @ query[part]
+        return table
+
+    def asymmetric_dot(self, codes: np.ndarray, table: np.ndarray) -> np.ndarray:
+        """Approximate ``decode(codes) @ query`` by summing one table entry per subspace."""
+
+        return table[np.arange(self.subspaces)[None, :], codes].sum(axis=1)
+
+
+@dataclass
+class ProductQuantizedMatrix:
+    """Unit-normalized catalogue rows stored as product-quantization codes, a few bytes per variety.
+
+    Inner products against a unit query approximate cosine, so the
+    asymmetric lookup of :meth:`ProductQuantizer.asymmetric_dot` ranks rows
+    without decoding them.
+    """
+
+    schema_id: str
+    ids: np.ndarray
+    codes: np.ndarray
+    quantizer: ProductQuantizer
+    mapping: List[str] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self.ids = np.asarray(self.ids, dtype=str)
+
+    @classmethod
+    def build(cls, matrix: VectorMatrix, subspaces: int = 8, centroids: int = 256, **training: int) -> "ProductQuantizedMatrix":
+        quantizer = ProductQuantizer.fit(matrix.unit_values, subspaces, centroids, **training)
+        store = cls(schema_id=matrix.schema_id, ids=matrix.ids, codes=quantizer.encode(matrix.unit_values), quantizer=quantizer, mapping=list(matrix.mapping))
+        logger.info("Product-quantized matrix packed", extra={"rows": len(store), "bytes": store.nbytes})
+        return store
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """Codes plus codebooks; the codebooks are shared by every row."""
+
+        return int(self.codes.nbytes + sum(book.nbytes for book in self.quantizer.codebooks))
+
+    def save(self, path: str | Path) -> Path:
+        target = Path(path)
+        books = {f"codebook_{j}": book for j, book in enumerate(self.quantizer.codebooks)}
+        try:
+            with target.open("wb") as handle:
+                np.savez(
+                    handle,
+                    schema_id=np.array(self.schema_id),
+                    ids=self.ids,
+                    codes=self.codes,
+                    mapping=np.array(self.mapping, dtype=str),
+                    bounds=self.quantizer.bounds,
+                    **books,
+                )
+        except OSError as exc:
+            raise StorageError(str(target), str(exc)) from exc
+        logger.info("Saved product-quantized matrix", extra={"path": str(target), "rows": len(self)})
+        return target
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ProductQuantizedMatrix":
+        target = Path(path)
+        if not target.exists():
+            raise StorageError(str(target), "product-quantized matrix file not found")
+        try:
+            with np.load(target, allow_pickle=False) as data:
+                bounds = data["bounds"]
+                quantizer = ProductQuantizer(bounds=bounds, codebooks=[data[f"codebook_{j}"] for j in range(len(bounds) - 1)])
+                store = cls(
+                    schema_id=str(data["schema_id"]),
+                    ids=data["ids"],
+                    codes=data["codes"],
+                    quantizer=quantizer,
+                    mapping=[str(name) for name in data["mapping"]],
+                )
+        except KeyError as exc:
+            raise StorageError(str(target), f"not a product-quantized matrix: missing {exc}") from exc
+        logger.debug("Loaded product-quantized matrix", extra={"path": str(target), "rows": len(store)})
+        return store
+
+
+__all__ = ["SCALAR_DTYPES", "ScalarQuantizer", "ProductQuantizer", "ProductQuantizedMatrix"]
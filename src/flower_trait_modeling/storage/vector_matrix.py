@@ -0,0 +1,148 @@
+"""Columnar vector store packing feature vectors into one contiguous matrix."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..domain.models import FeatureVector
+from ..utils.errors import StorageError, ValidationError
+from ..utils.logging import get_logger
+from ..utils.norms import row_norms, weighted_row_norms
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class VectorMatrix:
+    """Row-major float64 matrix of vectors sharing one schema, with a parallel id array.
+
+    ``values`` is a read-only property over a non-writeable array so the
+    cached row norms and unit rows cannot go stale; write through
+    :meth:`set_row`, which bumps ``version``. Build with :meth:`from_array`
+    or :meth:`from_vectors`.
+    """
+
+    schema_id: str
+    ids: np.ndarray
+    _values: np.ndarray = field(repr=False, compare=False)
+    mapping: List[str] = field(default_factory=list)
+    version: int = 0
+    _norms: Optional[np.ndarray] = field(default=None, init=False, repr=False, compare=False)
+    _unit: Optional[np.ndarray] = field(default=None, init=False, repr=False, compare=False)
+    _weighted_norms: Dict[bytes, np.ndarray] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._values = np.array(self._values, dtype=np.float64, order="C")
+        self._values.flags.writeable = False
+        self.ids = np.asarray(self.ids, dtype=str)
+        if self._values.ndim != 2:
+            raise ValidationError("vector_matrix", "values must be a 2-D array")
+        if len(self.ids) != self._values.shape[0]:
+            raise ValidationError("vector_matrix", f"{len(self.ids)} ids for {self._values.shape[0]} rows")
+
+    @classmethod
+    def from_array(cls, schema_id: str, ids: Sequence[str], values: np.ndarray, mapping: Sequence[str] = ()) -> "VectorMatrix":
+        """Wrap a ``(rows, width)`` array; it is copied, so later writes to ``values`` do not leak in."""
+
+        return cls(schema_id=schema_id, ids=np.asarray(ids, dtype=str), _values=values, mapping=list(mapping))
+
+    @classmethod
+    def from_vectors(cls, vectors: Sequence[FeatureVector], ids: Sequence[str] | None = None) -> "VectorMatrix":
+        if not vectors:
+            raise ValidationError("vector_matrix", "at least one vector is required")
+        schema_id = vectors[0].schema_id
+        width = len(vectors[0].values)
+        for vector in vectors:
+            if vector.schema_id != schema_id:
+                raise ValidationError("vector_matrix", f"schema mismatch: {vector.schema_id} != {schema_id}")
+            vector.ensure_dimension(expected=width)
+        row_ids = list(ids) if ids is not None else [str(idx) for idx in range(len(vectors))]
+        values = np.array([vector.values for vector in vectors], dtype=np.float64)
+        matrix = cls.from_array(schema_id, row_ids, values, vectors[0].mapping)
+        logger.info("Vector matrix packed", extra={"schema": schema_id, "rows": len(matrix), "width": width})
+        return matrix
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    @property
+    def values(self) -> np.ndarray:
+        """Read-only ``(rows, width)`` float64 array."""
+
+        return self._values
+
+    @property
+    def width(self) -> int:
+        return self.values.shape[1]
+
+    @property
+    def norms(self) -> np.ndarray:
+        """Row norms (zero rows count as ``1.0``), computed once per ``version``."""
+
+        if self._norms is None:
+            self._norms = row_norms(self.values)
+        return self._norms
+
+    @property
+    def unit_values(self) -> np.ndarray:
+        """Rows divided by :attr:`norms`, so cosine against a unit query is one dot product."""
+
+        if self._unit is None:
+            self._unit = self.values / self.norms[:, None]
+        return self._unit
+
+    def weighted_norms(self, weights: np.ndarray) -> np.ndarray:
+        """Row norms under per-slot ``weights``, cached per weight vector until the next ``set_row``."""
+
+        key = np.asarray(weights, dtype=np.float64).tobytes()
+        if key not in self._weighted_norms:
+            self._weighted_norms[key] = weighted_row_norms(self.values, np.asarray(weights, dtype=np.float64))
+        return self._weighted_norms[key]
+
+    def set_row(self, row: int, values: Sequence[float]) -> None:
+        """Overwrite one row (e.g. after rescaling) and drop the derived caches."""
+
+        self._values.flags.writeable = True
+        try:
+            self._values[row] = np.asarray(values, dtype=np.float64)
+        finally:
+            self._values.flags.writeable = False
+        self.version += 1
+        self._norms = None
+        self._unit = None
+        self._weighted_norms.clear()
+
+    def vector(self, row: int) -> FeatureVector:
+        return FeatureVector(schema_id=self.schema_id, values=self.values[row].tolist(), mapping=list(self.mapping))
+
+    def save(self, path: str | Path) -> Path:
+        target = Path(path)
+        try:
+            with target.open("wb") as handle:
+                np.savez(handle, schema_id=np.array(self.schema_id), ids=self.ids, values=self.values, mapping=np.array(self.mapping, dtype=str))
+        except OSError as exc:
+            raise StorageError(str(target), str(exc)) from exc
+        logger.info("Saved vector matrix", extra={"path": str(target), "rows": len(self)})
+        return target
+
+    @classmethod
+    def load(cls, path: str | Path) -> "VectorMatrix":
+        target = Path(path)
+        if not target.exists():
+            raise StorageError(str(target), "vector matrix file not found")
+        with np.load(target, allow_pickle=False) as data:
+            matrix = cls.from_array(
+                schema_id=str(data["schema_id"]),
+                ids=data["ids"],
+                values=data["values"],
+                mapping=[str(name) for name in data["mapping"]],
+            )
+        logger.debug("Loaded vector matrix", extra={"path": str(target), "rows": len(matrix)})
+        return matrix
+
+
+__all__ = ["VectorMatrix"]
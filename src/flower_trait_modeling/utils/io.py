@@ -3,8 +3,12 @@
 from __future__ import annotations
 
 import json
+import struct
+import zipfile
 from pathlib import Path
 from typing import Any, Dict
+
+import numpy as np
 import yaml
 
 from .errors import ConfigurationError, StorageError
@@ -47,4 +51,41 @@ def ensure_dir(path: str | Path) -> Path:
     return target
 
 
-__all__ = ["read_yaml", "write_json", "ensure_dir"]
+def memmap_npz_member(path: str | Path, name: str) -> np.ndarray:
+    """Read-only memory map of array ``name`` stored uncompressed in an ``np.savez`` archive.
+
+    ``np.load`` ignores ``mmap_mode`` for ``.npz`` files; an uncompressed
+    member is a plain ``.npy`` blob inside the zip, so it is mapped in place
+    after its local zip header and ``.npy`` header.
+    """
+
+    target = Path(path)
+    try:
+        with zipfile.ZipFile(target) as archive:
+            info = archive.getinfo(f"{name}.npy")
+        if info.compress_type != zipfile.ZIP_STORED:
+            raise StorageError(str(target), f"{name} is compressed and cannot be memory-mapped")
+        with target.open("rb") as handle:
+            handle.seek(info.header_offset)
+            local = handle.read(30)
+            name_length, extra_length = struct.unpack("<HH", local[26:30])
+            handle.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(handle)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(handle)
+            elif version == (2, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(handle)
+            else:
+                raise StorageError(str(target), f"unsupported .npy version {version} for {name}")
+            offset = handle.tell()
+    except (KeyError, OSError, ValueError, zipfile.BadZipFile) as exc:
+        raise StorageError(str(target), f"cannot map {name}: {exc}") from exc
+    if dtype.hasobject:
+        raise StorageError(str(target), f"{name} holds Python objects and cannot be memory-mapped")
+    if int(np.prod(shape)) == 0:
+        return np.empty(shape, dtype=dtype)
+    logger.debug("Memory-mapped archive member", extra={"path": str(target), "member": name})
+    return np.memmap(target, dtype=dtype, mode="r", offset=offset, shape=shape, order="F" if fortran else "C")
+
+
+__all__ = ["read_yaml", "write_json", "ensure_dir", "memmap_npz_member"]
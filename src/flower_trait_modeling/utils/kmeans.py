@@ -0,0 +1,73 @@
+"""Seeded Lloyd k-means shared by the IVF index and the product quantizer."""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+from .errors import SimilarityError
+from .logging import get_logger
+from .norms import row_norms
+
+logger = get_logger(__name__)
+
+
+def assign(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid (squared Euclidean) for every row."""
+
+    distances = (
+        np.einsum("ij,ij->i", data, data)[:, None]
+        - 2.0 * data @ centroids.T
+        + np.einsum("ij,ij->i", centroids, centroids)[None, :]
+    )
+    return np.argmin(distances, axis=1)
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 20, seed: int = 0, spherical: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """Cluster ``data`` rows into ``k`` cells and return ``(centroids, labels)``.
+
+    With ``spherical`` the centroids are kept on the unit sphere so cells group
+    rows by cosine rather than Euclidean distance. Empty cells are re-seeded
+    with the row farthest from its current centroid.
+    """
+
+    n = data.shape[0]
+    if k <= 0 or n == 0:
+        raise SimilarityError("kmeans needs k > 0 and at least one row")
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(n, size=k, replace=False)].copy()
+    if spherical:
+        centroids = centroids / row_norms(centroids)[:, None]
+    labels = assign(data, centroids)
+    for _ in range(iterations):
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+        for cell in np.flatnonzero(counts == 0):
+            offsets = data - centroids[labels]
+            residual = np.einsum("ij,ij->i", offsets, offsets)
+            residual[counts[labels] <= 1] = -1.0
+            farthest = int(np.argmax(residual))
+            if residual[farthest] < 0.0:
+                sums[cell], counts[cell] = centroids[cell], 1
+                continue
+            previous = labels[farthest]
+            sums[previous] -= data[farthest]
+            counts[previous] -= 1
+            sums[cell] = data[farthest]
+            counts[cell] = 1
+            labels[farthest] = cell
+        centroids = sums / counts[:, None]
+        if spherical:
+            centroids = centroids / row_norms(centroids)[:, None]
+        updated = assign(data, centroids)
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+    logger.debug("k-means converged", extra={"k": k, "rows": n})
+    return centroids, labels
+
+
+__all__ = ["assign", "kmeans"]
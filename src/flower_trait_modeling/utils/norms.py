@@ -0,0 +1,24 @@
+"""Row-norm helpers shared by storage and similarity code."""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def row_norms(matrix: np.ndarray) -> np.ndarray:
+    """Euclidean norm of every row; zero rows count as ``1.0`` like ``metrics.cosine``."""
+
+    norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+    norms[norms == 0.0] = 1.0
+    return norms
+
+
+def weighted_row_norms(matrix: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Row norms under per-slot ``weights`` with the same zero-row fallback."""
+
+    norms = np.sqrt((matrix * matrix) @ weights)
+    norms[norms == 0.0] = 1.0
+    return norms
+
+
+__all__ = ["row_norms", "weighted_row_norms"]
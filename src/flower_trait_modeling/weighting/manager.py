@@ -24,7 +24,7 @@ class WeightManager:
         scheme = WeightScheme(name=data.get("name", "default"), weights=weights)
         self.constraint.validate(weights)
         scheme.normalize()
-        logger.info("Loaded weight scheme", extra={"name": scheme.name, "count": len(weights)})
+        logger.info("Loaded weight scheme", extra={"scheme": scheme.name, "count": len(weights)})
         return scheme
 
     def apply(self, values: Dict[str, float], scheme: WeightScheme) -> Dict[str, float]:
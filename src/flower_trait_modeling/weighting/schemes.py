@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, List, Sequence
 
 from ..utils.errors import ValidationError
 
@@ -20,6 +20,11 @@ class WeightScheme:
         for key in list(self.weights.keys()):
             self.weights[key] = self.weights[key] / total
 
+    def expand(self, mapping: Sequence[str]) -> List[float]:
+        """Per-slot weights for a vector layout; traits absent from the scheme weigh 1.0 as in ``WeightManager.apply``."""
+
+        return [float(self.weights.get(name, 1.0)) for name in mapping]
+
 
 @dataclass
 class WeightConstraint:
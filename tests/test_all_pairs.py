@@ -0,0 +1,55 @@
+"""Tests for the blocked all-pairs similarity job."""
+
+import csv
+import tracemalloc
+
+import numpy as np
+
+from flower_trait_modeling.similarity.all_pairs import AllPairsJob
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+
+
+def _matrix(rows=37, width=6, seed=2):
+    rng = np.random.default_rng(seed)
+    return VectorMatrix.from_array(schema_id="s", ids=[f"v{i}" for i in range(rows)], values=rng.random((rows, width)) - 0.3)
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as handle:
+        return list(csv.DictReader(handle))
+
+
+def test_threshold_pairs_match_dense_matrix(tmp_path):
+    matrix = _matrix()
+    job = AllPairsJob(memory_budget_mb=0.001, threshold=0.8)
+    summary = job.run(matrix, tmp_path / "pairs.csv")
+    dense = matrix.unit_values @ matrix.unit_values.T
+    expected = {(f"v{i}", f"v{j}") for i, j in zip(*np.nonzero(np.triu(dense >= 0.8, k=1)))}
+    assert summary.block < len(matrix) and summary.tiles > 1
+    assert {(row["query_id"], row["candidate_id"]) for row in _read(summary.path)} == expected
+
+
+def test_top_k_rows_match_dense_matrix(tmp_path):
+    matrix = _matrix()
+    summary = AllPairsJob(memory_budget_mb=0.001, top_k=3).run(matrix, tmp_path / "knn.csv")
+    dense = matrix.unit_values @ matrix.unit_values.T
+    np.fill_diagonal(dense, -np.inf)
+    rows = _read(summary.path)
+    assert summary.pairs_written == 3 * len(matrix)
+    assert [row["candidate_id"] for row in rows[:3]] == [f"v{j}" for j in np.argsort(-dense[0], kind="stable")[:3]]
+
+
+def test_top_k_tiles_stay_within_the_memory_budget():
+    matrix = _matrix(rows=900, width=4)
+    job = AllPairsJob(memory_budget_mb=2.0, top_k=50)
+    block = job.block_size(len(matrix))
+    assert block < AllPairsJob(memory_budget_mb=2.0, threshold=0.5).block_size(len(matrix))
+    units = np.array(matrix.unit_values)
+    tracemalloc.start()
+    try:
+        for _ in job.neighbor_blocks(units, block):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak <= 2.0 * 1024 * 1024
@@ -0,0 +1,23 @@
+"""Tests for the categorical bitmap index."""
+
+from flower_trait_modeling.similarity.bitmap import And, BitmapIndex, Eq, Not, Or
+
+RECORDS = [
+    {"species": "rose", "flower_shape": "double", "fragrance": "light", "seasonality": "summer"},
+    {"species": "lily", "flower_shape": "trumpet", "fragrance": "strong", "seasonality": "summer"},
+    {"species": "rose", "flower_shape": "single", "fragrance": "none", "seasonality": "winter"},
+    {"species": "tulip", "flower_shape": "single", "fragrance": "none", "seasonality": "spring"},
+]
+
+
+def test_and_or_not_resolve_to_rows():
+    index = BitmapIndex.build(RECORDS)
+    assert index.select(And((Eq("species", "rose"), Eq("seasonality", "summer")))).tolist() == [0]
+    assert index.select(Or((Eq("species", "lily"), Eq("species", "tulip")))).tolist() == [1, 3]
+    assert index.select(Not(Eq("species", "rose"))).tolist() == [1, 3]
+
+
+def test_mapping_filter_ands_fields_and_ors_lists():
+    index = BitmapIndex.build(RECORDS)
+    assert index.select({"species": "rose", "seasonality": ["summer", "winter"]}).tolist() == [0, 2]
+    assert index.select({"species": "orchid"}).tolist() == []
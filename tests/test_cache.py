@@ -1,7 +1,10 @@
 """Tests for in-memory cache."""
 
-from flower_trait_modeling.storage.cache import MemoryCache
-from flower_trait_modeling.domain.models import FeatureVector, Profile
+from flower_trait_modeling.storage.cache import MemoryCache, QueryResultCache
+from flower_trait_modeling.domain.models import FeatureVector, Profile, SimilarityResult
+from flower_trait_modeling.similarity.engine import SimilarityEngine
+from flower_trait_modeling.similarity.index_flat import FlatIndex
+from flower_trait_modeling.similarity.retrieval import RetrievalEngine
 
 
 def test_cache_stores_and_retrieves_vector():
@@ -16,3 +19,42 @@ def test_cache_clears_entries():
     cache.put_profile("p", Profile(variety_id="v", sections={}, summary=""))
     cache.clear()
     assert cache.get_profile("p") is None
+
+
+def test_result_cache_evicts_lru_and_expires_after_ttl():
+    now = [0.0]
+    cache = QueryResultCache(max_entries=2, ttl_seconds=10.0, clock=lambda: now[0])
+    source = object()
+    for key in ("a", "b"):
+        cache.put(key, (source,), 0, [SimilarityResult(query_id="q", candidate_id=key, score=1.0)])
+    assert cache.get("a", (source,), 0)[0].candidate_id == "a"
+    cache.put("c", (source,), 0, [])
+    assert cache.get("b", (source,), 0) is None
+    now[0] = 11.0
+    assert cache.get("a", (source,), 0) is None
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 2, 1)
+
+
+def test_retrieval_cache_hits_until_index_changes():
+    vectors = [FeatureVector(schema_id="s", values=[1.0, float(i)], mapping=["a", "b"]) for i in range(4)]
+    index = FlatIndex(schema_id="s")
+    for i, vector in enumerate(vectors[:3]):
+        index.add(f"v{i}", vector)
+    retriever = RetrievalEngine(SimilarityEngine({"vector": 1.0}), index=index, cache=QueryResultCache())
+    first = retriever.search_index(vectors[3], top_k=2)
+    first[0].score = -1.0
+    assert retriever.search_index(vectors[3], top_k=2)[0].score == 1.0
+    assert retriever.search_index(vectors[3], top_k=1)[0].candidate_id == "v2"
+    index.add("v3", vectors[3])
+    assert retriever.search_index(vectors[3], top_k=1)[0].candidate_id == "v3"
+    assert (retriever.cache.hits, retriever.cache.misses) == (1, 3)
+
+
+def test_cache_key_ignores_set_filter_insertion_order():
+    retriever = RetrievalEngine(SimilarityEngine({"vector": 1.0}), cache=QueryResultCache())
+    query = FeatureVector(schema_id="s", values=[1.0, 0.0], mapping=["a", "b"])
+    forward, backward = {1, 9}, {9, 1}
+    assert list(forward) != list(backward)
+    keys = {retriever.cache_key(query, 3, {"where": {"petal_count": values}}) for values in (forward, backward, frozenset(backward))}
+    assert len(keys) == 1
+    assert retriever.cache_key(query, 3, {"where": {"petal_count": {1, 8}}}) not in keys
@@ -9,3 +9,16 @@ def test_build_parser_contains_arguments():
     assert args.csv == "data.csv"
     assert args.config_dir == "configs"
     assert args.storage == "out"
+
+
+def test_index_saving_is_opt_in():
+    parser = cli.build_parser()
+    assert parser.parse_args(["data.csv"]).save_index is False
+    assert parser.parse_args(["data.csv", "--save-index"]).save_index is True
+
+
+def test_query_and_two_stage_flags():
+    parser = cli.build_parser()
+    args = parser.parse_args(["data.csv", "--query", "v001", "--two-stage"])
+    assert args.query == "v001" and args.two_stage is True
+    assert parser.parse_args(["data.csv"]).two_stage is False
@@ -0,0 +1,33 @@
+"""Tests for the LAB color KD-tree."""
+
+import numpy as np
+
+from flower_trait_modeling.normalization.color import ColorNormalizer
+from flower_trait_modeling.similarity.color_index import ColorIndex, as_lab
+
+
+def test_nearest_and_radius_match_brute_force():
+    rng = np.random.default_rng(4)
+    labs = rng.random((500, 3)) * 100
+    index = ColorIndex.build(labs, leaf_size=8)
+    for query in rng.random((20, 3)) * 100:
+        distances = np.sqrt(((labs - query) ** 2).sum(axis=1))
+        rows, found = index.nearest_rows(query, k=5)
+        assert rows.tolist() == np.argsort(distances, kind="stable")[:5].tolist()
+        assert np.allclose(found, np.sort(distances)[:5])
+        assert index.within_rows(query, 15.0).tolist() == np.flatnonzero(distances <= 15.0).tolist()
+
+
+def test_records_accept_hex_colors():
+    records = [
+        {"variety_id": "red", "color_primary": "#d02050"},
+        {"variety_id": "white", "color_primary": "#ffffff"},
+        {"variety_id": "pink", "color_primary": "#d02858"},
+    ]
+    index = ColorIndex.from_records(records)
+    assert [variety_id for variety_id, _ in index.nearest("#d02050", k=2)] == ["red", "pink"]
+    assert index.within(as_lab("#ffffff"), 1.0) == ["white"]
+
+
+def test_hex_colors_use_the_public_normalizer_helpers():
+    assert as_lab(" #fff ").tolist() == list(ColorNormalizer.rgb_to_lab(ColorNormalizer.parse_hex("#ffffff")))
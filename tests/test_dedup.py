@@ -0,0 +1,49 @@
+"""Tests for near-duplicate clustering."""
+
+import numpy as np
+
+from flower_trait_modeling.similarity.dedup import DuplicateClusterer, UnionFind
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+
+
+def _catalogue(seed=4):
+    rng = np.random.default_rng(seed)
+    base = rng.random((150, 8)) - 0.5
+    dupes = base[:10] + rng.normal(0.0, 0.005, (10, 8))
+    values = np.vstack([base, dupes])
+    return VectorMatrix.from_array(schema_id="s", ids=[f"v{i}" for i in range(len(values))], values=values)
+
+
+def test_union_find_merges_components():
+    sets = UnionFind(4)
+    sets.union(0, 1)
+    sets.union(2, 3)
+    assert sets.find(1) == sets.find(0)
+    assert sets.find(0) != sets.find(3)
+
+
+def _assert_matches_brute_force(matrix, table, threshold):
+    dense = matrix.unit_values @ matrix.unit_values.T
+    expected = UnionFind(len(matrix))
+    for i, j in zip(*np.nonzero(np.triu(dense >= threshold, k=1))):
+        expected.union(int(i), int(j))
+    for i in range(len(matrix)):
+        for j in range(len(matrix)):
+            same = table.assignments[f"v{i}"] == table.assignments[f"v{j}"]
+            assert same == (expected.find(i) == expected.find(j))
+
+
+def test_clusters_match_brute_force_with_pruning(tmp_path):
+    matrix = _catalogue()
+    table = DuplicateClusterer(threshold=0.99, block=32).cluster(matrix)
+    _assert_matches_brute_force(matrix, table, 0.99)
+    assert table.assignments["v150"] == "v0"
+    assert table.pairs_evaluated < len(matrix) * (len(matrix) - 1) // 2
+    assert table.to_csv(tmp_path / "clusters.csv").exists()
+
+
+def test_low_threshold_tiles_stay_within_memory_budget():
+    matrix = _catalogue()
+    clusterer = DuplicateClusterer(threshold=0.65, block=16, memory_budget_mb=0.002)
+    assert clusterer.tile_width() * 16 * 16 <= 0.002 * 1024 * 1024
+    _assert_matches_brute_force(matrix, clusterer.cluster(matrix), 0.65)
@@ -0,0 +1,52 @@
+"""Tests for maximal-marginal-relevance selection."""
+
+import numpy as np
+import pytest
+
+from flower_trait_modeling.similarity.config import DiversityConfig, SimilarityConfig
+from flower_trait_modeling.similarity.diversity import mmr_select
+from flower_trait_modeling.utils.errors import ConfigurationError, SimilarityError
+
+
+def _greedy(relevance, similarity, k, lam):
+    picked = []
+    while len(picked) < k:
+        best, best_score = None, -np.inf
+        for i in range(len(relevance)):
+            if i in picked:
+                continue
+            penalty = max((similarity[i][j] for j in picked), default=0.0)
+            score = lam * relevance[i] - (1 - lam) * penalty
+            if score > best_score:
+                best, best_score = i, score
+        picked.append(best)
+    return picked
+
+
+def test_vectorized_selection_matches_reference_loop():
+    rng = np.random.default_rng(4)
+    points = rng.random((60, 5))
+    unit = points / np.linalg.norm(points, axis=1, keepdims=True)
+    similarity = unit @ unit.T
+    relevance = rng.random(60)
+    for lam in (0.0, 0.3, 0.7, 1.0):
+        assert mmr_select(relevance, similarity, 10, lam).tolist() == _greedy(relevance, similarity, 10, lam)
+
+
+def test_invalid_inputs_are_rejected():
+    with pytest.raises(SimilarityError):
+        mmr_select(np.ones(3), np.eye(3), 2, 1.5)
+    with pytest.raises(SimilarityError):
+        mmr_select(np.ones(3), np.eye(2), 2)
+    with pytest.raises(ConfigurationError):
+        DiversityConfig(pool_size=0)
+
+
+def test_lambda_is_read_from_yaml(tmp_path):
+    path = tmp_path / "similarity.yaml"
+    path.write_text("diversity:\n  lambda: 0.4\n  pool_size: 80\n", encoding="utf-8")
+    config = SimilarityConfig.from_file(str(path))
+    assert (config.diversity.mmr_lambda, config.diversity.pool_size) == (0.4, 80)
+    assert not config.diversity.enabled and not SimilarityConfig().diversity.enabled
+    path.write_text("diversity:\n  enabled: true\n", encoding="utf-8")
+    assert SimilarityConfig.from_file(str(path)).diversity.enabled
@@ -0,0 +1,59 @@
+"""Tests for config-driven index construction."""
+
+import pytest
+
+from flower_trait_modeling.domain.models import FeatureVector
+from flower_trait_modeling.similarity.config import IndexConfig, SimilarityConfig
+from flower_trait_modeling.similarity.index_factory import build_updatable_index, can_open_index, open_index, open_updatable_index
+from flower_trait_modeling.similarity.index_hnsw import HNSWIndex
+from flower_trait_modeling.similarity.index_segmented import SegmentedIndex
+from flower_trait_modeling.similarity.index_sq import ScalarQuantizedIndex
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+from flower_trait_modeling.utils.errors import ConfigurationError
+
+
+def test_similarity_config_reads_index_section(tmp_path):
+    yaml_path = tmp_path / "similarity.yaml"
+    yaml_path.write_text(
+        "fusion:\n  threshold: 0.8\nindex:\n  backend: hnsw\n  path: idx.npz\n  hnsw:\n    m: 4\n    ef_search: 20\n",
+        encoding="utf-8",
+    )
+    config = SimilarityConfig.from_file(str(yaml_path))
+    assert config.threshold == 0.8
+    assert config.index.backend == "hnsw"
+    assert config.index.options == {"m": 4, "ef_search": 20}
+
+
+def test_open_index_creates_then_reloads(tmp_path):
+    config = IndexConfig(backend="hnsw", path=str(tmp_path / "idx.npz"), options={"m": 4})
+    index = open_index(config, "s")
+    assert isinstance(index, HNSWIndex) and index.m == 4
+    index.add("v1", FeatureVector(schema_id="s", values=[1.0, 0.0], mapping=["a", "b"]))
+    index.save(config.path)
+    assert "v1" in open_index(config, "s")
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ConfigurationError):
+        IndexConfig(backend="annoy")
+
+
+def test_trained_backends_cannot_open_without_a_file(tmp_path):
+    assert can_open_index(IndexConfig(backend="lsh"))
+    assert not can_open_index(IndexConfig(backend="ivf", path=str(tmp_path / "missing.npz")))
+    with pytest.raises(ConfigurationError):
+        open_index(IndexConfig(backend="sq"), "s")
+
+
+def test_updatable_index_wraps_backends_without_upsert(tmp_path):
+    vectors = [FeatureVector(schema_id="s", values=[1.0, float(i), float(i % 3)], mapping=["a", "b", "c"]) for i in range(12)]
+    matrix = VectorMatrix.from_vectors(vectors, ids=[f"v{i}" for i in range(12)])
+    config = IndexConfig(backend="sq", path=str(tmp_path / "sq.npz"))
+    index = build_updatable_index(config, matrix)
+    assert isinstance(index, SegmentedIndex)
+    index.upsert("v1", vectors[5])
+    index.save(config.path)
+    reopened = open_updatable_index(config, "s")
+    assert isinstance(reopened.segments[0].index, ScalarQuantizedIndex) and len(reopened) == 12
+    reopened.upsert("v2", vectors[7])
+    assert isinstance(build_updatable_index(IndexConfig(backend="hnsw"), matrix), HNSWIndex)
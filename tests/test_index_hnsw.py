@@ -0,0 +1,63 @@
+"""Tests for the HNSW graph index."""
+
+import numpy as np
+
+from flower_trait_modeling.domain.models import FeatureVector
+from flower_trait_modeling.similarity.engine import SimilarityEngine
+from flower_trait_modeling.similarity.index_hnsw import HNSWIndex
+from flower_trait_modeling.similarity.retrieval import RetrievalEngine
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+
+
+def _vectors(rows=300, width=12, seed=5):
+    rng = np.random.default_rng(seed)
+    return [FeatureVector(schema_id="s", values=row.tolist(), mapping=[f"d{i}" for i in range(width)]) for row in rng.random((rows, width)) - 0.5]
+
+
+def test_incremental_index_reaches_high_recall():
+    vectors = _vectors()
+    index = HNSWIndex(schema_id="s", m=8, ef_construction=64, ef_search=64)
+    for idx, vector in enumerate(vectors):
+        index.add(f"v{idx}", vector)
+    matrix = VectorMatrix.from_vectors(vectors, ids=[f"v{idx}" for idx in range(len(vectors))])
+    exact = RetrievalEngine(SimilarityEngine({"vector": 1.0}))
+    hits = 0
+    for query in vectors[:20]:
+        truth = {r.candidate_id for r in exact.search_matrix(query, matrix, top_k=10)}
+        hits += len(truth & {r.candidate_id for r in index.search(query, top_k=10)})
+    assert hits / 200 >= 0.9
+    assert "v0" in index and len(index) == 300
+
+
+def test_save_and_load_preserves_graph(tmp_path):
+    vectors = _vectors(rows=60)
+    index = HNSWIndex(schema_id="s", m=4)
+    for idx, vector in enumerate(vectors):
+        index.add(f"v{idx}", vector)
+    loaded = HNSWIndex.load(index.save(tmp_path / "hnsw.npz"))
+    assert loaded.graph == index.graph
+    assert [r.candidate_id for r in loaded.search(vectors[3], 5)] == [r.candidate_id for r in index.search(vectors[3], 5)]
+    loaded.add("new", vectors[0])
+    assert len(loaded) == 61
+
+
+def test_upsert_moves_a_node_and_keeps_recall():
+    vectors = _vectors(rows=200)
+    index = HNSWIndex(schema_id="s", m=8, ef_construction=64, ef_search=64)
+    for idx, vector in enumerate(vectors):
+        index.add(f"v{idx}", vector)
+    moved = _vectors(rows=30, seed=11)
+    for idx, vector in enumerate(moved):
+        index.upsert(f"v{idx}", vector)
+        vectors[idx] = vector
+    index.upsert("new", moved[0])
+    ids = [f"v{idx}" for idx in range(len(vectors))] + ["new"]
+    matrix = VectorMatrix.from_vectors(vectors + [moved[0]], ids=ids)
+    exact = RetrievalEngine(SimilarityEngine({"vector": 1.0}))
+    hits = 0
+    for query in moved[:20]:
+        truth = {r.candidate_id for r in exact.search_matrix(query, matrix, top_k=10)}
+        hits += len(truth & {r.candidate_id for r in index.search(query, top_k=10)})
+    assert hits / 200 >= 0.9
+    assert len(index) == 201 and index.search(moved[5], 1)[0].candidate_id == "v5"
+    assert all(node not in index.graph[node][layer] for node in range(len(index)) for layer in range(len(index.graph[node])))
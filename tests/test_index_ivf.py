@@ -0,0 +1,57 @@
+"""Tests for the IVF approximate index."""
+
+import numpy as np
+import pytest
+
+from flower_trait_modeling.domain.models import FeatureVector
+from flower_trait_modeling.similarity.engine import SimilarityEngine
+from flower_trait_modeling.similarity.index_flat import FlatIndex
+from flower_trait_modeling.similarity.index_ivf import IVFIndex
+from flower_trait_modeling.similarity.retrieval import RetrievalEngine
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+from flower_trait_modeling.utils.errors import SimilarityError
+
+
+def _matrix(rows=200, width=8, seed=3):
+    rng = np.random.default_rng(seed)
+    values = rng.random((rows, width))
+    return VectorMatrix.from_array(schema_id="s", ids=[f"v{i}" for i in range(rows)], values=values, mapping=[f"d{i}" for i in range(width)])
+
+
+def test_full_probe_matches_exact_search():
+    matrix = _matrix()
+    index = IVFIndex.build(matrix, nlist=8, nprobe=8)
+    query = FeatureVector(schema_id="s", values=matrix.values[5].tolist(), mapping=matrix.mapping)
+    exact = RetrievalEngine(SimilarityEngine({"vector": 1.0})).search_matrix(query, matrix, top_k=5)
+    approx = RetrievalEngine(SimilarityEngine({"vector": 1.0}), index=index).search_index(query, top_k=5)
+    assert [r.candidate_id for r in approx] == [r.candidate_id for r in exact]
+    assert approx[0].candidate_id == "v5"
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    matrix = _matrix(rows=50)
+    index = IVFIndex.build(matrix, nlist=4, nprobe=2)
+    loaded = IVFIndex.load(index.save(tmp_path / "ivf.npz"))
+    query = FeatureVector(schema_id="s", values=matrix.values[0].tolist(), mapping=matrix.mapping)
+    assert [r.candidate_id for r in loaded.search(query, 3)] == [r.candidate_id for r in index.search(query, 3)]
+    assert loaded.nprobe == 2 and len(loaded) == 50
+
+
+def test_add_and_upsert_keep_cells_consistent(tmp_path):
+    matrix = _matrix(rows=60)
+    index = IVFIndex.build(matrix, nlist=4, nprobe=4)
+    moved = FeatureVector(schema_id="s", values=(-matrix.values[0]).tolist(), mapping=matrix.mapping)
+    index.upsert("v0", moved)
+    extra = FeatureVector(schema_id="s", values=(matrix.values[1] + matrix.values[2]).tolist(), mapping=matrix.mapping)
+    index.add("extra", extra)
+    assert len(index) == 61 and "extra" in index
+    exact = FlatIndex.from_matrix(matrix)
+    exact.upsert("v0", moved)
+    exact.add("extra", extra)
+    for query in (moved, extra):
+        expected = [(r.candidate_id, round(r.score, 12)) for r in exact.search(query, 5)]
+        assert [(r.candidate_id, round(r.score, 12)) for r in index.search(query, 5)] == expected
+        loaded = IVFIndex.load(index.save(tmp_path / "ivf.npz"))
+        assert [(r.candidate_id, round(r.score, 12)) for r in loaded.search(query, 5)] == expected
+    with pytest.raises(SimilarityError):
+        index.add("extra", moved)
@@ -0,0 +1,50 @@
+"""Tests for the random-projection LSH index."""
+
+import numpy as np
+
+from flower_trait_modeling.domain.models import FeatureVector
+from flower_trait_modeling.similarity.index_lsh import LSHIndex
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+
+
+def _matrix(rows=200, width=10, seed=9):
+    rng = np.random.default_rng(seed)
+    return VectorMatrix.from_array(schema_id="s", ids=[f"v{i}" for i in range(rows)], values=rng.random((rows, width)) - 0.5, mapping=[f"d{i}" for i in range(width)])
+
+
+def test_signatures_are_deterministic_under_seed():
+    matrix = _matrix()
+    first = LSHIndex.build(matrix, num_tables=4, num_bits=12, seed=3)
+    second = LSHIndex.build(matrix, num_tables=4, num_bits=12, seed=3)
+    assert np.array_equal(first.signatures(matrix.values), second.signatures(matrix.values))
+
+
+def test_near_duplicates_found_and_reranked():
+    matrix = _matrix()
+    index = LSHIndex.build(matrix, num_tables=6, num_bits=10)
+    submission = FeatureVector(schema_id="s", values=(matrix.values[42] * 1.01).tolist(), mapping=matrix.mapping)
+    matches = index.near_duplicates(submission, threshold=0.99)
+    assert [m.candidate_id for m in matches] == ["v42"]
+    assert index.search(submission, top_k=1)[0].candidate_id == "v42"
+    assert index.candidates(submission).size < len(index)
+
+
+def test_incremental_add_and_roundtrip(tmp_path):
+    matrix = _matrix(rows=20)
+    index = LSHIndex.build(matrix, num_tables=3, num_bits=8)
+    extra = FeatureVector(schema_id="s", values=[0.3] * 10, mapping=matrix.mapping)
+    index.add("new", extra)
+    loaded = LSHIndex.load(index.save(tmp_path / "lsh.npz"))
+    assert loaded.search(extra, top_k=1)[0].candidate_id == "new"
+    assert len(loaded) == 21
+
+
+def test_upsert_rebuckets_replaced_vector():
+    matrix = _matrix(rows=40)
+    index = LSHIndex.build(matrix, num_tables=4, num_bits=8)
+    replacement = FeatureVector(schema_id="s", values=(-matrix.values[3]).tolist(), mapping=matrix.mapping)
+    index.upsert("v3", replacement)
+    assert len(index) == 40
+    assert index.search(replacement, top_k=1)[0].candidate_id == "v3"
+    rebuilt = LSHIndex.build(VectorMatrix.from_array(schema_id="s", ids=index.ids, values=index.values, mapping=matrix.mapping), num_tables=4, num_bits=8)
+    assert index.candidates(replacement).tolist() == rebuilt.candidates(replacement).tolist()
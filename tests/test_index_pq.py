@@ -0,0 +1,39 @@
+"""Tests for the product-quantization index."""
+
+import numpy as np
+import pytest
+
+from flower_trait_modeling.evaluation.recall import product_quantization_report
+from flower_trait_modeling.similarity.index_base import unit_query
+from flower_trait_modeling.similarity.index_pq import PQIndex
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+
+
+def _matrix(rows=120, width=10, seed=2):
+    rng = np.random.default_rng(seed)
+    return VectorMatrix.from_array(schema_id="s", ids=[f"v{i}" for i in range(rows)], values=rng.random((rows, width)), mapping=[f"d{i}" for i in range(width)])
+
+
+def test_lookup_scores_equal_decoded_inner_products():
+    matrix = _matrix()
+    index = PQIndex.build(matrix, subspaces=3, centroids=16)
+    query = matrix.vector(4)
+    store = index.store
+    decoded = store.quantizer.decode(store.codes) @ unit_query(query, matrix.width)
+    results = index.search(query, len(matrix))
+    by_id = {r.candidate_id: r.score for r in results}
+    assert [by_id[str(i)] for i in matrix.ids] == pytest.approx(decoded.tolist())
+    assert store.codes.dtype == np.uint8 and store.codes.shape == (120, 3)
+
+
+def test_save_load_and_recall_report(tmp_path):
+    matrix = _matrix()
+    index = PQIndex.build(matrix, subspaces=5, centroids=256)
+    index.save(tmp_path / "pq.npz")
+    loaded = PQIndex.load(tmp_path / "pq.npz")
+    query = matrix.vector(9)
+    assert [r.candidate_id for r in loaded.search(query, 5)] == [r.candidate_id for r in index.search(query, 5)]
+    # With more centroids than rows every row is its own codeword, so recall is perfect.
+    report = product_quantization_report(matrix, [matrix.vector(i) for i in range(5)], k=5, subspaces=(5,))
+    assert report.points[-1].recall == 1.0
+    assert loaded.store.codes.nbytes == len(matrix) * 5
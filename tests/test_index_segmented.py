@@ -0,0 +1,122 @@
+"""Tests for the segmented index with tombstones and compaction."""
+
+import threading
+
+import numpy as np
+import pytest
+
+from flower_trait_modeling.domain.models import FeatureVector
+from flower_trait_modeling.similarity.config import IndexConfig
+from flower_trait_modeling.similarity.index_factory import build_segmented_index
+from flower_trait_modeling.similarity.index_flat import FlatIndex
+from flower_trait_modeling.similarity.index_segmented import SegmentedIndex
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+from flower_trait_modeling.utils.errors import SimilarityError
+
+
+def _matrix(rows=60, width=8, seed=3):
+    rng = np.random.default_rng(seed)
+    return VectorMatrix.from_array(schema_id="s", ids=[f"v{i}" for i in range(rows)], values=rng.random((rows, width)), mapping=[f"d{i}" for i in range(width)])
+
+
+def _vector(values):
+    return FeatureVector(schema_id="s", values=list(values), mapping=[f"d{i}" for i in range(len(values))])
+
+
+def _ranked(index, query, k=10):
+    return [(r.candidate_id, round(r.score, 12)) for r in index.search(query, k)]
+
+
+def test_upserts_and_deletes_match_a_rebuilt_flat_index():
+    matrix = _matrix()
+    index = SegmentedIndex.from_matrix(matrix, memtable_size=4, compaction_ratio=1.0)
+    rng = np.random.default_rng(9)
+    live = {str(i): matrix.values[row] for row, i in enumerate(matrix.ids)}
+    for step in range(12):
+        target = f"v{step * 3}"
+        replacement = rng.random(8)
+        index.upsert(target, _vector(replacement))
+        live[target] = replacement
+    index.upsert("new", _vector(rng.random(8)))
+    for target in ("v1", "v3", "v6", "new"):
+        index.delete(target)
+        live.pop(target, None)
+    assert len(index) == len(live) and "v1" not in index and "v0" in index
+    ids = sorted(live)
+    expected = FlatIndex.from_matrix(VectorMatrix.from_array(schema_id="s", ids=ids, values=np.array([live[i] for i in ids]), mapping=list(matrix.mapping)))
+    for row in (0, 5, 40):
+        assert _ranked(index, matrix.vector(row)) == _ranked(expected, matrix.vector(row))
+    with pytest.raises(SimilarityError):
+        index.delete("v1")
+
+
+def test_compaction_drops_tombstones_and_keeps_results():
+    matrix = _matrix()
+    index = SegmentedIndex.from_matrix(matrix, compaction_ratio=0.1, background=True)
+    query = matrix.vector(2)
+    before = [r for r in _ranked(index, query, 30) if r[0] not in {f"v{row}" for row in range(10, 17)}]
+    version = index.version
+    for row in range(10, 17):
+        index.delete(f"v{row}")
+    index.wait()
+    assert index.compactions == 1 and index.version > version
+    assert len(index.segments) == 1 and not index.segments[0].dead
+    assert len(index.segments[0].matrix) == len(matrix) - 7
+    assert _ranked(index, query, 23) == before[:23]
+
+
+def test_factory_wraps_configured_backend_and_round_trips(tmp_path):
+    matrix = _matrix()
+    index = build_segmented_index(IndexConfig(backend="lsh", options={"num_tables": 4, "num_bits": 4}), matrix, memtable_size=8)
+    assert type(index.segments[0].index).__name__ == "LSHIndex"
+    index.delete("v0")
+    index.save(tmp_path / "seg.npz")
+    loaded = SegmentedIndex.load(tmp_path / "seg.npz")
+    assert len(loaded) == len(matrix) - 1 and "v0" not in loaded
+
+
+def test_sealing_builds_outside_the_lock():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_builder(matrix):
+        started.set()
+        release.wait(5)
+        return FlatIndex.from_matrix(matrix)
+
+    index = SegmentedIndex(schema_id="s", builder=slow_builder, memtable_size=3, compaction_ratio=1.0)
+    index.upsert("a", _vector([1.0, 0.0]))
+    index.upsert("b", _vector([0.0, 1.0]))
+    writer = threading.Thread(target=index.upsert, args=("c", _vector([1.0, 1.0])))
+    writer.start()
+    assert started.wait(5)
+    reader = threading.Thread(target=index.search, args=(_vector([1.0, 0.0]),))
+    reader.start()
+    reader.join(2)
+    assert not reader.is_alive()
+    fresh = _vector([0.0, -1.0])
+    index.upsert("a", fresh)
+    release.set()
+    writer.join(5)
+    assert len(index.segments) == 1 and index.segments[0].dead == {"a"}
+    assert len(index) == 3 and index.search(fresh, 1)[0].candidate_id == "a"
+
+
+def test_failed_compaction_resets_state_and_can_retry():
+    matrix = _matrix()
+    calls = []
+
+    def flaky_builder(rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError("disk full")
+        return FlatIndex.from_matrix(rows)
+
+    index = SegmentedIndex.from_matrix(matrix, builder=flaky_builder, compaction_ratio=0.05, background=False)
+    for row in range(3):
+        index.delete(f"v{row}")
+    with pytest.raises(RuntimeError):
+        index.delete("v3")
+    assert index._retired_during_compaction is None and index.compactions == 0
+    assert "v3" not in index and len(index) == len(matrix) - 4
+    assert index.maybe_compact() and index.compactions == 1
+    assert len(index.segments[0].matrix) == len(matrix) - 4
@@ -0,0 +1,59 @@
+"""Tests for the scalar-quantized index."""
+
+import numpy as np
+
+from flower_trait_modeling.evaluation.recall import scalar_quantization_report
+from flower_trait_modeling.similarity import index_sq
+from flower_trait_modeling.similarity.index_flat import FlatIndex
+from flower_trait_modeling.similarity.index_sq import ScalarQuantizedIndex
+from flower_trait_modeling.storage.quantization import ScalarQuantizer
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+
+
+def _matrix(rows=300, width=12, seed=5):
+    rng = np.random.default_rng(seed)
+    return VectorMatrix.from_array(schema_id="s", ids=[f"v{i}" for i in range(rows)], values=rng.random((rows, width)), mapping=[f"d{i}" for i in range(width)])
+
+
+def test_int8_codec_error_is_within_half_a_step():
+    values = _matrix().values
+    quantizer = ScalarQuantizer.fit(values, "int8")
+    codes = quantizer.encode(values)
+    assert codes.dtype == np.int8
+    assert np.all(np.abs(quantizer.decode(codes) - values) <= quantizer.scale / 2 + 1e-12)
+
+
+def test_reranked_scores_are_exact_and_survive_reload(tmp_path):
+    matrix = _matrix()
+    index = ScalarQuantizedIndex.build(matrix, dtype="int8", rerank=4)
+    exact = FlatIndex.from_matrix(matrix)
+    query = matrix.vector(7)
+    results = index.search(query, 5)
+    assert [(r.candidate_id, r.score) for r in results] == [(r.candidate_id, r.score) for r in exact.search(query, 5)]
+    assert index.nbytes < matrix.values.nbytes / 4
+    index.save(tmp_path / "sq.npz")
+    assert [path.name for path in tmp_path.iterdir()] == ["sq.npz"]
+    loaded = ScalarQuantizedIndex.load(tmp_path / "sq.npz")
+    assert isinstance(loaded.full, np.memmap)
+    assert np.array_equal(loaded.full, matrix.values)
+    assert [r.candidate_id for r in loaded.search(query, 5)] == [r.candidate_id for r in results]
+
+
+def test_code_norms_are_decoded_in_chunks(monkeypatch):
+    matrix = _matrix()
+    quantizer = ScalarQuantizer.fit(matrix.values, "int8")
+    codes = quantizer.encode(matrix.values)
+    decode, blocks = ScalarQuantizer.decode, []
+    monkeypatch.setattr(index_sq, "_CHUNK_ROWS", 64)
+    monkeypatch.setattr(ScalarQuantizer, "decode", lambda self, block: blocks.append(len(block)) or decode(self, block))
+    index = ScalarQuantizedIndex(schema_id="s", quantizer=quantizer, ids=matrix.ids, codes=codes, full=matrix.values)
+    assert max(blocks) == 64 and sum(blocks) == len(matrix.values)
+    assert np.allclose(index._code_norms, np.linalg.norm(decode(quantizer, codes), axis=1))
+
+
+def test_recall_report_lists_each_setting():
+    matrix = _matrix()
+    report = scalar_quantization_report(matrix, [matrix.vector(i) for i in range(10)], k=5, reranks=(1, 4))
+    assert [point.setting for point in report.points] == ["float64", "int8 rerank x1", "int8 rerank x4", "float16 rerank x1", "float16 rerank x4"]
+    assert all(point.recall >= 0.8 for point in report.points)
+    assert "Recall@5" in report.as_markdown()
@@ -0,0 +1,15 @@
+"""Tests for seeded k-means."""
+
+import numpy as np
+
+from flower_trait_modeling.utils.kmeans import kmeans
+
+
+def test_kmeans_separates_clusters_deterministically():
+    rng = np.random.default_rng(0)
+    data = np.vstack([rng.normal(0.0, 0.1, (20, 2)), rng.normal(5.0, 0.1, (20, 2))])
+    centroids, labels = kmeans(data, 2, seed=1)
+    again, _ = kmeans(data, 2, seed=1)
+    assert len(set(labels[:20])) == 1 and len(set(labels[20:])) == 1
+    assert labels[0] != labels[-1]
+    assert np.array_equal(centroids, again)
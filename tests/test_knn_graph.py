@@ -0,0 +1,108 @@
+"""Tests for the materialized kNN graph."""
+
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from flower_trait_modeling.domain.models import FeatureVector
+from flower_trait_modeling.similarity import metrics
+from flower_trait_modeling.similarity.engine import SimilarityEngine
+from flower_trait_modeling.similarity.knn_graph import KNNGraph
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+from flower_trait_modeling.utils.errors import SimilarityError
+from flower_trait_modeling.weighting.manager import WeightManager
+from flower_trait_modeling.weighting.schemes import WeightConstraint
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _matrix(rows=40, width=5, seed=8):
+    rng = np.random.default_rng(seed)
+    return VectorMatrix.from_array(schema_id="s", ids=[f"v{i}" for i in range(rows)], values=rng.random((rows, width)) - 0.2)
+
+
+def _vector(values):
+    return FeatureVector(schema_id="s", values=list(values), mapping=[])
+
+
+def _assert_same(graph, rebuilt):
+    assert graph.ids == rebuilt.ids
+    np.testing.assert_array_equal(graph.neighbors, rebuilt.neighbors)
+    np.testing.assert_allclose(graph.scores, rebuilt.scores, atol=1e-12)
+
+
+def test_graph_matches_dense_neighbours_and_round_trips(tmp_path):
+    matrix = _matrix()
+    graph = KNNGraph.build(matrix, top_k=4, memory_budget_mb=0.001)
+    dense = matrix.unit_values @ matrix.unit_values.T
+    np.fill_diagonal(dense, -np.inf)
+    assert [r.candidate_id for r in graph.neighbors_of("v3")] == [f"v{j}" for j in np.argsort(-dense[3], kind="stable")[:4]]
+    loaded = KNNGraph.load(graph.save(tmp_path / "knn.npz"))
+    _assert_same(loaded, graph)
+    with pytest.raises(SimilarityError):
+        graph.neighbors_of("missing")
+
+
+def test_upserts_repair_only_affected_rows_and_match_a_rebuild():
+    matrix = _matrix()
+    graph = KNNGraph.build(matrix, top_k=4)
+    rng = np.random.default_rng(1)
+    values = np.array(matrix.values)
+    ids = list(matrix.ids)
+    for step in range(6):
+        if step % 2:
+            ids.append(f"new{step}")
+            values = np.vstack([values, rng.random(5)])
+            touched = graph.upsert(ids[-1], _vector(values[-1]))
+        else:
+            row = int(rng.integers(len(ids)))
+            values[row] = rng.random(5) - 0.2
+            touched = graph.upsert(ids[row], _vector(values[row]))
+        assert touched < len(ids)
+        _assert_same(graph, KNNGraph.build(VectorMatrix.from_array(schema_id="s", ids=ids, values=values), top_k=4))
+
+
+def test_small_catalogue_pads_missing_neighbours():
+    graph = KNNGraph.build(_matrix(rows=2), top_k=3)
+    assert graph.neighbors[0].tolist() == [1, -1, -1]
+    graph.upsert("v2", _vector([1.0, 0.0, 0.0, 0.0, 0.0]))
+    assert [len(graph.neighbors_of(variety_id)) for variety_id in graph.ids] == [2, 2, 2]
+
+
+def test_weighted_graph_ranks_by_weighted_cosine_and_survives_growth(tmp_path):
+    matrix = _matrix(rows=12)
+    weights = np.array([4.0, 2.0, 1.0, 0.5, 0.0])
+    graph = KNNGraph.build(matrix, top_k=3, weights=weights)
+    dense = np.array([[metrics.weighted_cosine(a, b, weights.tolist()) for b in matrix.values] for a in matrix.values])
+    np.fill_diagonal(dense, -np.inf)
+    assert graph.neighbors[5].tolist() == np.argsort(-dense[5], kind="stable")[:3].tolist()
+    np.testing.assert_allclose(graph.scores[5], np.sort(dense[5])[::-1][:3], atol=1e-12)
+    rng = np.random.default_rng(4)
+    values, ids = np.array(matrix.values), list(matrix.ids)
+    for step in range(20):
+        ids.append(f"new{step}")
+        values = np.vstack([values, rng.random(5) - 0.2])
+        graph.upsert(ids[-1], _vector(values[-1]))
+    _assert_same(graph, KNNGraph.build(VectorMatrix.from_array(schema_id="s", ids=ids, values=values), top_k=3, weights=weights))
+    assert len(graph._buffers[0]) > len(graph.units) == len(ids)
+    loaded = KNNGraph.load(graph.save(tmp_path / "knn.npz"))
+    np.testing.assert_array_equal(loaded.weights, weights)
+
+
+def test_build_script_ranks_by_the_weight_scheme(tmp_path, capsys):
+    spec = importlib.util.spec_from_file_location("build_knn_graph", ROOT / "scripts" / "build_knn_graph.py")
+    script = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(script)
+    mapping = ["species", "species", "flower_shape", "stem_length_cm", "fragrance"]
+    matrix = VectorMatrix.from_array(schema_id="s", ids=[f"v{i}" for i in range(12)], values=_matrix(rows=12).values, mapping=mapping)
+    matrix.save(tmp_path / "matrix.npz")
+    weights_path = ROOT / "configs" / "weights_default.yaml"
+    script.main([str(tmp_path / "matrix.npz"), "--output", str(tmp_path / "knn.npz"), "--top-k", "3", "--weights", str(weights_path)])
+    assert "12 varieties x 3 neighbours" in capsys.readouterr().out
+    scheme = WeightManager(WeightConstraint(min_weight=0.0, max_weight=1.0)).load(str(weights_path))
+    weights = SimilarityEngine({"vector": 1.0}, weight_scheme=scheme).slot_weights(mapping)
+    loaded = KNNGraph.load(tmp_path / "knn.npz")
+    np.testing.assert_allclose(loaded.weights, weights)
+    _assert_same(loaded, KNNGraph.build(matrix, top_k=3, weights=weights))
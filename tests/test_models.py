@@ -0,0 +1,22 @@
+"""Tests for domain models."""
+
+from flower_trait_modeling.domain.models import FeatureVector
+
+
+def test_feature_vector_norm_cached_and_invalidated():
+    vector = FeatureVector(schema_id="s", values=[3.0, 4.0], mapping=["a", "b"])
+    assert vector.norm() == 5.0
+    vector.values[0] = 0.0
+    assert vector.norm() == 5.0
+    vector.invalidate()
+    assert vector.norm() == 4.0
+    vector.values = [6.0, 8.0]
+    vector.invalidate()
+    assert vector.norm() == 10.0
+    assert vector.version == 2
+    assert vector.unit_values() == [0.6, 0.8]
+
+
+def test_zero_vector_norm_falls_back_to_one():
+    vector = FeatureVector(schema_id="s", values=[0.0, 0.0], mapping=["a", "b"])
+    assert vector.norm() == 1.0
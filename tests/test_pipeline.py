@@ -0,0 +1,94 @@
+"""Tests for the coarse-then-fine retrieval pipeline."""
+
+import numpy as np
+import pytest
+
+from flower_trait_modeling.similarity.config import PipelineConfig, SimilarityConfig
+from flower_trait_modeling.similarity.engine import SimilarityEngine
+from flower_trait_modeling.similarity.index_flat import FlatIndex
+from flower_trait_modeling.similarity.pipeline import TwoStagePipeline
+from flower_trait_modeling.similarity.retrieval import RetrievalEngine
+from flower_trait_modeling.similarity.strategies import FusionConfig, SimilarityStrategy, encode_categories
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+from flower_trait_modeling.utils.errors import ConfigurationError, SimilarityError
+from flower_trait_modeling.weighting.schemes import WeightScheme
+
+STRATEGY = SimilarityStrategy(FusionConfig(weights={"vector": 0.6, "color": 0.25, "categorical": 0.15}))
+
+
+def _catalogue(rows=200, seed=6):
+    rng = np.random.default_rng(seed)
+    matrix = VectorMatrix.from_array(schema_id="s", ids=[f"v{i}" for i in range(rows)], values=rng.random((rows, 6)), mapping=[f"d{i}" for i in range(6)])
+    colors = rng.random((rows, 3)) * [100.0, 60.0, 60.0]
+    _, hot = encode_categories([set(rng.choice(["rose", "lily", "red", "white", "spray"], size=2)) for _ in range(rows)])
+    return matrix, colors, hot
+
+
+def _full_fusion(matrix, colors, hot, row, top_k):
+    columns = STRATEGY.score_columns(matrix.vector(row), matrix, colors[row], colors, hot[row], hot)
+    fused = STRATEGY.fuse(columns)
+    return [f"v{i}" for i in np.argsort(-fused, kind="stable")[:top_k]]
+
+
+def test_full_shortlist_reproduces_single_stage_fusion():
+    matrix, colors, hot = _catalogue()
+    pipeline = TwoStagePipeline(RetrievalEngine(SimilarityEngine({"vector": 1.0})), STRATEGY, PipelineConfig(shortlist=len(matrix)))
+    outcome = pipeline.run(matrix.vector(4), matrix, 5, colors[4], colors, hot[4], hot)
+    assert [r.candidate_id for r in outcome.results] == _full_fusion(matrix, colors, hot, 4, 5)
+    assert set(outcome.latency_ms) == {"coarse", "fine"} and outcome.candidates == {"coarse": 200, "fine": 200}
+    assert "fine: 200 rows" in outcome.report()
+
+
+def test_fine_vector_column_uses_the_engine_slot_weights():
+    matrix, _, _ = _catalogue()
+    scheme = WeightScheme(name="w", weights={"d0": 5.0, "d1": 3.0, "d2": 0.1, "d3": 0.1, "d4": 0.1, "d5": 0.1})
+    retrieval = RetrievalEngine(SimilarityEngine({"vector": 1.0}, weight_scheme=scheme))
+    config = PipelineConfig(shortlist=len(matrix), fine_metrics=("vector",))
+    outcome = TwoStagePipeline(retrieval, STRATEGY, config).run(matrix.vector(4), matrix, 10)
+    expected = retrieval.search_matrix(matrix.vector(4), matrix, top_k=10)
+    assert [r.candidate_id for r in outcome.results] == [r.candidate_id for r in expected]
+    assert [r.score / outcome.results[0].score for r in outcome.results] == pytest.approx([r.score for r in expected])
+    plain = RetrievalEngine(SimilarityEngine({"vector": 1.0})).search_matrix(matrix.vector(4), matrix, top_k=10)
+    assert [r.candidate_id for r in plain] != [r.candidate_id for r in expected]
+
+
+def test_index_shortlist_scores_only_survivors_with_selected_metrics():
+    matrix, colors, hot = _catalogue()
+    retrieval = RetrievalEngine(SimilarityEngine({"vector": 1.0}), index=FlatIndex.from_matrix(matrix))
+    config = PipelineConfig(shortlist=20, coarse="index", fine_metrics=("vector", "color"))
+    outcome = TwoStagePipeline(retrieval, STRATEGY, config).run(matrix.vector(9), matrix, 5, query_color=colors[9], colors=colors)
+    shortlist = {r.candidate_id for r in retrieval.search_index(matrix.vector(9), 20)}
+    assert outcome.candidates == {"fine": 20} and {r.candidate_id for r in outcome.results} <= shortlist
+    assert outcome.report().startswith("coarse: ") and "fine: 20 rows" in outcome.report()
+    with pytest.raises(SimilarityError):
+        TwoStagePipeline(retrieval, STRATEGY, config).run(matrix.vector(9), matrix, 5)
+
+
+def test_color_coarse_metric_shortlists_nearest_colors():
+    matrix, colors, hot = _catalogue()
+    config = PipelineConfig(shortlist=15, coarse_metric="color", fine_metrics=("vector", "categorical"))
+    pipeline = TwoStagePipeline(RetrievalEngine(SimilarityEngine({"vector": 1.0})), STRATEGY, config)
+    outcome = pipeline.run(matrix.vector(3), matrix, 5, colors[3], colors, hot[3], hot)
+    nearest = np.argsort(np.linalg.norm(colors - colors[3], axis=1), kind="stable")[:15]
+    assert set(outcome.rows.tolist()) <= set(nearest.tolist())
+    assert [r.candidate_id for r in outcome.results] == [f"v{row}" for row in outcome.rows]
+    with pytest.raises(SimilarityError):
+        pipeline.run(matrix.vector(3), matrix, 5, query_categories=hot[3], categories=hot)
+
+
+def test_pipeline_settings_come_from_yaml(tmp_path):
+    path = tmp_path / "similarity.yaml"
+    path.write_text(
+        "fusion:\n  weights: {vector: 0.5, categorical: 0.5}\n"
+        "pipeline:\n  enabled: true\n  shortlist: 40\n  coarse: matrix\n  coarse_metric: categorical\n  fine_metrics: [vector, categorical]\n",
+        encoding="utf-8",
+    )
+    loaded = SimilarityConfig.from_file(str(path))
+    config = loaded.pipeline
+    assert (config.enabled, config.shortlist, config.coarse, config.coarse_metric) == (True, 40, "matrix", "categorical")
+    assert config.fine_metrics == ("vector", "categorical") and loaded.fusion_weights == {"vector": 0.5, "categorical": 0.5}
+    assert PipelineConfig().enabled is False
+    with pytest.raises(ConfigurationError):
+        PipelineConfig(fine_metrics=("vector", "hue"))
+    with pytest.raises(ConfigurationError):
+        PipelineConfig(coarse="index", coarse_metric="color")
@@ -0,0 +1,37 @@
+"""Tests for the numeric range index."""
+
+import pytest
+
+from flower_trait_modeling.similarity.range_index import RangeIndex
+from flower_trait_modeling.utils.errors import SimilarityError
+
+RECORDS = [
+    {"variety_id": "r1", "flower_diameter_cm": 9.0, "stem_length_cm": 70.0, "vase_life_days": 12},
+    {"variety_id": "r2", "flower_diameter_cm": 6.0, "stem_length_cm": 45.0, "vase_life_days": 8},
+    {"variety_id": "r3", "flower_diameter_cm": 11.5, "stem_length_cm": 80.0, "vase_life_days": 10},
+    {"variety_id": "r4", "flower_diameter_cm": 14.0, "stem_length_cm": 60.0},
+]
+
+
+def test_bounds_are_inclusive_and_open_ended():
+    index = RangeIndex.build(RECORDS)
+    assert sorted(index.rows("stem_length_cm", 60, 80).tolist()) == [0, 2, 3]
+    assert sorted(index.rows("vase_life_days", low=10).tolist()) == [0, 2]
+    assert index.rows("flower_diameter_cm", high=5).tolist() == []
+
+
+def test_select_intersects_every_bound():
+    index = RangeIndex.build(RECORDS)
+    query = {"stem_length_cm": (60, 80), "vase_life_days": (10, None), "flower_diameter_cm": (8, 12)}
+    assert index.select(query).tolist() == [0, 2]
+    assert index.select_ids(query) == ["r1", "r3"]
+    with pytest.raises(SimilarityError):
+        index.rows("petal_count", 1, 2)
+
+
+def test_blank_and_none_values_are_skipped():
+    records = RECORDS + [{"variety_id": "r5", "flower_diameter_cm": None, "stem_length_cm": "", "vase_life_days": "9"}]
+    index = RangeIndex.build(records)
+    assert index.rows("flower_diameter_cm").size == 4
+    assert index.rows("stem_length_cm").size == 4
+    assert index.select_ids({"vase_life_days": (9, 9)}) == ["r5"]
@@ -1,8 +1,23 @@
 """Tests for retrieval engine."""
 
+import random
+from multiprocessing import shared_memory
+
+import pytest
+
+from flower_trait_modeling.similarity.bitmap import BitmapIndex
+from flower_trait_modeling.similarity.color_index import ColorIndex
+from flower_trait_modeling.similarity.diversity import mmr_select
 from flower_trait_modeling.similarity.engine import SimilarityEngine
+from flower_trait_modeling.similarity.range_index import RangeIndex
 from flower_trait_modeling.similarity.retrieval import RetrievalEngine
+from flower_trait_modeling.similarity import sharded as sharded_module
+from flower_trait_modeling.similarity.sharded import ShardedMatrix
+from flower_trait_modeling.similarity.threshold_topk import GroupBoundIndex
 from flower_trait_modeling.domain.models import FeatureVector
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+from flower_trait_modeling.utils.errors import SimilarityError
+from flower_trait_modeling.weighting.schemes import WeightScheme
 
 
 def test_retrieval_sorts_by_score():
@@ -16,3 +31,203 @@ def test_retrieval_sorts_by_score():
     results = retriever.search(query, candidates, top_k=1)
     assert len(results) == 1
     assert results[0].score <= 1.0
+
+
+def test_search_matrix_matches_pairwise_search():
+    rng = random.Random(7)
+    retriever = RetrievalEngine(SimilarityEngine({"vector": 1.0}))
+    query = FeatureVector(schema_id="s", values=[rng.random() for _ in range(6)], mapping=list("abcdef"))
+    candidates = [FeatureVector(schema_id="s", values=[rng.random() for _ in range(6)], mapping=list("abcdef")) for _ in range(20)]
+    matrix = VectorMatrix.from_vectors(candidates)
+    expected = retriever.search(query, candidates, top_k=5)
+    batched = retriever.search_matrix(query, matrix, top_k=5)
+    pairwise_scores = [retriever.engine.compare(query, c).score for c in candidates]
+    expected_ids = sorted(range(20), key=lambda idx: pairwise_scores[idx], reverse=True)[:5]
+    assert [r.candidate_id for r in batched] == [str(idx) for idx in expected_ids]
+    assert [r.score for r in batched] == pytest.approx([r.score for r in expected])
+
+
+def test_search_accepts_generator_and_batches():
+    rng = random.Random(11)
+    retriever = RetrievalEngine(SimilarityEngine({"vector": 1.0}))
+    query = FeatureVector(schema_id="s", values=[rng.random() for _ in range(4)], mapping=list("abcd"))
+    candidates = [FeatureVector(schema_id="s", values=[rng.random() for _ in range(4)], mapping=list("abcd")) for _ in range(30)]
+    streamed = retriever.search(query, (c for c in candidates), top_k=3)
+    ids = [str(idx) for idx in range(30)]
+    batches = (VectorMatrix.from_vectors(candidates[i : i + 7], ids[i : i + 7]) for i in range(0, 30, 7))
+    batched = retriever.search_batches(query, batches, top_k=3)
+    full = retriever.search_matrix(query, VectorMatrix.from_vectors(candidates, ids), top_k=3)
+    assert [r.candidate_id for r in batched] == [r.candidate_id for r in full]
+    assert [r.score for r in streamed] == pytest.approx([r.score for r in full])
+    assert streamed[0].score == pytest.approx(1.0)
+
+
+def test_search_matrix_scores_only_filtered_rows():
+    vectors = [FeatureVector(schema_id="s", values=[1.0, float(i)], mapping=["a", "b"]) for i in range(4)]
+    records = [{"species": s} for s in ["rose", "lily", "rose", "tulip"]]
+    retriever = RetrievalEngine(SimilarityEngine({"vector": 1.0}), bitmap=BitmapIndex.build(records, fields=["species"]))
+    matrix = VectorMatrix.from_vectors(vectors, ids=["v0", "v1", "v2", "v3"])
+    results = retriever.search_matrix(vectors[1], matrix, top_k=5, where={"species": "rose"})
+    assert sorted(r.candidate_id for r in results) == ["v0", "v2"]
+
+
+def test_search_matrix_combines_bitmap_and_range_filters():
+    vectors = [FeatureVector(schema_id="s", values=[1.0, float(i)], mapping=["a", "b"]) for i in range(4)]
+    records = [{"species": "rose", "stem_length_cm": length} for length in [50, 65, 70, 90]]
+    retriever = RetrievalEngine(
+        SimilarityEngine({"vector": 1.0}),
+        bitmap=BitmapIndex.build(records, fields=["species"]),
+        ranges=RangeIndex.build(records, fields=["stem_length_cm"]),
+    )
+    matrix = VectorMatrix.from_vectors(vectors, ids=["v0", "v1", "v2", "v3"])
+    results = retriever.search_matrix(vectors[0], matrix, where={"species": "rose"}, between={"stem_length_cm": (60, 80)})
+    assert sorted(r.candidate_id for r in results) == ["v1", "v2"]
+
+
+def test_search_sharded_matches_single_process():
+    rng = random.Random(7)
+    mapping = [f"t{i}" for i in range(6)]
+    vectors = [FeatureVector(schema_id="s", values=[float(rng.randint(0, 3)) for _ in mapping], mapping=mapping) for _ in range(200)]
+    matrix = VectorMatrix.from_vectors(vectors, ids=[f"v{i}" for i in range(200)])
+    scheme = WeightScheme(name="w", weights={"t0": 2.0, "t3": 0.5})
+    with ShardedMatrix(matrix, shards=3, processes=2) as sharded:
+        for engine in (SimilarityEngine({"vector": 0.8}), SimilarityEngine({"vector": 1.0}, weight_scheme=scheme)):
+            retriever = RetrievalEngine(engine)
+            expected = retriever.search_matrix(vectors[5], matrix, top_k=10)
+            actual = retriever.search_sharded(vectors[5], sharded, top_k=10)
+            assert [(r.candidate_id, r.score) for r in actual] == [(r.candidate_id, r.score) for r in expected]
+
+
+def test_sharded_worker_detach_closes_its_handle():
+    block = shared_memory.SharedMemory(create=True, size=3 * 3 * 8)
+    try:
+        sharded_module._attach(block.name, 3, 2)
+        handle = sharded_module._WORKER["block"]
+        sharded_module._detach()
+        assert sharded_module._WORKER == {} and handle.buf is None
+    finally:
+        block.close()
+        block.unlink()
+
+
+def test_search_matrix_color_prefilter():
+    vectors = [FeatureVector(schema_id="s", values=[1.0, float(i)], mapping=["a", "b"]) for i in range(3)]
+    records = [{"color_primary": color} for color in ["#d02050", "#ffffff", "#d02858"]]
+    retriever = RetrievalEngine(SimilarityEngine({"vector": 1.0}), colors=ColorIndex.from_records(records))
+    matrix = VectorMatrix.from_vectors(vectors, ids=["red", "white", "pink"])
+    results = retriever.search_matrix(vectors[1], matrix, near_color=("#d02050", 5.0))
+    assert sorted(r.candidate_id for r in results) == ["pink", "red"]
+
+
+def test_search_diverse_skips_near_duplicates():
+    mapping = ["a", "b", "c"]
+    rows = [[1.0, 0.0, 0.0], [0.99, 0.01, 0.0], [0.98, 0.02, 0.0], [0.7, 0.0, 0.7], [0.0, 1.0, 0.0]]
+    matrix = VectorMatrix.from_vectors([FeatureVector(schema_id="s", values=row, mapping=mapping) for row in rows], ids=["r0", "r1", "r2", "mixed", "far"])
+    query = FeatureVector(schema_id="s", values=[1.0, 0.0, 0.5], mapping=mapping)
+    retriever = RetrievalEngine(SimilarityEngine({"vector": 1.0}))
+    plain = retriever.search_matrix(query, matrix, top_k=3)
+    relevance_only = retriever.search_diverse(query, matrix, top_k=3, mmr_lambda=1.0)
+    diverse = retriever.search_diverse(query, matrix, top_k=3, mmr_lambda=0.5)
+    assert [r.candidate_id for r in relevance_only] == [r.candidate_id for r in plain] == ["mixed", "r0", "r1"]
+    assert [r.candidate_id for r in diverse] == ["mixed", "r0", "far"]
+
+
+def test_search_diverse_compares_relevance_and_redundancy_on_one_scale():
+    mapping = ["a", "b", "c"]
+    rows = [[1.0, 0.0, 1.0], [1.0, 0.05, 1.0], [1.0, 1.0, 0.0]]
+    matrix = VectorMatrix.from_vectors([FeatureVector(schema_id="s", values=row, mapping=mapping) for row in rows], ids=["r0", "r1", "far"])
+    query = FeatureVector(schema_id="s", values=[1.0, -0.3, 0.0], mapping=mapping)
+    engine = SimilarityEngine({"vector": 0.5})
+    cosine = engine.compare_matrix(query, matrix) / 0.5
+    expected = mmr_select(cosine, engine.similarity_block(matrix, [0, 1, 2]), 2, 0.68)
+    diverse = RetrievalEngine(engine).rank_diverse(query, matrix, top_k=2, mmr_lambda=0.68)
+    # Max-normalized relevance would overstate r0 vs r1 and keep the near-duplicate r1.
+    assert diverse.rows.tolist() == expected.tolist() == [0, 2]
+
+
+def test_rank_matrix_keeps_rows_of_repeated_ids_and_explains_displayed_scores():
+    mapping = ["a", "b", "c"]
+    rows = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.6, 0.8, 0.0]]
+    matrix = VectorMatrix.from_vectors([FeatureVector(schema_id="s", values=row, mapping=mapping) for row in rows], ids=["dup", "dup", "other"])
+    query = FeatureVector(schema_id="s", values=[0.0, 1.0, 0.2], mapping=mapping)
+    engine = SimilarityEngine({"vector": 0.8})
+    retriever = RetrievalEngine(engine)
+    ranked = retriever.rank_matrix(query, matrix, top_k=3)
+    assert ranked.rows.tolist() == [1, 2, 0]
+    assert ranked.results[0].score == 1.0
+    breakdown = engine.explain_batch(query, matrix, ranked.rows, normalizer=ranked.normalizer)
+    assert breakdown.contributions.sum(axis=1).tolist() == pytest.approx([r.score for r in ranked.results])
+    assert retriever.rank_diverse(query, matrix, top_k=2, mmr_lambda=1.0).rows.tolist() == [1, 2]
+
+
+def test_search_bounded_matches_search_matrix_with_less_work():
+    rng = random.Random(3)
+    mapping = ["color"] * 8 + ["form"] * 5 + ["fragrance"] * 4 + ["stem", "petals"]
+    vectors = []
+    for _ in range(400):
+        values = [0.0] * len(mapping)
+        values[rng.randrange(8)] = 1.0
+        values[8 + rng.randrange(5)] = 1.0
+        values[13 + rng.randrange(4)] = 1.0
+        values[17], values[18] = rng.random(), rng.random()
+        vectors.append(FeatureVector(schema_id="s", values=values, mapping=mapping))
+    matrix = VectorMatrix.from_vectors(vectors, ids=[f"v{i}" for i in range(400)])
+    scheme = WeightScheme(name="w", weights={"color": 8.0, "form": 4.0, "fragrance": 0.5, "stem": 0.2, "petals": 0.2})
+    for engine in (SimilarityEngine({"vector": 1.0}), SimilarityEngine({"vector": 1.0}, weight_scheme=scheme)):
+        retriever = RetrievalEngine(engine)
+        bounds = GroupBoundIndex(matrix, engine.slot_weights(mapping))
+        for row in (0, 17, 123):
+            expected = retriever.search_matrix(vectors[row], matrix, top_k=5)
+            actual = retriever.search_bounded(vectors[row], bounds, top_k=5)
+            assert [(r.candidate_id, r.score) for r in actual] == [(r.candidate_id, r.score) for r in expected]
+    _, stats = bounds.candidates(vectors[0], 5)
+    assert stats.work_ratio < 0.5
+    with pytest.raises(SimilarityError):
+        RetrievalEngine(SimilarityEngine({"vector": 1.0})).search_bounded(vectors[0], bounds)
+
+
+def test_group_bounds_reject_a_matrix_changed_after_build():
+    mapping = ["color"] * 3 + ["stem"]
+    vectors = [FeatureVector(schema_id="s", values=[float(i == row % 3) for i in range(3)] + [0.5], mapping=mapping) for row in range(6)]
+    matrix = VectorMatrix.from_vectors(vectors)
+    retriever = RetrievalEngine(SimilarityEngine({"vector": 1.0}))
+    bounds = GroupBoundIndex(matrix, None)
+    assert retriever.search_bounded(vectors[0], bounds, top_k=1)[0].candidate_id == "0"
+    matrix.set_row(1, [1.0, 0.0, 0.0, 0.5])
+    with pytest.raises(SimilarityError):
+        retriever.search_bounded(vectors[0], bounds, top_k=1)
+    with pytest.raises(SimilarityError):
+        bounds.within(vectors[0], 0.5)
+    with pytest.raises(SimilarityError):
+        next(retriever.search_radius(vectors[0], matrix, 0.5, bounds=bounds))
+    rebuilt = GroupBoundIndex(matrix, None)
+    assert {r.candidate_id for r in retriever.search_bounded(vectors[0], rebuilt, top_k=3)} == {"0", "1", "3"}
+
+
+def test_search_radius_streams_every_match_in_score_order():
+    rng = random.Random(5)
+    mapping = ["color"] * 6 + ["form"] * 4 + ["stem"]
+    vectors = []
+    for _ in range(300):
+        values = [0.0] * len(mapping)
+        values[rng.randrange(6)] = 1.0
+        values[6 + rng.randrange(4)] = 1.0
+        values[10] = rng.random()
+        vectors.append(FeatureVector(schema_id="s", values=values, mapping=mapping))
+    matrix = VectorMatrix.from_vectors(vectors, ids=[f"v{i}" for i in range(300)])
+    engine = SimilarityEngine({"vector": 1.0}, weight_scheme=WeightScheme(name="w", weights={"color": 4.0, "form": 2.0, "stem": 0.5}))
+    retriever = RetrievalEngine(engine)
+    scores = engine.compare_matrix(vectors[0], matrix)
+    expected = [(f"v{row}", float(scores[row])) for row in sorted(range(300), key=lambda row: -scores[row]) if scores[row] >= 0.9]
+    assert len(expected) > 5
+    scanned = retriever.search_radius(vectors[0], matrix, 0.9, chunk_rows=64)
+    assert [(r.candidate_id, r.score) for r in scanned] == expected
+    bounds = GroupBoundIndex(matrix, engine.slot_weights(mapping))
+    pruned = retriever.search_radius(vectors[0], matrix, 0.9, bounds=bounds)
+    assert next(pruned).candidate_id == expected[0][0]
+    assert [(r.candidate_id, r.score) for r in pruned] == expected[1:]
+    assert bounds.within(vectors[0], 0.9)[1].survivors < 300
+    with pytest.raises(SimilarityError):
+        retriever.search_radius(vectors[0], matrix, 0.9, bounds=GroupBoundIndex(matrix, None))
+    with pytest.raises(SimilarityError):
+        RetrievalEngine(SimilarityEngine({"vector": 1.0})).search_radius(vectors[0], matrix, 0.9, bounds=bounds)
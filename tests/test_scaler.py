@@ -1,5 +1,6 @@
 """Tests for vector scaler."""
 
+from flower_trait_modeling.domain.models import FeatureVector
 from flower_trait_modeling.feature_engineering.scaler import VectorScaler
 
 
@@ -13,3 +14,10 @@ def test_max_abs_scaler_handles_zero():
     scaler = VectorScaler("max_abs")
     scaled = scaler.scale([0.0, 0.0, 1.0])
     assert max(scaled) == 1.0
+
+
+def test_scale_vector_invalidates_cached_norm():
+    vector = FeatureVector(schema_id="s", values=[3.0, 4.0], mapping=["a", "b"])
+    assert vector.norm() == 5.0
+    VectorScaler("unit").scale_vector(vector)
+    assert round(vector.norm(), 6) == 1.0
@@ -0,0 +1,124 @@
+"""Tests for the micro-batching query server."""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from flower_trait_modeling.app.server import QueryBatcher, QueryServer
+from flower_trait_modeling.domain.models import FeatureVector
+from flower_trait_modeling.similarity.config import ServerConfig
+from flower_trait_modeling.similarity.engine import SimilarityEngine
+from flower_trait_modeling.similarity.retrieval import RetrievalEngine
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+from flower_trait_modeling.utils.errors import SimilarityError
+
+MAPPING = ["a", "b", "c"]
+VECTORS = [FeatureVector(schema_id="s", values=[1.0, float(i), float(i % 3)], mapping=MAPPING) for i in range(12)]
+MATRIX = VectorMatrix.from_vectors(VECTORS, ids=[f"v{i}" for i in range(12)])
+
+
+def test_concurrent_queries_share_one_batch_and_match_search_matrix():
+    retrieval = RetrievalEngine(SimilarityEngine({"vector": 1.0}))
+
+    async def scenario():
+        batcher = QueryBatcher(retrieval, MATRIX, ServerConfig(batch_size=8, max_wait_ms=50))
+        await batcher.start()
+        answers = await asyncio.gather(*(batcher.submit(VECTORS[i], top_k=1 + i % 4) for i in range(4)))
+        await batcher.stop()
+        return batcher.batches, answers
+
+    batches, answers = asyncio.run(scenario())
+    assert batches == 1
+    for i, results in enumerate(answers):
+        expected = retrieval.search_matrix(VECTORS[i], MATRIX, top_k=1 + i % 4)
+        assert [r.candidate_id for r in results] == [r.candidate_id for r in expected]
+        assert [r.score for r in results] == pytest.approx([r.score for r in expected])
+
+
+def test_full_queue_rejects_and_unknown_variety_reports_error():
+    retrieval = RetrievalEngine(SimilarityEngine({"vector": 1.0}))
+
+    async def scenario():
+        batcher = QueryBatcher(retrieval, MATRIX, ServerConfig(queue_depth=1))
+        await batcher.start()
+        batcher._worker.cancel()
+        first = asyncio.ensure_future(batcher.submit(VECTORS[0]))
+        await asyncio.sleep(0)
+        with pytest.raises(SimilarityError):
+            await batcher.submit(VECTORS[1])
+        first.cancel()
+        return await QueryServer(batcher).handle({"variety_id": "missing"})
+
+    assert "error" in asyncio.run(scenario())
+
+
+def test_batches_run_off_the_event_loop_and_bad_requests_get_errors():
+    retrieval = RetrievalEngine(SimilarityEngine({"vector": 1.0}))
+    threads = []
+    search = retrieval.search_matrix_many
+
+    def recording(*args):
+        threads.append(threading.get_ident())
+        return search(*args)
+
+    retrieval.search_matrix_many = recording
+
+    async def scenario():
+        batcher = QueryBatcher(retrieval, MATRIX, ServerConfig(max_wait_ms=1))
+        await batcher.start()
+        server = QueryServer(batcher)
+        ok = await server.handle({"variety_id": "v1", "top_k": 2})
+        zero = await server.handle({"variety_id": "v1", "top_k": 0})
+        async def crash(query, top_k):
+            raise RuntimeError("boom")
+
+        batcher.submit = crash  # any unexpected failure must still produce a response
+        broken = await server.handle({"variety_id": "v1"})
+        await batcher.stop()
+        return ok, zero, broken
+
+    ok, zero, broken = asyncio.run(scenario())
+    assert len(ok["results"]) == 2 and threads and threading.get_ident() not in threads
+    assert "top_k" in zero["error"]
+    assert broken["error"].startswith("internal error")
+
+
+def test_stop_fails_queued_and_collected_queries():
+    retrieval = RetrievalEngine(SimilarityEngine({"vector": 1.0}))
+
+    async def scenario():
+        batcher = QueryBatcher(retrieval, MATRIX, ServerConfig(batch_size=8, max_wait_ms=60000))
+        await batcher.start()
+        waiting = [asyncio.ensure_future(batcher.submit(vector)) for vector in VECTORS[:5]]
+        await asyncio.sleep(0.01)
+        await batcher.stop()
+        return await asyncio.gather(*waiting, return_exceptions=True)
+
+    outcomes = asyncio.run(scenario())
+    assert outcomes and all(isinstance(outcome, SimilarityError) for outcome in outcomes)
+
+
+def test_client_survives_undecodable_line():
+    retrieval = RetrievalEngine(SimilarityEngine({"vector": 1.0}))
+
+    async def scenario():
+        batcher = QueryBatcher(retrieval, MATRIX, ServerConfig(max_wait_ms=1))
+        await batcher.start()
+        server = QueryServer(batcher)
+        listener = await asyncio.start_server(server._client, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+        writer.write(b"\xff\xfe\n" + json.dumps({"variety_id": "v2", "top_k": 1}).encode("utf-8") + b"\n")
+        await writer.drain()
+        replies = [json.loads(await reader.readline()) for _ in range(2)]
+        writer.close()
+        await writer.wait_closed()
+        listener.close()
+        await listener.wait_closed()
+        await batcher.stop()
+        return replies
+
+    bad, good = asyncio.run(scenario())
+    assert "invalid JSON" in bad["error"]
+    assert good["results"][0]["candidate_id"] == "v2"
@@ -0,0 +1,119 @@
+"""Tests for the modeling service wiring."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+import yaml
+
+from flower_trait_modeling.app.service import ModelingService
+from flower_trait_modeling.similarity import metrics
+from flower_trait_modeling.similarity.index_hnsw import HNSWIndex
+from flower_trait_modeling.similarity.strategies import encode_categories
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+
+ROOT = Path(__file__).resolve().parents[1]
+CONFIGS = ROOT / "configs"
+DEMO = str(ROOT / "examples" / "demo_data.csv")
+
+
+def _service(tmp_path, persist_index=False, **sections):
+    config = yaml.safe_load((CONFIGS / "similarity.yaml").read_text(encoding="utf-8"))
+    config["index"]["path"] = str(tmp_path / "index.npz")
+    for name, values in sections.items():
+        config[name].update(values)
+    path = tmp_path / "similarity.yaml"
+    path.write_text(yaml.safe_dump(config), encoding="utf-8")
+    service = ModelingService(
+        trait_schema_path=str(CONFIGS / "trait_schema.yaml"),
+        vector_schema_path=str(CONFIGS / "vector_schema.yaml"),
+        weights_path=str(CONFIGS / "weights_default.yaml"),
+        profile_rules_path=str(CONFIGS / "profile_rules.yaml"),
+        storage_dir=str(tmp_path / "out"),
+        similarity_path=str(path),
+        persist_index=persist_index,
+    )
+    service._setup()
+    return service
+
+
+def test_reingesting_the_same_records_upserts_the_persisted_index(tmp_path):
+    service = _service(tmp_path, persist_index=True)
+    first = service.normalize_and_vectorize(service.ingest(DEMO))
+    service.normalize_and_vectorize(service.ingest(DEMO))
+    assert isinstance(service.index, HNSWIndex) and len(service.index) == len(first)
+    service.save_index()
+    reopened = _service(tmp_path, persist_index=True)
+    reopened.normalize_and_vectorize(reopened.ingest(DEMO))
+    assert len(reopened.index) == len(first)
+    assert reopened.retrieval_engine.search_index(first[0]["vector"], 1)[0].candidate_id == "v001"
+
+
+def test_index_is_only_kept_when_something_reads_it(tmp_path):
+    service = _service(tmp_path)
+    service.normalize_and_vectorize(service.ingest(DEMO))
+    assert service.index is None and service.save_index() is None
+
+
+def _catalogue(service):
+    normalized = service.normalize_and_vectorize(service.ingest(DEMO))
+    matrix = VectorMatrix.from_vectors([item["vector"] for item in normalized], ids=[item["record"]["variety_id"] for item in normalized])
+    return normalized, matrix
+
+
+def _ids(packaged):
+    # Each explanation is built against its own candidate row.
+    assert all(str(item["explanation"]).startswith(item["result"].candidate_id) for item in packaged)
+    return [item["result"].candidate_id for item in packaged]
+
+
+def test_search_ranks_by_cosine_by_default(tmp_path):
+    service = _service(tmp_path)
+    normalized, matrix = _catalogue(service)
+    ranked = _ids(service.search(normalized[0], normalized))
+    expected = service.retrieval_engine.search_matrix(normalized[0]["vector"], matrix, top_k=service.similarity_config.top_k)
+    assert ranked == [r.candidate_id for r in expected] and ranked[0] == "v001"
+
+
+def test_diversity_switch_mmr_reranks_the_results(tmp_path):
+    service = _service(tmp_path, diversity={"enabled": True, "lambda": 0.3})
+    normalized, matrix = _catalogue(service)
+    ranked = _ids(service.search(normalized[0], normalized))
+    diversity = service.similarity_config.diversity
+    expected = service.retrieval_engine.rank_diverse(
+        normalized[0]["vector"], matrix, top_k=service.similarity_config.top_k, mmr_lambda=diversity.mmr_lambda, pool_size=diversity.pool_size
+    )
+    plain = service.retrieval_engine.search_matrix(normalized[0]["vector"], matrix, top_k=service.similarity_config.top_k)
+    assert ranked == [r.candidate_id for r in expected.results]
+    assert ranked != [r.candidate_id for r in plain]
+
+
+def test_pipeline_switch_ranks_by_fused_metrics(tmp_path):
+    service = _service(tmp_path, pipeline={"enabled": True, "shortlist": 100}, diversity={"enabled": True})
+    normalized, matrix = _catalogue(service)
+    ranked = _ids(service.search(normalized[0], normalized))
+    # The shortlist covers the whole catalogue, so the ranking is a full fusion of every metric.
+    colors = np.array([item["record"]["color_primary"] for item in normalized])
+    _, hot = encode_categories([ModelingService._record_categories(item) for item in normalized])
+    strategy = service.two_stage.strategy
+    columns = strategy.score_columns(
+        matrix.vector(0), matrix, colors[0], colors, hot[0], hot, weights=service.similarity_engine.slot_weights(matrix.mapping)
+    )
+    fused = strategy.fuse(columns)
+    assert ranked == [str(matrix.ids[row]) for row in np.argsort(-fused, kind="stable")[: service.similarity_config.top_k]]
+
+
+@pytest.mark.parametrize("metric", ["color", "categorical"])
+def test_coarse_metric_picks_the_shortlist(tmp_path, metric):
+    service = _service(tmp_path, pipeline={"enabled": True, "shortlist": 6, "coarse_metric": metric, "fine_metrics": ["vector"]})
+    normalized, matrix = _catalogue(service)
+    ranked = _ids(service.search(normalized[0], normalized))
+    if metric == "color":
+        colors = np.array([item["record"]["color_primary"] for item in normalized])
+        scores = -metrics.delta_e_batch(colors[0], colors)
+    else:
+        _, hot = encode_categories([ModelingService._record_categories(item) for item in normalized])
+        scores = metrics.jaccard_batch(hot[0], hot)
+    # Ties at the cut may go either way, so allow every row scoring at least the sixth best.
+    shortlist = {str(variety_id) for variety_id in matrix.ids[scores >= np.sort(scores)[-6]]}
+    assert ranked[0] == "v001" and set(ranked) <= shortlist
@@ -1,7 +1,13 @@
 """Tests for similarity engine."""
 
+import random
+
+import pytest
+
 from flower_trait_modeling.similarity.engine import SimilarityEngine
 from flower_trait_modeling.domain.models import FeatureVector
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+from flower_trait_modeling.weighting.schemes import WeightScheme
 
 
 def test_similarity_returns_score():
@@ -18,3 +24,42 @@ def test_explain_returns_top_features():
     b = FeatureVector(schema_id="s", values=[0.5, 0.0, 0.25], mapping=["x", "y", "z"])
     explanation = engine.explain(a, b, top_k=2)
     assert len(explanation) == 2
+
+
+def test_weighted_cosine_matrix_matches_pairwise():
+    rng = random.Random(3)
+    mapping = ["species", "species", "size", "color", "color", "color"]
+    scheme = WeightScheme(name="demo", weights={"species": 0.1, "size": 0.6, "color": 0.3})
+    engine = SimilarityEngine({"vector": 1.0}, weight_scheme=scheme)
+    query = FeatureVector(schema_id="s", values=[rng.random() for _ in mapping], mapping=mapping)
+    candidates = [FeatureVector(schema_id="s", values=[rng.random() for _ in mapping], mapping=mapping) for _ in range(10)]
+    batched = engine.compare_matrix(query, VectorMatrix.from_vectors(candidates))
+    assert batched.tolist() == pytest.approx([engine.compare(query, c).score for c in candidates])
+    plain = SimilarityEngine({"vector": 1.0}).compare(query, candidates[0]).score
+    assert engine.compare(query, candidates[0]).score != pytest.approx(plain)
+
+
+def test_uniform_scheme_reduces_to_cosine():
+    mapping = ["a", "b"]
+    engine = SimilarityEngine({"vector": 1.0}, weight_scheme=WeightScheme(name="flat", weights={"a": 0.5, "b": 0.5}))
+    a = FeatureVector(schema_id="s", values=[1.0, 2.0], mapping=mapping)
+    b = FeatureVector(schema_id="s", values=[2.0, 1.0], mapping=mapping)
+    assert engine.compare(a, b).score == pytest.approx(SimilarityEngine({"vector": 1.0}).compare(a, b).score)
+
+
+def test_explain_batch_contributions_sum_to_scores():
+    rng = random.Random(5)
+    mapping = ["species", "species", "size", "color", "color", "color"]
+    candidates = [FeatureVector(schema_id="s", values=[rng.random() for _ in mapping], mapping=mapping) for _ in range(8)]
+    matrix = VectorMatrix.from_vectors(candidates, ids=[f"v{i}" for i in range(8)])
+    query = candidates[0]
+    scheme = WeightScheme(name="demo", weights={"species": 0.1, "size": 0.6, "color": 0.3})
+    for engine in (SimilarityEngine({"vector": 0.5}), SimilarityEngine({"vector": 1.0}, weight_scheme=scheme)):
+        breakdown = engine.explain_batch(query, matrix, [5, 2, 7], top_features=2)
+        assert breakdown.traits == ["species", "size", "color"]
+        assert breakdown.candidate_ids == ["v5", "v2", "v7"]
+        assert breakdown.contributions.sum(axis=1).tolist() == pytest.approx(engine.compare_matrix(query, matrix)[[5, 2, 7]].tolist())
+        for row in range(3):
+            expected = sorted(range(3), key=lambda col: -breakdown.contributions[row, col])[:2]
+            assert breakdown.top[row].tolist() == expected
+            assert len(breakdown.reasons(row)) == 2
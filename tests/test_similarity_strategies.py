@@ -1,7 +1,12 @@
 """Tests for similarity strategies."""
 
-from flower_trait_modeling.similarity.strategies import SimilarityStrategy, FusionConfig
+import numpy as np
+import pytest
+
+from flower_trait_modeling.similarity.strategies import SimilarityStrategy, FusionConfig, encode_categories
 from flower_trait_modeling.domain.models import FeatureVector
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+from flower_trait_modeling.utils.errors import SimilarityError
 
 
 def test_similarity_strategy_combines_scores():
@@ -20,3 +25,44 @@ def test_compare_categories_uses_jaccard():
     strategy = SimilarityStrategy(FusionConfig(weights={"vector": 1.0}))
     score = strategy.compare_categories(["a", "b"], ["b", "c"])
     assert 0 <= score <= 1
+
+
+def _fixture():
+    vectors = [FeatureVector(schema_id="s", values=[1.0, float(i)], mapping=["a", "b"]) for i in range(4)]
+    colors = np.array([[50.0, 10.0, 10.0], [0.0, 0.0, 0.0], [52.0, 12.0, 8.0], [90.0, 0.0, 0.0]])
+    sets = [["rose", "red"], ["lily"], ["rose"], ["red", "tulip"]]
+    return vectors, VectorMatrix.from_vectors(vectors), colors, sets
+
+
+def test_weighted_sum_columns_match_pairwise_combine():
+    vectors, matrix, colors, sets = _fixture()
+    strategy = SimilarityStrategy(FusionConfig(weights={"vector": 0.7, "categorical": 0.2, "color": 0.1}))
+    _, hot = encode_categories(sets)
+    columns = strategy.score_columns(vectors[0], matrix, colors[0], colors, hot[0], hot)
+    expected = [
+        strategy.combine(
+            strategy.compute_vector_score(vectors[0], vectors[i]),
+            strategy.compare_categories(sets[0], sets[i]),
+            strategy.compare_color(colors[0].tolist(), colors[i].tolist()),
+        )
+        for i in range(4)
+    ]
+    assert strategy.fuse(columns).tolist() == pytest.approx(expected)
+
+
+def test_max_and_rank_fusion():
+    columns = {"vector": np.array([0.9, 0.1, 0.5]), "color": np.array([0.0, 1.0, 0.5])}
+    weights = {"vector": 1.0, "color": 1.0}
+    assert SimilarityStrategy(FusionConfig(weights, "max")).fuse(columns).tolist() == [0.9, 1.0, 0.5]
+    fused = SimilarityStrategy(FusionConfig(weights, "rank", rank_constant=0.0)).fuse(columns)
+    assert fused.tolist() == pytest.approx([1 + 1 / 3, 1 / 3 + 1, 1 / 2 + 1 / 2])
+    with pytest.raises(SimilarityError):
+        SimilarityStrategy(FusionConfig(weights, "vote")).fuse(columns)
+
+
+def test_combine_follows_the_configured_strategy():
+    weights = {"vector": 0.5, "categorical": 1.0, "color": 0.2}
+    assert SimilarityStrategy(FusionConfig(weights, "max")).combine(0.9, 0.3, 1.0) == pytest.approx(0.45)
+    for strategy in ("rank", "vote"):
+        with pytest.raises(SimilarityError):
+            SimilarityStrategy(FusionConfig(weights, strategy)).combine(0.9, 0.3, 1.0)
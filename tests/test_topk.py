@@ -0,0 +1,20 @@
+"""Tests for bounded top-k helpers."""
+
+import numpy as np
+
+from flower_trait_modeling.similarity.topk import TopKHeap, top_k_indices
+
+
+def test_top_k_indices_matches_stable_sort_with_ties():
+    scores = np.array([0.5, 0.9, 0.5, 0.1, 0.9, 0.5])
+    rows = top_k_indices(scores, 4)
+    assert rows.tolist() == np.argsort(-scores, kind="stable")[:4].tolist()
+
+
+def test_heap_keeps_best_items_and_running_max():
+    heap = TopKHeap(2)
+    for idx, score in enumerate([0.2, 0.8, 0.8, 0.5]):
+        heap.push(score, f"c{idx}")
+    assert heap.items() == [(0.8, "c1"), (0.8, "c2")]
+    assert heap.max_score == 0.8
+    assert heap.seen == 4
@@ -0,0 +1,51 @@
+"""Tests for columnar vector matrix store."""
+
+import numpy as np
+import pytest
+
+from flower_trait_modeling.domain.models import FeatureVector
+from flower_trait_modeling.storage.vector_matrix import VectorMatrix
+from flower_trait_modeling.utils.errors import ValidationError
+
+
+def test_from_vectors_packs_rows():
+    vectors = [
+        FeatureVector(schema_id="s", values=[1.0, 0.0], mapping=["a", "b"]),
+        FeatureVector(schema_id="s", values=[0.5, 0.5], mapping=["a", "b"]),
+    ]
+    matrix = VectorMatrix.from_vectors(vectors, ids=["v1", "v2"])
+    assert matrix.values.shape == (2, 2)
+    assert matrix.values.flags["C_CONTIGUOUS"]
+    assert list(matrix.ids) == ["v1", "v2"]
+    assert matrix.vector(1).values == [0.5, 0.5]
+
+
+def test_from_vectors_rejects_schema_mismatch():
+    vectors = [
+        FeatureVector(schema_id="s", values=[1.0], mapping=["a"]),
+        FeatureVector(schema_id="t", values=[1.0], mapping=["a"]),
+    ]
+    with pytest.raises(ValidationError):
+        VectorMatrix.from_vectors(vectors)
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    vectors = [FeatureVector(schema_id="s", values=[0.1, 0.9], mapping=["a", "b"])]
+    matrix = VectorMatrix.from_vectors(vectors, ids=["v1"])
+    loaded = VectorMatrix.load(matrix.save(tmp_path / "matrix.npz"))
+    assert loaded.schema_id == "s"
+    assert loaded.mapping == ["a", "b"]
+    assert loaded.values.tolist() == [[0.1, 0.9]]
+
+
+def test_set_row_refreshes_cached_norms():
+    matrix = VectorMatrix.from_vectors([FeatureVector(schema_id="s", values=[3.0, 4.0], mapping=["a", "b"])])
+    assert matrix.norms.tolist() == [5.0]
+    with pytest.raises(ValueError):
+        matrix.values[0, 0] = 1.0
+    with pytest.raises(AttributeError):
+        matrix.values = np.zeros((1, 2))
+    matrix.set_row(0, [6.0, 8.0])
+    assert matrix.norms.tolist() == [10.0]
+    assert matrix.unit_values.tolist() == [[0.6, 0.8]]
+    assert matrix.version == 1
@@ -20,3 +20,8 @@ def test_apply_uses_scheme():
     values = {"x": 10.0}
     weighted = manager.apply(values, scheme)
     assert "x" in weighted
+
+
+def test_expand_maps_trait_weights_to_slots():
+    scheme = WeightScheme(name="inline", weights={"species": 0.3, "size": 0.7})
+    assert scheme.expand(["species", "species", "size", "other"]) == [0.3, 0.3, 0.7, 1.0]